@@ -3,30 +3,36 @@ import autoTable from 'jspdf-autotable';
 import logo from '../../assets/logo-black.png';
 
 /**
- * Downloads a CSV file generated from the provided columns and report data.
- * @param {string[]} columns - An array of column headers for the CSV.
- * @param {string[][]} report - A 2D array representing the rows of the report.
+ * Parameters identifying a report, as sent to the reports API.
  */
-export const downloadCSV = (columns: string[], report: string[][]) => {
-  const csv =
-    columns!.map((column) => column).join(',') +
-    '\n' +
-    report!
-      .map((row) =>
-        row
-          .map((val) =>
-            typeof val === 'string' ? val.replace(/,/g, ';') : val
-          )
-          .join(',')
-      )
-      .join('\n');
-  const blob = new Blob([csv], { type: 'text/csv' });
-  const url = window.URL.createObjectURL(blob);
+export interface ReportRequest {
+  name: string;
+  category: string;
+  startDate?: string;
+  endDate?: string;
+  objId?: string;
+}
+
+/**
+ * Downloads a report streamed by the server instead of building the file in
+ * the browser, so large reports are written straight to disk.
+ * @param {ReportRequest} reportRequest - The report to export.
+ * @param {'csv' | 'ndjson'} format - The export format.
+ */
+export const downloadReportExport = (
+  reportRequest: ReportRequest,
+  format: 'csv' | 'ndjson' = 'csv'
+) => {
+  const params = new URLSearchParams({ format });
+  Object.entries(reportRequest).forEach(([key, value]) => {
+    if (value !== undefined && value !== null) {
+      params.append(key, value);
+    }
+  });
   const a = document.createElement('a');
-  a.href = url;
-  a.download = 'report.csv';
+  a.href = `${import.meta.env.VITE_API_BASE_URL}/api/reports/export?${params}`;
+  a.download = `report.${format}`;
   a.click();
-  window.URL.revokeObjectURL(url);
 };
 
 /**
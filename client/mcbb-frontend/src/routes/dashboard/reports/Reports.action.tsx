@@ -19,6 +19,14 @@ const reportsAction: ActionFunction = async ({
     );
   }
 
+  const reportRequest = {
+    name: formData.get('name') as string,
+    category: formData.get('category') as string,
+    startDate,
+    endDate,
+    objId: id
+  };
+
   const resp = await fetch(
     `${import.meta.env.VITE_API_BASE_URL}/api/reports/`,
     {
@@ -27,21 +35,20 @@ const reportsAction: ActionFunction = async ({
       headers: {
         'Content-Type': 'application/json'
       },
-      body: JSON.stringify({
-        name: formData.get('name'),
-        category: formData.get('category'),
-        startDate,
-        endDate,
-        objId: id
-      })
+      body: JSON.stringify(reportRequest)
     }
   );
   if (!resp.ok) {
-    return json({ error: 'Failed to fetch report' }, { status: 500 });
+    // Busy and timeout responses carry a message worth showing the user
+    const errorData = await resp.json().catch(() => ({}));
+    return json(
+      { error: errorData.error ?? 'Failed to fetch report' },
+      { status: resp.status }
+    );
   }
   const data = await resp.json();
   console.log(data);
-  return json(data, { status: 200 });
+  return json({ ...data, request: reportRequest }, { status: 200 });
 };
 
 export default reportsAction;
@@ -1,7 +1,11 @@
 import { useLoaderData, Form, useActionData } from 'react-router-dom';
 import Select from '../../../components/formElements/Select.component';
 import Button from '../../../components/formElements/Button.component';
-import { downloadCSV, downloadPDF } from '../../../helper/reportDownloaders';
+import {
+  downloadPDF,
+  downloadReportExport,
+  ReportRequest
+} from '../../../helper/reportDownloaders';
 import { useEffect, useState } from 'react';
 import { useSchool } from '../../../contexts/SchoolContext';
 import { useNotification } from '../../../contexts/NotificationContext';
@@ -17,6 +21,9 @@ const Reports: React.FC = () => {
     error?: string;
     report?: string[][];
     columns?: string[];
+    truncated?: boolean;
+    rowLimit?: number;
+    request?: ReportRequest;
   } | null;
   const [reportName, setReportName] = useState<string>(reports[0]);
   const { currentSchool } = useSchool();
@@ -25,6 +32,11 @@ const Reports: React.FC = () => {
   useEffect(() => {
     if (actionData?.error) {
       addNotification(actionData.error, 'error');
+    } else if (actionData?.truncated) {
+      addNotification(
+        `Showing the first ${actionData.rowLimit} rows. Download the CSV for the full report.`,
+        'info'
+      );
     }
   }, [actionData]);
 
@@ -76,9 +88,7 @@ const Reports: React.FC = () => {
             <Button
               text='Download Report as CSV'
               type='button'
-              onClick={() =>
-                downloadCSV(actionData.columns!, actionData.report!)
-              }
+              onClick={() => downloadReportExport(actionData.request!, 'csv')}
             />
             <Button
               text='Download Report as PDF'
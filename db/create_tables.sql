@@ -15,6 +15,23 @@
 /*!40101 SET @OLD_SQL_MODE=@@SQL_MODE, SQL_MODE='NO_AUTO_VALUE_ON_ZERO' */;
 /*!40111 SET @OLD_SQL_NOTES=@@SQL_NOTES, SQL_NOTES=0 */;
 
+--
+-- Table structure for table `calendar_feed`
+--
+
+DROP TABLE IF EXISTS `calendar_feed`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `calendar_feed` (
+  `USER_ID` varchar(50) COLLATE utf8mb4_general_ci NOT NULL,
+  `TOKEN` varchar(64) COLLATE utf8mb4_bin NOT NULL,
+  `CREATED_AT` datetime NOT NULL,
+  PRIMARY KEY (`USER_ID`),
+  UNIQUE KEY `CALENDAR_FEED_TOKEN_idx` (`TOKEN`),
+  CONSTRAINT `FK_CALENDAR_FEED_USER_ID` FOREIGN KEY (`USER_ID`) REFERENCES `users` (`EMAIL`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `club`
 --
@@ -32,8 +49,10 @@ CREATE TABLE `club` (
   `CLUB_LOGO` mediumblob,
   `LOGO_PREFIX` varchar(45) COLLATE utf8mb4_general_ci DEFAULT NULL,
   `creation_date` datetime DEFAULT CURRENT_TIMESTAMP,
+  `SUBSCRIBER_COUNT` int NOT NULL DEFAULT '0',
   PRIMARY KEY (`CLUB_ID`),
   KEY `FK_SCHOOL_SCHOOL_ID_idx` (`SCHOOL_ID`),
+  FULLTEXT KEY `CLUB_SEARCH_idx` (`CLUB_NAME`,`DESCRIPTION`),
   CONSTRAINT `FK_CLUB_SCHOOL_ID` FOREIGN KEY (`SCHOOL_ID`) REFERENCES `school` (`SCHOOL_ID`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=52 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -91,6 +110,24 @@ CREATE TABLE `club_photo` (
 ) ENGINE=InnoDB AUTO_INCREMENT=31 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `club_rollup_daily`
+--
+
+DROP TABLE IF EXISTS `club_rollup_daily`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `club_rollup_daily` (
+  `rollup_date` date NOT NULL,
+  `school_id` int NOT NULL,
+  `club_id` int NOT NULL,
+  `event_count` int NOT NULL DEFAULT '0',
+  `rsvp_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`club_id`,`rollup_date`),
+  KEY `school_id_rollup_date` (`school_id`,`rollup_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `club_tags`
 --
@@ -154,8 +191,11 @@ CREATE TABLE `event` (
   `SCHOOL_ID` int NOT NULL,
   `EVENT_NAME` varchar(50) COLLATE utf8mb4_general_ci DEFAULT NULL,
   `gender_restriction` enum('M','F') COLLATE utf8mb4_general_ci DEFAULT NULL,
+  `RSVP_COUNT` int NOT NULL DEFAULT '0',
   PRIMARY KEY (`EVENT_ID`),
   KEY `SCHOOL_ID_idx` (`SCHOOL_ID`),
+  KEY `SCHOOL_START_TIME_idx` (`SCHOOL_ID`,`start_time`),
+  FULLTEXT KEY `EVENT_SEARCH_idx` (`EVENT_NAME`,`DESCRIPTION`,`LOCATION`),
   CONSTRAINT `FK_EVENT_SCHOOL_ID` FOREIGN KEY (`SCHOOL_ID`) REFERENCES `school` (`SCHOOL_ID`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB AUTO_INCREMENT=72 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -217,6 +257,25 @@ CREATE TABLE `event_tags` (
 ) ENGINE=InnoDB AUTO_INCREMENT=55 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `live_update`
+--
+
+DROP TABLE IF EXISTS `live_update`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `live_update` (
+  `ID` bigint NOT NULL AUTO_INCREMENT,
+  `TOPIC` varchar(32) COLLATE utf8mb4_general_ci NOT NULL,
+  `KIND` varchar(32) COLLATE utf8mb4_general_ci NOT NULL,
+  `PAYLOAD` text COLLATE utf8mb4_general_ci NOT NULL,
+  `CREATED_AT` datetime NOT NULL,
+  PRIMARY KEY (`ID`),
+  KEY `LIVE_UPDATE_TOPIC_idx` (`TOPIC`,`ID`),
+  KEY `LIVE_UPDATE_CREATED_AT_idx` (`CREATED_AT`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `logos`
 --
@@ -231,6 +290,19 @@ CREATE TABLE `logos` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `rollup_dirty_day`
+--
+
+DROP TABLE IF EXISTS `rollup_dirty_day`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `rollup_dirty_day` (
+  `rollup_date` date NOT NULL,
+  PRIMARY KEY (`rollup_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `rsvp`
 --
@@ -253,6 +325,26 @@ CREATE TABLE `rsvp` (
 ) ENGINE=InnoDB AUTO_INCREMENT=59 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `rsvp_rollup_daily`
+--
+
+DROP TABLE IF EXISTS `rsvp_rollup_daily`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `rsvp_rollup_daily` (
+  `rollup_date` date NOT NULL,
+  `school_id` int NOT NULL,
+  `club_id` int NOT NULL,
+  `gender` varchar(1) COLLATE utf8mb4_general_ci NOT NULL DEFAULT '',
+  `semester_started` varchar(6) COLLATE utf8mb4_general_ci NOT NULL DEFAULT '',
+  `year_started` int NOT NULL DEFAULT '0',
+  `rsvp_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`school_id`,`club_id`,`rollup_date`,`gender`,`semester_started`,`year_started`),
+  KEY `rollup_date` (`rollup_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `school`
 --
@@ -286,11 +378,28 @@ CREATE TABLE `session_mapping` (
   `created_at` datetime NOT NULL,
   `expires_at` datetime NOT NULL,
   PRIMARY KEY (`session_id`),
-  KEY `user_email` (`user_email`),
+  KEY `user_email` (`user_email`,`created_at`),
+  KEY `expires_at` (`expires_at`),
   CONSTRAINT `session_mapping_ibfk_1` FOREIGN KEY (`user_email`) REFERENCES `users` (`EMAIL`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `session_revocation`
+--
+
+DROP TABLE IF EXISTS `session_revocation`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `session_revocation` (
+  `session_id` varchar(64) NOT NULL,
+  `expires_at` datetime NOT NULL,
+  `revoked_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  PRIMARY KEY (`session_id`),
+  KEY `expires_at` (`expires_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `tag`
 --
@@ -310,6 +419,61 @@ CREATE TABLE `tag` (
 ) ENGINE=InnoDB AUTO_INCREMENT=26 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
+--
+-- Table structure for table `tag_rollup_daily`
+--
+
+DROP TABLE IF EXISTS `tag_rollup_daily`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `tag_rollup_daily` (
+  `rollup_date` date NOT NULL,
+  `school_id` int NOT NULL,
+  `tag_id` int NOT NULL,
+  `rsvp_count` int NOT NULL DEFAULT '0',
+  PRIMARY KEY (`school_id`,`rollup_date`,`tag_id`),
+  KEY `rollup_date` (`rollup_date`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `tag_usage_rollup`
+--
+
+DROP TABLE IF EXISTS `tag_usage_rollup`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `tag_usage_rollup` (
+  `school_id` int NOT NULL,
+  `tag_id` int NOT NULL,
+  `user_count` int NOT NULL DEFAULT '0',
+  `club_count` int NOT NULL DEFAULT '0',
+  `event_count` int NOT NULL DEFAULT '0',
+  `subscription_count` int NOT NULL DEFAULT '0',
+  `refreshed_at` timestamp NULL DEFAULT NULL,
+  PRIMARY KEY (`tag_id`),
+  KEY `school_id` (`school_id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Table structure for table `user_club_affinity`
+--
+
+DROP TABLE IF EXISTS `user_club_affinity`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `user_club_affinity` (
+  `USER_ID` varchar(50) COLLATE utf8mb4_general_ci NOT NULL,
+  `CLUB_ID` int NOT NULL,
+  `SHARED_TAGS` int NOT NULL,
+  PRIMARY KEY (`USER_ID`,`CLUB_ID`),
+  KEY `FK_USER_CLUB_AFFINITY_CLUB_ID_idx` (`CLUB_ID`),
+  CONSTRAINT `FK_USER_CLUB_AFFINITY_CLUB_ID` FOREIGN KEY (`CLUB_ID`) REFERENCES `club` (`CLUB_ID`) ON DELETE CASCADE ON UPDATE CASCADE,
+  CONSTRAINT `FK_USER_CLUB_AFFINITY_USER_ID` FOREIGN KEY (`USER_ID`) REFERENCES `users` (`EMAIL`) ON DELETE CASCADE ON UPDATE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
 --
 -- Table structure for table `user_subscription`
 --
@@ -353,6 +517,10 @@ CREATE TABLE `user_tags` (
 --
 
 DROP TABLE IF EXISTS `users`;
+-- The ngram parser drops every ngram containing a stopword, and the default
+-- list includes single letters, so build USERS_SEARCH_idx without stopwords
+SET @saved_ft_enable_stopword = @@innodb_ft_enable_stopword;
+SET SESSION innodb_ft_enable_stopword = OFF;
 /*!40101 SET @saved_cs_client     = @@character_set_client */;
 /*!50503 SET character_set_client = utf8mb4 */;
 CREATE TABLE `users` (
@@ -376,8 +544,13 @@ CREATE TABLE `users` (
   `clubs_filter` enum('All Clubs','Suggested','Subscribed') COLLATE utf8mb4_general_ci DEFAULT 'Suggested',
   PRIMARY KEY (`EMAIL`),
   KEY `FK_USERS_SCHOOL_ID_idx` (`SCHOOL_ID`),
+  KEY `USERS_SCHOOL_NAME_idx` (`SCHOOL_ID`,`NAME`,`EMAIL`),
+  KEY `USERS_SCHOOL_EMAIL_idx` (`SCHOOL_ID`,`EMAIL`),
+  KEY `USERS_SCHOOL_FLAGS_idx` (`SCHOOL_ID`,`IS_FACULTY`,`is_banned`,`IS_ACTIVE`),
+  FULLTEXT KEY `USERS_SEARCH_idx` (`NAME`,`EMAIL`) /*!50100 WITH PARSER `ngram` */ ,
   CONSTRAINT `FK_USERS_SCHOOL_ID` FOREIGN KEY (`SCHOOL_ID`) REFERENCES `school` (`SCHOOL_ID`) ON DELETE CASCADE ON UPDATE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+SET SESSION innodb_ft_enable_stopword = @saved_ft_enable_stopword;
 /*!40101 SET character_set_client = @saved_cs_client */;
 /*!40103 SET TIME_ZONE=@OLD_TIME_ZONE */;
 
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,6 +18,7 @@ class Config:
         RECAPTCHA_SECRET_KEY (str): Secret key for reCAPTCHA verification.
         MYSQL_UNIX_SOCKET (str): Unix socket path for MySQL connection.
         MYSQL_HOST (str): Hostname for MySQL database.
+        MYSQL_PORT (int): Port for MySQL database.
         MYSQL_USER (str): Username for database authentication.
         MYSQL_PASSWORD (str): Password for database authentication.
         MYSQL_DB (str): Name of the database to connect to.
@@ -27,6 +29,64 @@ class Config:
         JWT_SECRET_KEY (str): Secret key for signing and verifying JWTs.
         JWT_EXPIRATION (int): Expiration time for JWTs in seconds
         API_URL_ROOT (str): Root URL for the API.
+        ROLLUP_INTERVAL_MINUTES (int): Minutes between report rollup refreshes.
+        MYSQL_REPLICA_URL (str): DSN of the read replica (unset to use only the primary).
+        REPLICA_STICKY_SECONDS (int): Seconds a user's reads stay on the primary after a write.
+        REPLICA_RETRY_SECONDS (int): Seconds to wait before retrying an unreachable replica.
+        REPLICA_CONNECT_TIMEOUT (int): Seconds to wait when connecting to the replica.
+        REPORT_MAX_EXECUTION_MS (int): Default time limit for a report query in milliseconds.
+        REPORT_MAX_ROWS (int): Default number of rows returned by a report.
+        REPORT_CONCURRENCY_PER_SCHOOL (int): Reports a school may run at once.
+        REPORT_QUEUE_LENGTH (int): Reports a school may have waiting for a slot.
+        REPORT_QUEUE_TIMEOUT_SECONDS (int): Seconds a report waits for a slot.
+        REPORT_JOB_FOLDER (str): Directory shared by the workers for background report status and results.
+        REPORT_JOB_WORKERS (int): Number of background report job threads.
+        REPORT_JOB_TTL_SECONDS (int): Seconds a finished report job is kept.
+        REPORT_JOB_MAX_EXECUTION_MS (int): Time limit for a background report query in milliseconds.
+        MAX_SESSIONS_PER_USER (int): Sessions a user may have before the oldest are removed.
+        SESSION_SWEEP_INTERVAL_MINUTES (int): Minutes between expired session sweeps.
+        SESSION_SWEEP_BATCH_SIZE (int): Expired sessions deleted per batch.
+        SESSION_SWEEP_MAX_BATCHES (int): Batches deleted per sweep.
+        SESSION_MODE (str): 'database' to check every request against session_mapping,
+            or 'signed' to trust the signed session cookie unless it may be revoked.
+        SESSION_REVOCATION_REFRESH_SECONDS (int): Seconds between revocation filter rebuilds.
+        SESSION_REVOCATION_FILTER_BITS (int): Size of the revocation bloom filter in bits.
+        SESSION_CLAIMS_MAX_AGE_SECONDS (int): Seconds signed mode trusts the user details in the
+            cookie before reloading them from the database.
+        PASSWORD_HASH_METHOD (str): Werkzeug hash method and cost, e.g. 'scrypt:32768:8:1'
+            or 'pbkdf2:sha256:600000'. Passwords are rehashed on login when it changes.
+        PASSWORD_HASH_WORKERS (int): Processes used for password hashing (0 to hash inline).
+        PASSWORD_HASH_MAX_PENDING (int): Hashes that may be queued in the pool at once.
+        RATELIMIT_STORAGE_URI (str): Flask-Limiter storage, shared by all workers on the host.
+        RATELIMIT_STRATEGY (str): Flask-Limiter strategy, e.g. 'sliding-window-counter'.
+        RATELIMIT_STORAGE_OPTIONS (dict): Options for the SQLite limiter storage
+            (max_keys, compact_seconds).
+        RATELIMIT_HEADERS_ENABLED (bool): Send X-RateLimit-* and Retry-After headers.
+        EXPENSIVE_ROUTE_USER_LIMIT (str): Cost budget per user shared by all expensive routes.
+        EXPENSIVE_ROUTE_CONCURRENCY (int): Expensive requests served at once per process.
+        LOAD_SHED_RETRY_AFTER_SECONDS (int): Retry-After sent with 503 responses when shedding load.
+        SLOW_REQUEST_MS (int): Requests slower than this are logged with their slowest SQL.
+        METRICS_TOKEN (str): Bearer token for /api/metrics (local requests only if unset).
+        QUERY_AUDIT (str): N+1 query detection: 'off', 'warn' (log) or 'raise' (for tests).
+        QUERY_AUDIT_REPEAT_THRESHOLD (int): Times one statement may run per request.
+        LOG_LEVEL (str): Minimum level logged, e.g. 'INFO' or 'DEBUG'.
+        LOG_FORMAT (str): 'json' for one JSON object per line, or 'text'.
+        LOG_DEBUG_SAMPLE_RATE (float): Share of requests whose debug logs are kept.
+        COMPRESS_MIN_SIZE (int): Smallest response body, in bytes, that gets compressed.
+        COMPRESS_GZIP_LEVEL (int): zlib level for gzip responses.
+        COMPRESS_BROTLI_QUALITY (int): Quality for brotli responses (if brotli is installed).
+        COMPRESS_ZSTD_LEVEL (int): Level for zstd responses (if zstandard is installed).
+        COMPRESS_CACHE_BYTES (int): Memory for caching compressed bodies by ETag.
+        CALENDAR_SUMMARY_TTL_SECONDS (int): How long per-school calendar day counts are cached.
+        USER_DIRECTORY_COUNTS_TTL_SECONDS (int): How long per-school user directory counts are cached.
+        CALENDAR_FEED_TTL_SECONDS (int): How long a user's rendered .ics feed is cached.
+        LIVE_UPDATE_POLL_SECONDS (float): Seconds between each worker's polls for new live updates.
+        LIVE_UPDATE_HEARTBEAT_SECONDS (int): Seconds between keepalive comments on an idle stream.
+        LIVE_UPDATE_STREAM_SECONDS (int): Seconds a stream stays open before the client reconnects.
+        LIVE_UPDATE_RETRY_MS (int): Milliseconds browsers wait before reconnecting a closed stream.
+        LIVE_UPDATE_MAX_STREAMS (int): Streams a worker serves at once (each holds a thread).
+        LIVE_UPDATE_RETENTION_MINUTES (int): Minutes updates are kept for reconnecting clients.
+        COUNTER_RECONCILE_BATCH_SIZE (int): Event or club IDs recounted per transaction.
     """
 
     SECRET_KEY = os.getenv("FLASK_SECRET_KEY")
@@ -35,6 +95,7 @@ class Config:
     # MySQL configuration
     MYSQL_UNIX_SOCKET = os.getenv("MYSQL_UNIX_SOCKET")
     MYSQL_HOST = os.getenv("MYSQL_HOST")
+    MYSQL_PORT = int(os.getenv("MYSQL_PORT", 3306))
     MYSQL_USER = os.getenv("DB_USER")
     MYSQL_PASSWORD = os.getenv("DB_PWD")
     MYSQL_DB = "sharc"
@@ -59,3 +120,112 @@ class Config:
     # Session timeout
     SESSION_TIMEOUT = int(os.getenv("SESSION_TIMEOUT_MINUTES", 60))
     SESSION_TIMEOUT_MOBILE = int(os.getenv("SESSION_TIMEOUT_MOBILE_MINUTES", 43200))
+
+    # Report rollups
+    ROLLUP_INTERVAL_MINUTES = int(os.getenv("ROLLUP_INTERVAL_MINUTES", 5))
+
+    # Read replica
+    MYSQL_REPLICA_URL = os.getenv("MYSQL_REPLICA_URL")
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+    REPLICA_RETRY_SECONDS = int(os.getenv("REPLICA_RETRY_SECONDS", 30))
+    REPLICA_CONNECT_TIMEOUT = int(os.getenv("REPLICA_CONNECT_TIMEOUT", 2))
+
+    # Report execution limits
+    REPORT_MAX_EXECUTION_MS = int(os.getenv("REPORT_MAX_EXECUTION_MS", 30000))
+    REPORT_MAX_ROWS = int(os.getenv("REPORT_MAX_ROWS", 5000))
+    REPORT_CONCURRENCY_PER_SCHOOL = int(os.getenv("REPORT_CONCURRENCY_PER_SCHOOL", 2))
+    REPORT_QUEUE_LENGTH = int(os.getenv("REPORT_QUEUE_LENGTH", 10))
+    REPORT_QUEUE_TIMEOUT_SECONDS = int(os.getenv("REPORT_QUEUE_TIMEOUT_SECONDS", 15))
+
+    # Background report jobs
+    # Absolute, so every worker finds the same jobs whatever its working
+    # directory, and outside the source tree
+    REPORT_JOB_FOLDER = os.getenv(
+        "REPORT_JOB_FOLDER", os.path.join(tempfile.gettempdir(), "sharc-report-jobs")
+    )
+    REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", 2))
+    REPORT_JOB_TTL_SECONDS = int(os.getenv("REPORT_JOB_TTL_SECONDS", 86400))
+    REPORT_JOB_MAX_EXECUTION_MS = int(os.getenv("REPORT_JOB_MAX_EXECUTION_MS", 600000))
+
+    # Session table maintenance
+    MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", 10))
+    SESSION_SWEEP_INTERVAL_MINUTES = int(os.getenv("SESSION_SWEEP_INTERVAL_MINUTES", 10))
+    SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", 500))
+    SESSION_SWEEP_MAX_BATCHES = int(os.getenv("SESSION_SWEEP_MAX_BATCHES", 100))
+
+    # Session validation mode
+    SESSION_MODE = os.getenv("SESSION_MODE", "database")
+    SESSION_REVOCATION_REFRESH_SECONDS = int(
+        os.getenv("SESSION_REVOCATION_REFRESH_SECONDS", 30)
+    )
+    SESSION_REVOCATION_FILTER_BITS = int(
+        os.getenv("SESSION_REVOCATION_FILTER_BITS", 1 << 20)
+    )
+    SESSION_CLAIMS_MAX_AGE_SECONDS = int(os.getenv("SESSION_CLAIMS_MAX_AGE_SECONDS", 60))
+
+    # Password hashing
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 8))
+
+    # Rate limiter storage
+    # Absolute, so every worker opens the same file whatever its working
+    # directory, and outside the source tree
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI",
+        "sqlite:///" + os.path.join(tempfile.gettempdir(), "sharc-ratelimit.sqlite3"),
+    )
+    RATELIMIT_STRATEGY = os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter")
+    RATELIMIT_STORAGE_OPTIONS = {
+        "max_keys": int(os.getenv("RATELIMIT_SQLITE_MAX_KEYS", 100000)),
+        "compact_seconds": int(os.getenv("RATELIMIT_SQLITE_COMPACT_SECONDS", 60)),
+    }
+    RATELIMIT_HEADERS_ENABLED = True
+    RATELIMIT_HEADER_RETRY_AFTER_VALUE = "delta-seconds"
+
+    # Load shedding for expensive routes
+    EXPENSIVE_ROUTE_USER_LIMIT = os.getenv("EXPENSIVE_ROUTE_USER_LIMIT", "200 per minute")
+    EXPENSIVE_ROUTE_CONCURRENCY = int(os.getenv("EXPENSIVE_ROUTE_CONCURRENCY", 8))
+    LOAD_SHED_RETRY_AFTER_SECONDS = int(os.getenv("LOAD_SHED_RETRY_AFTER_SECONDS", 2))
+
+    # Request metrics
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 1000))
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+    # N+1 query detection, for development and tests
+    QUERY_AUDIT = os.getenv("QUERY_AUDIT", "off")
+    QUERY_AUDIT_REPEAT_THRESHOLD = int(os.getenv("QUERY_AUDIT_REPEAT_THRESHOLD", 5))
+
+    # Logging
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0.01))
+
+    # Response compression
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", 5))
+    COMPRESS_ZSTD_LEVEL = int(os.getenv("COMPRESS_ZSTD_LEVEL", 3))
+    COMPRESS_CACHE_BYTES = int(os.getenv("COMPRESS_CACHE_BYTES", 32 * 1024 * 1024))
+
+    # Calendar summary
+    CALENDAR_SUMMARY_TTL_SECONDS = int(os.getenv("CALENDAR_SUMMARY_TTL_SECONDS", 60))
+
+    # User directory
+    USER_DIRECTORY_COUNTS_TTL_SECONDS = int(
+        os.getenv("USER_DIRECTORY_COUNTS_TTL_SECONDS", 300)
+    )
+
+    # Calendar feeds
+    CALENDAR_FEED_TTL_SECONDS = int(os.getenv("CALENDAR_FEED_TTL_SECONDS", 900))
+
+    # Live updates (Server-Sent Events)
+    LIVE_UPDATE_POLL_SECONDS = float(os.getenv("LIVE_UPDATE_POLL_SECONDS", 1.0))
+    LIVE_UPDATE_HEARTBEAT_SECONDS = int(os.getenv("LIVE_UPDATE_HEARTBEAT_SECONDS", 25))
+    LIVE_UPDATE_STREAM_SECONDS = int(os.getenv("LIVE_UPDATE_STREAM_SECONDS", 1800))
+    LIVE_UPDATE_RETRY_MS = int(os.getenv("LIVE_UPDATE_RETRY_MS", 3000))
+    LIVE_UPDATE_MAX_STREAMS = int(os.getenv("LIVE_UPDATE_MAX_STREAMS", 200))
+    LIVE_UPDATE_RETENTION_MINUTES = int(os.getenv("LIVE_UPDATE_RETENTION_MINUTES", 15))
+
+    # RSVP and subscriber counters
+    COUNTER_RECONCILE_BATCH_SIZE = int(os.getenv("COUNTER_RECONCILE_BATCH_SIZE", 1000))
@@ -3,6 +3,9 @@ from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+# Registers the "sqlite://" storage scheme used by RATELIMIT_STORAGE_URI
+import helper.limiter_storage  # noqa: F401
+
 # MySQL database connection extension
 mysql = MySQL()
 
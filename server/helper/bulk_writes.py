@@ -0,0 +1,111 @@
+def in_placeholders(values):
+    """
+    Build the placeholder list for an IN (...) clause.
+
+    Args:
+        values (Collection): Values that will be bound to the placeholders
+
+    Returns:
+        str: "%s, %s, ..." with one placeholder per value
+    """
+    return ", ".join(["%s"] * len(values))
+
+
+def insert_rows(cur, table, columns, rows):
+    """
+    Insert many rows in a single round trip.
+
+    MySQLdb's executemany rewrites a plain INSERT ... VALUES (...) into one
+    multi-row INSERT (split only if it would exceed the client's statement
+    size limit), so saving N associations costs one statement instead of N.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        table (str): Table to insert into
+        columns (list): Column names, in the order the row values are given
+        rows (list): Row tuples to insert
+
+    Returns:
+        int: Number of rows inserted
+    """
+    if not rows:
+        return 0
+    cur.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({in_placeholders(columns)})",
+        rows,
+    )
+    return len(rows)
+
+
+def sync_association(cur, table, owner_column, owner_id, value_column, values):
+    """
+    Make the set of values linked to an owner match a new set.
+
+    Only the difference is written: one DELETE for values that were removed
+    and one multi-row INSERT for values that were added. Values that are in
+    both sets are left alone, so their rows (and IDs) are kept.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        table (str): Association table, e.g. club_tags
+        owner_column (str): Column holding the owner ID, e.g. club_id
+        owner_id: ID of the owner whose associations are being replaced
+        value_column (str): Column holding the associated value, e.g. tag_id
+        values (Iterable): The complete new set of values
+
+    Returns:
+        tuple: (added, removed) sets of values
+    """
+    cur.execute(
+        f"SELECT {value_column} FROM {table} WHERE {owner_column} = %s",
+        (owner_id,),
+    )
+    current = {row[0] for row in cur.fetchall()}
+    wanted = set(values)
+    added = wanted - current
+    removed = current - wanted
+
+    if removed:
+        cur.execute(
+            f"""DELETE FROM {table}
+                WHERE {owner_column} = %s
+                    AND {value_column} IN ({in_placeholders(removed)})""",
+            (owner_id, *removed),
+        )
+    insert_rows(
+        cur, table, [owner_column, value_column], [(owner_id, value) for value in added]
+    )
+    return added, removed
+
+
+def find_missing(cur, table, column, values):
+    """
+    Find which of the given values don't exist in a table.
+
+    Used to validate a whole list of foreign keys (tags, users, clubs) with
+    one query before a bulk insert, so the caller can still name the bad value.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        table (str): Table to look in
+        column (str): Column to match the values against
+        values (Iterable): Values to check
+
+    Returns:
+        set: Values with no matching row
+    """
+    values = set(values)
+    if not values:
+        return set()
+    cur.execute(
+        f"SELECT {column} FROM {table} WHERE {column} IN ({in_placeholders(values)})",
+        tuple(values),
+    )
+
+    # String columns use case-insensitive collations, so compare the same way
+    def normalize(value):
+        return value.lower() if isinstance(value, str) else value
+
+    found = {normalize(row[0]) for row in cur.fetchall()}
+    return {value for value in values if normalize(value) not in found}
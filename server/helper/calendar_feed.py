@@ -0,0 +1,254 @@
+import hashlib
+import secrets
+from datetime import datetime, timedelta, timezone
+from config import Config
+from helper.school_cache import SchoolCache
+
+# Events that ended more than this many days ago drop out of the feed
+FEED_PAST_DAYS = 30
+
+# How often calendar apps are asked to poll (ignored by some)
+REFRESH_INTERVAL = "PT15M"
+
+# Rendered feeds per (school, user), as (etag, body). Dropped when the user
+# changes an RSVP or subscription and, for the whole school, when an event
+# is approved, declined or cancelled. Schools are keyed as strings, since
+# the session holds the ID as the login form sent it.
+feeds = SchoolCache("CALENDAR_FEED_TTL_SECONDS")
+
+
+def drop_user_feed(school_id, user_id):
+    """
+    Drop a user's cached feed after their RSVPs or subscriptions changed.
+    """
+    feeds.discard((str(school_id), user_id))
+
+
+def drop_school_feeds(school_id):
+    """
+    Drop every cached feed of a school after one of its events changed.
+    """
+    feeds.invalidate(str(school_id))
+
+
+def feed_token(cur, user_id, rotate=False):
+    """
+    Get a user's feed token, creating it on first use.
+
+    The token is the only credential the feed URL carries, since calendar
+    apps can't send the session cookie. Rotating it revokes the old URL.
+    The caller commits.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        user_id (str): Email of the user
+        rotate (bool): Replace any existing token with a new one
+
+    Returns:
+        str: URL-safe token
+    """
+    token = secrets.token_urlsafe(32)
+    if rotate:
+        cur.execute(
+            """INSERT INTO calendar_feed (user_id, token, created_at)
+                VALUES (%s, %s, UTC_TIMESTAMP())
+                ON DUPLICATE KEY UPDATE
+                    token = VALUES(token), created_at = VALUES(created_at)""",
+            (user_id, token),
+        )
+        return token
+    # INSERT IGNORE keeps the token of a concurrent first request
+    cur.execute(
+        """INSERT IGNORE INTO calendar_feed (user_id, token, created_at)
+            VALUES (%s, %s, UTC_TIMESTAMP())""",
+        (user_id, token),
+    )
+    cur.execute("SELECT token FROM calendar_feed WHERE user_id = %s", (user_id,))
+    return cur.fetchone()[0]
+
+
+def feed_owner(cur, token):
+    """
+    Find the active user a feed token belongs to.
+
+    Returns:
+        tuple or None: (email, school_id, gender, is_faculty)
+    """
+    cur.execute(
+        """SELECT u.email, u.school_id, u.gender, u.is_faculty
+            FROM calendar_feed f
+            INNER JOIN users u ON u.email = f.user_id
+            WHERE f.token = %s
+                AND u.is_active = 1
+                AND COALESCE(u.is_banned, 0) = 0""",
+        (token,),
+    )
+    return cur.fetchone()
+
+
+def feed_events(cur, user_id, school_id, gender, is_faculty, since):
+    """
+    Events a user is attending or that their subscribed clubs host.
+
+    Events the user blocked with an RSVP are left out even when a
+    subscribed club hosts them.
+
+    Returns:
+        list: Rows of event_id, event_name, start_time, end_time, location,
+            description, host club names and whether the user is attending
+    """
+    cur.execute(
+        """SELECT e.event_id,
+                  e.event_name,
+                  e.start_time,
+                  e.end_time,
+                  e.location,
+                  e.description,
+                  (SELECT GROUP_CONCAT(c.club_name ORDER BY c.club_name SEPARATOR ', ')
+                        FROM event_host eh
+                        INNER JOIN club c ON c.club_id = eh.club_id
+                        WHERE eh.event_id = e.event_id AND eh.is_approved = 1),
+                  COALESCE(r.is_yes, 0)
+            FROM event e
+            LEFT JOIN rsvp r
+                ON r.event_id = e.event_id
+                AND r.user_id = %(user)s
+                AND r.is_active = 1
+            WHERE e.event_id IN (
+                    SELECT r2.event_id FROM rsvp r2
+                    WHERE r2.user_id = %(user)s
+                        AND r2.is_active = 1
+                        AND r2.is_yes = 1
+                    UNION
+                    SELECT eh.event_id FROM user_subscription us
+                    INNER JOIN event_host eh
+                        ON eh.club_id = us.club_id
+                        AND eh.is_approved = 1
+                    WHERE us.email = %(user)s
+                        AND us.is_active = 1
+                        AND us.subscribed_or_blocked = 1)
+                AND e.school_id = %(school)s
+                AND e.is_active = 1
+                AND e.is_approved = 1
+                AND e.start_time IS NOT NULL
+                AND e.end_time >= %(since)s
+                AND COALESCE(r.is_yes, 1) = 1
+                AND ((e.gender_restriction IS NULL)
+                    OR (e.gender_restriction = %(gender)s)
+                    OR %(faculty)s)
+            ORDER BY e.start_time, e.event_id""",
+        {
+            "user": user_id,
+            "school": school_id,
+            "since": since,
+            "gender": gender,
+            "faculty": bool(is_faculty),
+        },
+    )
+    return cur.fetchall()
+
+
+def _escape(text):
+    """
+    Escape a TEXT property value (RFC 5545 section 3.3.11).
+    """
+    return (
+        (text or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """
+    Fold a content line into pieces of at most 75 octets, continuation
+    lines starting with a space, without splitting a UTF-8 character.
+    """
+    pieces = []
+    limit = 75
+    while len(line.encode()) > limit:
+        cut = limit
+        while len(line[:cut].encode()) > limit:
+            cut -= 1
+        pieces.append(line[:cut])
+        line = line[cut:]
+        limit = 74
+    pieces.append(line)
+    return "\r\n ".join(pieces)
+
+
+def _utc(moment):
+    return moment.strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_calendar(rows, calendar_name):
+    """
+    Build an iCalendar document from feed_events rows.
+
+    Every property is derived from the rows, with DTSTAMP set to the event's
+    start rather than the build time, so an unchanged feed renders to the
+    same bytes (and ETag) on every worker and every rebuild.
+
+    Args:
+        rows (list): Rows from feed_events
+        calendar_name (str): Name calendar apps show for the subscription
+
+    Returns:
+        str: text/calendar body with CRLF line endings
+    """
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//SHARC//Club Bulletin Board//EN",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(calendar_name)}",
+        f"REFRESH-INTERVAL;VALUE=DURATION:{REFRESH_INTERVAL}",
+        f"X-PUBLISHED-TTL:{REFRESH_INTERVAL}",
+    ]
+    for event_id, name, start, end, location, description, hosts, attending in rows:
+        if hosts:
+            description = f"Hosted by {hosts}\n\n{description or ''}"
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:event-{event_id}@sharc",
+            f"DTSTAMP:{_utc(start)}",
+            f"DTSTART:{_utc(start)}",
+            f"DTEND:{_utc(end)}",
+            f"SUMMARY:{_escape(name)}",
+            f"LOCATION:{_escape(location)}",
+            f"DESCRIPTION:{_escape(description)}",
+            f"URL:{Config.API_URL_ROOT}/dashboard/event/{event_id}",
+            # Only events the user is going to should show them as busy
+            f"TRANSP:{'OPAQUE' if attending else 'TRANSPARENT'}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def build_feed(cur, owner):
+    """
+    Rendered feed of a user, from feeds or freshly built.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        owner (tuple): Row from feed_owner
+
+    Returns:
+        tuple: (etag, body)
+    """
+    user_id, school_id, gender, is_faculty = owner
+    key = (str(school_id), user_id)
+    feed = feeds.get(key)
+    if feed is None:
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=FEED_PAST_DAYS)
+        rows = feed_events(cur, user_id, school_id, gender, is_faculty, since)
+        body = render_calendar(rows, "SHARC Events")
+        etag = hashlib.blake2b(body.encode(), digest_size=16).hexdigest()
+        feed = (etag, body)
+        feeds.put(key, feed)
+    return feed
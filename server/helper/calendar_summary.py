@@ -0,0 +1,154 @@
+from collections import Counter
+from datetime import datetime, timedelta
+import pytz
+from helper.school_cache import SchoolCache
+
+# Filters accepted by /calendar-summary, named as in /events
+SUMMARY_FILTERS = ("", "Hosted by Subscribed Clubs", "Attending", "Suggested")
+
+# Conditions each filter adds to the per-user overlay query. %(user)s is
+# bound to the user's email.
+_SUBSCRIBED = """EXISTS (
+    SELECT 1 FROM event_host eh
+    INNER JOIN user_subscription us
+        ON us.club_id = eh.club_id
+        AND us.email = %(user)s
+        AND us.is_active = 1
+        AND us.subscribed_or_blocked = 1
+    WHERE eh.event_id = e.event_id AND eh.is_approved = 1)"""
+_BLOCKED = """EXISTS (
+    SELECT 1 FROM event_host eh
+    INNER JOIN user_subscription us
+        ON us.club_id = eh.club_id
+        AND us.email = %(user)s
+        AND us.is_active = 1
+        AND us.subscribed_or_blocked = 0
+    WHERE eh.event_id = e.event_id AND eh.is_approved = 1)"""
+_ATTENDING = """EXISTS (
+    SELECT 1 FROM rsvp r
+    WHERE r.event_id = e.event_id
+        AND r.user_id = %(user)s
+        AND r.is_active = 1
+        AND r.is_yes = 1)"""
+_SHARES_TAG = """EXISTS (
+    SELECT 1 FROM user_tags ut
+    INNER JOIN event_tags et
+        ON et.event_id = e.event_id
+        AND et.tag_id = ut.tag_id
+    WHERE ut.user_id = %(user)s)"""
+FILTER_CONDITIONS = {
+    "Hosted by Subscribed Clubs": _SUBSCRIBED,
+    "Attending": _ATTENDING,
+    "Suggested": (
+        f"({_SUBSCRIBED} OR (NOT {_BLOCKED} AND ({_ATTENDING} OR {_SHARES_TAG})))"
+    ),
+}
+
+
+# School-wide counts per (school, time zone, month), shared by every user.
+# Dropped when an event in the school is approved, declined or cancelled.
+school_month_counts = SchoolCache("CALENDAR_SUMMARY_TTL_SECONDS")
+
+
+def month_range(month, tz):
+    """
+    UTC bounds of a calendar month in a time zone.
+
+    Args:
+        month (str): Month as YYYY-MM
+        tz (pytz.timezone): Time zone the calendar is shown in
+
+    Returns:
+        tuple: (start, end) as naive UTC datetimes, end exclusive
+
+    Raises:
+        ValueError: If month is not a valid YYYY-MM string
+    """
+    first = datetime.strptime(month, "%Y-%m")
+    following = (first + timedelta(days=32)).replace(day=1)
+    return tuple(
+        tz.localize(day).astimezone(pytz.utc).replace(tzinfo=None)
+        for day in (first, following)
+    )
+
+
+def _hour_counts(cur, school_id, start, end, extra_condition="", params=None):
+    """
+    Count events per hour since start, split by gender restriction.
+
+    Grouping by the UTC hour rather than DATE(start_time) lets the caller
+    fold the hours into days of any time zone, DST changes included, while
+    MySQL still returns at most a few hundred rows for a month. The range
+    condition on start_time is answered by the school_start_time index.
+    """
+    query_params = {"school": school_id, "start": start, "end": end}
+    query_params.update(params or {})
+    cur.execute(
+        f"""SELECT TIMESTAMPDIFF(HOUR, %(start)s, e.start_time) AS hour,
+                   e.gender_restriction,
+                   COUNT(*)
+            FROM event e
+            WHERE e.school_id = %(school)s
+                AND e.start_time >= %(start)s
+                AND e.start_time < %(end)s
+                AND e.is_active = 1
+                AND e.is_approved = 1
+                {f"AND {extra_condition}" if extra_condition else ""}
+            GROUP BY hour, e.gender_restriction""",
+        query_params,
+    )
+    return cur.fetchall()
+
+
+def _days(hour_counts, start, tz, gender, is_faculty):
+    """
+    Fold hourly counts into local days, keeping the events the user may see.
+    """
+    days = Counter()
+    for hour, restriction, count in hour_counts:
+        if restriction is not None and restriction != gender and not is_faculty:
+            continue
+        moment = pytz.utc.localize(start + timedelta(hours=int(hour)))
+        days[moment.astimezone(tz).date().isoformat()] += int(count)
+    return dict(sorted(days.items()))
+
+
+def calendar_summary(cur, school_id, month, tz, user, filter_query=""):
+    """
+    Count the events a user can see on each day of a month.
+
+    The school-wide counts are cached per school, time zone and month;
+    filters are applied as a per-user overlay query that only touches the
+    user's own RSVPs, subscriptions and tags.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        school_id (int): School whose events are counted
+        month (str): Month as YYYY-MM
+        tz (pytz.timezone): Time zone whose days the events are counted in
+        user (dict): User info from get_user_session_info
+        filter_query (str): One of SUMMARY_FILTERS
+
+    Returns:
+        dict: Local date (YYYY-MM-DD) to event count, for days with events
+    """
+    start, end = month_range(month, tz)
+    gender = user.get("gender")
+    is_faculty = user.get("isFaculty")
+
+    if not filter_query:
+        key = (school_id, tz.zone, month)
+        hour_counts = school_month_counts.get(key)
+        if hour_counts is None:
+            hour_counts = _hour_counts(cur, school_id, start, end)
+            school_month_counts.put(key, hour_counts)
+    else:
+        hour_counts = _hour_counts(
+            cur,
+            school_id,
+            start,
+            end,
+            FILTER_CONDITIONS[filter_query],
+            {"user": user["user_id"]},
+        )
+    return _days(hour_counts, start, tz, gender, is_faculty)
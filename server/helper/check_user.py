@@ -1,6 +1,15 @@
+import logging
 from datetime import datetime, timezone, timedelta
 from flask import session
+from config import Config
 from extensions import mysql
+from helper.sessions import (
+    signed_session_lookup,
+    signed_user_claims,
+    store_user_claims,
+)
+
+logger = logging.getLogger(__name__)
 
 
 def get_user_session_info(mfa_required=True):
@@ -24,6 +33,12 @@ def get_user_session_info(mfa_required=True):
 
     Behavior:
     - Checks session last activity timestamp
+    - In SESSION_MODE 'signed', returns the user details stored in the signed
+      cookie without any query while they are newer than
+      SESSION_CLAIMS_MAX_AGE_SECONDS and the session is not revoked.
+      Otherwise reads the session from the cookie, only looks it up in
+      session_mapping if it may have been revoked, and stores the reloaded
+      details in the cookie
     - Verifies user is still active in the database
     - Retrieves user details, club administrations, and tags
     - Returns a default dict if no active session or session expired
@@ -54,7 +69,7 @@ def get_user_session_info(mfa_required=True):
 
     # Check for explicit logout flag
     if session.get("is_logged_out", False):
-        print("GET_USER_SESSION_INFO: Session explicitly logged out")
+        logger.debug("Session explicitly logged out")
         session.clear()
         return default_return
 
@@ -65,32 +80,46 @@ def get_user_session_info(mfa_required=True):
         or datetime.now(timezone.utc) - last_activity
         >= timedelta(minutes=60)  # Extend session timeout to 60 minutes
     ):
-        print("GET_USER_SESSION_INFO: Invalid session - clearing")
+        logger.debug("Invalid or idle session, clearing")
         session.clear()
         return default_return
 
+    # In signed mode, answer from the cookie alone while its claims are fresh
+    if Config.SESSION_MODE == "signed":
+        claims = signed_user_claims(session_id)
+        if claims is not None and (claims["emailVerified"] or not mfa_required):
+            session["last_activity"] = datetime.now(timezone.utc)
+            return claims
+
     # Establish database connection
     try:
         conn = mysql.connection
         cur = conn.cursor()
     except Exception as e:
-        print(f"GET_USER_SESSION_INFO: Database connection error: {e}")
+        logger.exception("Database connection error while checking session")
         session.clear()
         return default_return
 
     try:
+        # In signed mode, trust the signed cookie unless the session may
+        # have been revoked
+        session_data = None
+        if Config.SESSION_MODE == "signed":
+            session_data = signed_session_lookup(cur, session_id)
+
         # Retrieve user email and session details using the session token
-        cur.execute(
-            """SELECT sm.user_email, sm.expires_at, sm.email_verified
-               FROM session_mapping sm
-               WHERE sm.session_id = %s""",
-            (session_id,),
-        )
-        session_data = cur.fetchone()
+        if session_data is None:
+            cur.execute(
+                """SELECT sm.user_email, sm.expires_at, sm.email_verified
+                   FROM session_mapping sm
+                   WHERE sm.session_id = %s""",
+                (session_id,),
+            )
+            session_data = cur.fetchone()
 
         # If no session data is found, clear the session
         if not session_data:
-            print("GET_USER_SESSION_INFO: Session not found")
+            logger.debug("Session not found")
             session.clear()
             return default_return
 
@@ -106,7 +135,7 @@ def get_user_session_info(mfa_required=True):
 
         # Compare with the current UTC time
         if datetime.now(timezone.utc) > expires_at:
-            print("GET_USER_SESSION_INFO: Session expired")
+            logger.debug("Session expired")
             cur.execute(
                 "DELETE FROM session_mapping WHERE session_id = %s", (session_id,)
             )
@@ -127,7 +156,7 @@ def get_user_session_info(mfa_required=True):
 
         # If no user found or user is banned, return default
         if result is None or result[5] == 1:
-            print("GET_USER_SESSION_INFO: No user found or user is banned")
+            logger.debug("No user found or user is banned")
             cur.close()
             session.clear()
             return default_return
@@ -163,7 +192,7 @@ def get_user_session_info(mfa_required=True):
         session["last_activity"] = datetime.now(timezone.utc)
 
         # Construct and return user info
-        return {
+        user_info = {
             "user_id": user_email,
             "name": result[2],
             "emailVerified": email_verified,
@@ -175,8 +204,11 @@ def get_user_session_info(mfa_required=True):
             "semester": result[7],
             "year": result[8],
         }
+        if Config.SESSION_MODE == "signed":
+            store_user_claims(user_info)
+        return user_info
 
     except Exception as e:
-        print(f"GET_USER_SESSION_INFO: Session validation error: {e}")
+        logger.exception("Session validation error")
         session.clear()
         return default_return
@@ -0,0 +1,164 @@
+from helper.bulk_writes import in_placeholders
+
+# user_club_affinity holds, for every user and club that share at least one
+# tag, the number of tags they share: a sparse user x club matrix of tag
+# overlap counts. Writes to user_tags and club_tags apply their delta to it,
+# so suggesting clubs is an index lookup instead of a correlated subquery.
+
+
+def _add_overlap(cur, pairs_query, params):
+    """
+    Add the (user, club, count) rows a query selects to the matrix.
+    """
+    cur.execute(
+        f"""INSERT INTO user_club_affinity (user_id, club_id, shared_tags)
+            {pairs_query}
+            ON DUPLICATE KEY UPDATE user_club_affinity.shared_tags =
+                user_club_affinity.shared_tags + VALUES(shared_tags)""",
+        params,
+    )
+
+
+def _remove_overlap(cur, pairs_query, params, column=None, value=None):
+    """
+    Subtract the (user, club, count) rows a query selects from the matrix,
+    then drop the pairs that no longer share any tag. If every changed pair
+    has the same user or club, column and value say which, so only that
+    row or column is checked.
+    """
+    cur.execute(
+        f"""UPDATE user_club_affinity a
+            INNER JOIN ({pairs_query}) d
+                ON d.user_id = a.user_id AND d.club_id = a.club_id
+            SET a.shared_tags = a.shared_tags - d.shared_tags""",
+        params,
+    )
+    if column is None:
+        cur.execute("DELETE FROM user_club_affinity WHERE shared_tags <= 0")
+    else:
+        cur.execute(
+            f"DELETE FROM user_club_affinity WHERE {column} = %s AND shared_tags <= 0",
+            (value,),
+        )
+
+
+def user_tags_changed(cur, user_id, added, removed):
+    """
+    Update a user's row of the matrix after their tags changed.
+
+    Call in the same transaction as the write, with the sets returned by
+    sync_association.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        user_id (str): Email of the user
+        added (set): Tag IDs the user gained
+        removed (set): Tag IDs the user lost
+    """
+    def pairs(tags):
+        return (
+            f"""SELECT %s AS user_id, club_id, COUNT(*) AS shared_tags
+                FROM club_tags
+                WHERE tag_id IN ({in_placeholders(tags)})
+                GROUP BY club_id""",
+            (user_id, *tags),
+        )
+
+    if added:
+        _add_overlap(cur, *pairs(added))
+    if removed:
+        _remove_overlap(cur, *pairs(removed), "user_id", user_id)
+
+
+def club_tags_changed(cur, club_id, added, removed):
+    """
+    Update a club's column of the matrix after its tags changed.
+
+    Call in the same transaction as the write, with the sets returned by
+    sync_association (or all of a new club's tags as added).
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        club_id (int): Unique identifier of the club
+        added (set): Tag IDs the club gained
+        removed (set): Tag IDs the club lost
+    """
+    def pairs(tags):
+        return (
+            f"""SELECT user_id, %s AS club_id, COUNT(*) AS shared_tags
+                FROM user_tags
+                WHERE tag_id IN ({in_placeholders(tags)})
+                GROUP BY user_id""",
+            (club_id, *tags),
+        )
+
+    if added:
+        _add_overlap(cur, *pairs(added))
+    if removed:
+        _remove_overlap(cur, *pairs(removed), "club_id", club_id)
+
+
+def tag_deleted(cur, tag_id):
+    """
+    Remove a tag's contribution to the matrix, before the tag is deleted.
+
+    Deleting the tag removes its user_tags and club_tags rows by ON DELETE
+    CASCADE, which the hooks above never see.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        tag_id (int): Unique identifier of the tag about to be deleted
+    """
+    _remove_overlap(
+        cur,
+        """SELECT ut.user_id, ct.club_id, COUNT(*) AS shared_tags
+            FROM user_tags ut
+            INNER JOIN club_tags ct ON ct.tag_id = ut.tag_id
+            WHERE ut.tag_id = %s
+            GROUP BY ut.user_id, ct.club_id""",
+        (tag_id,),
+    )
+
+
+def forget_user(cur, user_id):
+    """
+    Drop a user's row of the matrix, after all their tags were deleted.
+    """
+    cur.execute("DELETE FROM user_club_affinity WHERE user_id = %s", (user_id,))
+
+
+def rebuild_affinity(cur):
+    """
+    Recompute the whole matrix from user_tags and club_tags.
+
+    Used to fill the table the first time, and to repair it after writes
+    made outside the application.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+    """
+    cur.execute("DELETE FROM user_club_affinity")
+    cur.execute(
+        """INSERT INTO user_club_affinity (user_id, club_id, shared_tags)
+            SELECT ut.user_id, ct.club_id, COUNT(*)
+            FROM user_tags ut
+            INNER JOIN club_tags ct ON ct.tag_id = ut.tag_id
+            GROUP BY ut.user_id, ct.club_id"""
+    )
+
+
+if __name__ == "__main__":
+    # Fill or repair the table. Run from the server directory:
+    # python -m helper.club_affinity
+    from flask import Flask
+    from config import Config
+    from extensions import mysql
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+    with app.app_context():
+        cur = mysql.connection.cursor()
+        rebuild_affinity(cur)
+        mysql.connection.commit()
+        cur.close()
@@ -0,0 +1,202 @@
+import base64
+import hashlib
+from collections import Counter
+from helper.bulk_writes import in_placeholders, insert_rows
+
+
+def decode_data_url(data_url):
+    """
+    Split a base64 data URL from the client into its prefix and bytes.
+
+    Args:
+        data_url (str): e.g. "data:image/png;base64,iVBOR..."
+
+    Returns:
+        tuple: (prefix, image_bytes)
+
+    Raises:
+        ValueError: If the data URL is malformed
+    """
+    try:
+        prefix, encoded = data_url.split(",", 1)
+        return prefix, base64.b64decode(encoded)
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ValueError("Invalid image") from e
+
+
+def parse_club_tags(tags):
+    """
+    Map the tags picked on the club form to their labels.
+
+    Args:
+        tags (list): e.g. [{"value": "3", "label": "Music"}]
+
+    Returns:
+        dict: Tag ID (int) to label
+
+    Raises:
+        ValueError: If a tag has no numeric value, naming the tag
+    """
+    if not isinstance(tags, list):
+        raise ValueError("Invalid tags")
+    tag_labels = {}
+    for tag in tags:
+        try:
+            tag_labels[int(tag["value"])] = tag["label"]
+        except (KeyError, TypeError, ValueError) as e:
+            label = tag.get("label", tag.get("value")) if isinstance(tag, dict) else tag
+            raise ValueError(f"Tag {label} does not exist") from e
+    return tag_labels
+
+
+def image_hash(image_bytes):
+    """
+    Hash image bytes the same way MySQL's SHA2(image, 256) does.
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def sync_club_logo(cur, club_id, logo):
+    """
+    Replace a club's logo only if the new one is actually different.
+
+    The stored logo is hashed inside MySQL, so the blob is never sent back
+    to the server just to be compared.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        club_id (int): Unique identifier of the club
+        logo (str): New logo as a base64 data URL, or a falsy value to keep
+            the current logo
+
+    Returns:
+        bool: True if the logo was changed
+
+    Raises:
+        ValueError: If the logo is not a valid data URL
+    """
+    if not logo:
+        return False
+    prefix, image_bytes = decode_data_url(logo)
+    cur.execute(
+        "SELECT SHA2(club_logo, 256), logo_prefix FROM club WHERE club_id = %s",
+        (club_id,),
+    )
+    if cur.fetchone() == (image_hash(image_bytes), prefix):
+        return False
+    cur.execute(
+        "UPDATE club SET club_logo = %s, logo_prefix = %s WHERE club_id = %s",
+        (image_bytes, prefix, club_id),
+    )
+    return True
+
+
+def sync_club_photos(cur, club_id, images):
+    """
+    Make a club's photos match a new set, matching photos by content.
+
+    Photos are compared by prefix and SHA-256 of their bytes, so re-saving
+    the club without touching its photos writes nothing. Only photos that
+    were removed are deleted and only new ones are inserted.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        club_id (int): Unique identifier of the club
+        images (list): The complete new set of photos, as dicts with an
+            "image" base64 data URL
+
+    Returns:
+        tuple: (number of photos added, number of photos removed)
+
+    Raises:
+        ValueError: If any image is not a valid data URL
+    """
+    wanted = {}
+    for image in images:
+        prefix, image_bytes = decode_data_url(image["image"])
+        wanted.setdefault((image_hash(image_bytes), prefix), []).append(image_bytes)
+    wanted_counts = Counter({key: len(copies) for key, copies in wanted.items()})
+
+    cur.execute(
+        """SELECT club_photo_id, SHA2(image, 256), image_prefix
+            FROM club_photo
+            WHERE club_id = %s""",
+        (club_id,),
+    )
+    removed_ids = []
+    existing_counts = Counter()
+    for photo_id, photo_hash, prefix in cur.fetchall():
+        key = (photo_hash, prefix)
+        if existing_counts[key] < wanted_counts[key]:
+            existing_counts[key] += 1
+        else:
+            removed_ids.append(photo_id)
+
+    if removed_ids:
+        cur.execute(
+            f"DELETE FROM club_photo WHERE club_photo_id IN ({in_placeholders(removed_ids)})",
+            tuple(removed_ids),
+        )
+    added = [
+        (club_id, image_bytes, prefix)
+        for (photo_hash, prefix), copies in wanted.items()
+        for image_bytes in copies[existing_counts[(photo_hash, prefix)] :]
+    ]
+    insert_rows(cur, "club_photo", ["club_id", "image", "image_prefix"], added)
+    return len(added), len(removed_ids)
+
+
+def sync_club_admins(cur, club_id, admins):
+    """
+    Make a club's active admins match a new set.
+
+    Admins who were removed are deactivated rather than deleted, admins who
+    were previously deactivated are reactivated, and only admins the club
+    has never had are inserted. Admins whose status doesn't change are not
+    written at all.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        club_id (int): Unique identifier of the club
+        admins (Iterable): Emails of the complete new set of admins
+    """
+    cur.execute(
+        "SELECT user_id, is_active FROM club_admin WHERE club_id = %s",
+        (club_id,),
+    )
+    existing = {}
+    for user_id, is_active in cur.fetchall():
+        # A user may have several rows; treat them as active if any one is
+        existing[user_id.lower()] = existing.get(user_id.lower(), False) or bool(
+            is_active
+        )
+    wanted = {admin.lower(): admin for admin in admins}
+
+    deactivated = [
+        user_id for user_id, active in existing.items() if active and user_id not in wanted
+    ]
+    reactivated = [
+        user_id
+        for user_id, active in existing.items()
+        if not active and user_id in wanted
+    ]
+    if deactivated:
+        cur.execute(
+            f"""UPDATE club_admin SET is_active = 0
+                WHERE club_id = %s
+                    AND user_id IN ({in_placeholders(deactivated)})""",
+            (club_id, *deactivated),
+        )
+    if reactivated:
+        cur.execute(
+            f"""UPDATE club_admin SET is_active = 1
+                WHERE club_id = %s
+                    AND user_id IN ({in_placeholders(reactivated)})""",
+            (club_id, *reactivated),
+        )
+    insert_rows(
+        cur,
+        "club_admin",
+        ["user_id", "club_id", "is_active"],
+        [(admin, club_id, 1) for key, admin in wanted.items() if key not in existing],
+    )
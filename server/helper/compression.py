@@ -0,0 +1,209 @@
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+# Only text-like bodies are worth compressing; images are already compressed
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "text/",
+)
+
+
+class CompressedBodyCache:
+    """
+    LRU cache of compressed bodies, keyed by ETag and encoding.
+
+    The same payload (e.g. a popular semester calendar, or a report many
+    faculty open) is compressed once and then served from here. Keys are
+    hashes of the uncompressed body, so different users only ever share an
+    entry when they would get exactly the same bytes anyway.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, key, body, max_bytes):
+        if len(body) > max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+compressed_bodies = CompressedBodyCache()
+
+
+def available_encodings():
+    """
+    Encodings this server can produce, most preferred first.
+    """
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return encodings
+
+
+def compress(body, encoding, config):
+    if encoding == "br":
+        return brotli.compress(body, quality=config["COMPRESS_BROTLI_QUALITY"])
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=config["COMPRESS_ZSTD_LEVEL"]).compress(
+            body
+        )
+    compressor = zlib.compressobj(config["COMPRESS_GZIP_LEVEL"], zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def compress_stream(chunks, encoding, config):
+    """
+    Compress a streamed body chunk by chunk, so exports start downloading
+    before the whole report has been read.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=config["COMPRESS_BROTLI_QUALITY"])
+        compress_chunk, finish = compressor.process, compressor.finish
+    elif encoding == "zstd":
+        compressor = zstandard.ZstdCompressor(
+            level=config["COMPRESS_ZSTD_LEVEL"]
+        ).compressobj()
+        compress_chunk, finish = compressor.compress, compressor.flush
+    else:
+        compressor = zlib.compressobj(config["COMPRESS_GZIP_LEVEL"], zlib.DEFLATED, 31)
+        compress_chunk, finish = compressor.compress, compressor.flush
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = compress_chunk(chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Let the wrapped generator run its cleanup (e.g. closing cursors)
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def weaken_etag(response):
+    """
+    Mark a compressed response's ETag as weak.
+
+    A strong ETag promises byte-identical bodies, which a compressed body
+    and the identity one are not (RFC 9110 section 8.8.3), so caches and
+    Range requests could mix them up. If-None-Match is compared weakly, so
+    clients holding either form still get 304 responses.
+    """
+    etag, is_weak = response.get_etag()
+    if etag and not is_weak:
+        response.set_etag(etag, weak=True)
+
+
+class Compression:
+    """
+    Flask extension that compresses responses and tags them with ETags.
+
+    The encoding is negotiated from Accept-Encoding: brotli and zstd are used
+    when their packages are installed and the client accepts them, gzip
+    otherwise. Bodies smaller than COMPRESS_MIN_SIZE go out as they are,
+    since compression would barely shrink them.
+
+    Successful GET responses get a weak ETag (a hash of the uncompressed
+    body), so a client sending If-None-Match gets a 304 without a body, and
+    compressed bodies are cached by ETag in COMPRESS_CACHE_BYTES of memory.
+    Streamed responses, like report exports, are compressed as they stream;
+    Server-Sent Event streams are sent uncompressed.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+        app.config.setdefault("COMPRESS_GZIP_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BROTLI_QUALITY", 5)
+        app.config.setdefault("COMPRESS_ZSTD_LEVEL", 3)
+        app.config.setdefault("COMPRESS_CACHE_BYTES", 32 * 1024 * 1024)
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        config = current_app.config
+        if (
+            response.status_code < 200
+            or response.status_code >= 300
+            or response.status_code in (204, 206)
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_MIMETYPES)
+            # Each event must reach the client when it is written, not when
+            # the compressor has enough to flush
+            or response.mimetype == "text/event-stream"
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(available_encodings())
+
+        if response.is_streamed:
+            if encoding is None or response.direct_passthrough:
+                return response
+            response.response = compress_stream(response.response, encoding, config)
+            response.headers["Content-Encoding"] = encoding
+            response.headers.pop("Content-Length", None)
+            weaken_etag(response)
+            return response
+
+        body = response.get_data()
+        if request.method == "GET" and response.status_code == 200:
+            if "ETag" not in response.headers:
+                etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+                response.set_etag(etag, weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+
+        if encoding is None or len(body) < config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        etag = response.get_etag()[0]
+        key = (etag, encoding) if etag else None
+        compressed = compressed_bodies.get(key) if key else None
+        if compressed is None:
+            compressed = compress(body, encoding, config)
+            if key:
+                compressed_bodies.put(key, compressed, config["COMPRESS_CACHE_BYTES"])
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        weaken_etag(response)
+        return response
+
+
+compression = Compression()
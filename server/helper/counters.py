@@ -0,0 +1,179 @@
+from config import Config
+from helper.bulk_writes import in_placeholders
+
+# event.rsvp_count and club.subscriber_count hold how many active users are
+# going to an event and subscribed to a club, the numbers the reports used
+# to COUNT over rsvp and user_subscription. Writes adjust them in the same
+# transaction; reconcile_counters repairs any drift.
+
+
+def _lock_user(cur, user_id):
+    """
+    Lock the user's row until commit, so their concurrent RSVP or
+    subscription changes run one after the other. Locking the RSVP or
+    subscription row itself isn't enough: before the first one is inserted
+    there is no row, only a gap lock, which two requests (a double click)
+    can both hold before deadlocking on their inserts.
+    """
+    cur.execute("SELECT email FROM users WHERE email = %s FOR UPDATE", (user_id,))
+
+
+def lock_rsvp(cur, event_id, user_id):
+    """
+    Whether a user is going to an event, locking the user until commit so
+    a concurrent change can't make the count adjustment miscount.
+    """
+    _lock_user(cur, user_id)
+    # A locking read, so it sees a change committed while waiting above
+    cur.execute(
+        """SELECT is_active = 1 AND is_yes = 1 FROM rsvp
+            WHERE event_id = %s AND user_id = %s
+            FOR UPDATE""",
+        (event_id, user_id),
+    )
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def lock_subscription(cur, club_id, user_id):
+    """
+    Whether a user is subscribed to a club, locking the user until commit.
+    """
+    _lock_user(cur, user_id)
+    cur.execute(
+        """SELECT is_active = 1 AND subscribed_or_blocked = 1 FROM user_subscription
+            WHERE club_id = %s AND email = %s
+            FOR UPDATE""",
+        (club_id, user_id),
+    )
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def rsvp_changed(cur, event_id, was_going, going):
+    """
+    Adjust an event's RSVP count after one user's RSVP changed.
+
+    Args:
+        cur (mysql.connection.cursor): Cursor of the RSVP's transaction
+        event_id (int): Unique identifier of the event
+        was_going (bool): From lock_rsvp, before the change
+        going (bool): Whether the user is going now
+    """
+    if was_going != going:
+        cur.execute(
+            "UPDATE event SET rsvp_count = rsvp_count + %s WHERE event_id = %s",
+            (1 if going else -1, event_id),
+        )
+
+
+def subscription_changed(cur, club_id, was_subscribed, subscribed):
+    """
+    Adjust a club's subscriber count after one user's subscription changed.
+    """
+    if was_subscribed != subscribed:
+        cur.execute(
+            "UPDATE club SET subscriber_count = subscriber_count + %s WHERE club_id = %s",
+            (1 if subscribed else -1, club_id),
+        )
+
+
+def _recount_events(cur, scope, params):
+    """
+    Recompute the RSVP counts of the events whose ID matches scope.
+    """
+    cur.execute(
+        f"""UPDATE event e
+            LEFT JOIN (
+                SELECT r.event_id, COUNT(*) AS going
+                FROM rsvp r
+                INNER JOIN users u ON u.email = r.user_id
+                WHERE r.event_id {scope}
+                    AND r.is_active = 1
+                    AND r.is_yes = 1
+                    AND u.is_active = 1
+                GROUP BY r.event_id
+            ) c ON c.event_id = e.event_id
+            SET e.rsvp_count = COALESCE(c.going, 0)
+            WHERE e.event_id {scope}
+                AND e.rsvp_count <> COALESCE(c.going, 0)""",
+        tuple(params) * 2,
+    )
+    return cur.rowcount
+
+
+def _recount_clubs(cur, scope, params):
+    """
+    Recompute the subscriber counts of the clubs whose ID matches scope.
+    """
+    cur.execute(
+        f"""UPDATE club cl
+            LEFT JOIN (
+                SELECT us.club_id, COUNT(*) AS subscribers
+                FROM user_subscription us
+                INNER JOIN users u ON u.email = us.email
+                WHERE us.club_id {scope}
+                    AND us.is_active = 1
+                    AND us.subscribed_or_blocked = 1
+                    AND u.is_active = 1
+                GROUP BY us.club_id
+            ) c ON c.club_id = cl.club_id
+            SET cl.subscriber_count = COALESCE(c.subscribers, 0)
+            WHERE cl.club_id {scope}
+                AND cl.subscriber_count <> COALESCE(c.subscribers, 0)""",
+        tuple(params) * 2,
+    )
+    return cur.rowcount
+
+
+def recount_user(cur, user_id):
+    """
+    Recount the events and clubs a user has RSVPs or subscriptions for,
+    after they were activated or deactivated.
+    """
+    cur.execute("SELECT DISTINCT event_id FROM rsvp WHERE user_id = %s", (user_id,))
+    event_ids = [row[0] for row in cur.fetchall()]
+    if event_ids:
+        _recount_events(cur, f"IN ({in_placeholders(event_ids)})", event_ids)
+    cur.execute(
+        "SELECT DISTINCT club_id FROM user_subscription WHERE email = %s", (user_id,)
+    )
+    club_ids = [row[0] for row in cur.fetchall()]
+    if club_ids:
+        _recount_clubs(cur, f"IN ({in_placeholders(club_ids)})", club_ids)
+
+
+def reconcile_counters(conn, batch_size=None):
+    """
+    Recompute every counter, repairing any drift.
+
+    Events and clubs are recounted in ranges of batch_size IDs, each its
+    own short transaction, so RSVPs and subscriptions keep going while the
+    job runs.
+
+    Args:
+        conn (MySQLdb.connections.Connection): Database connection
+        batch_size (int, optional): IDs per batch (default COUNTER_RECONCILE_BATCH_SIZE)
+
+    Returns:
+        dict: {"events": int, "clubs": int}, how many counts were repaired
+    """
+    batch_size = batch_size or Config.COUNTER_RECONCILE_BATCH_SIZE
+    repaired = {}
+    cur = conn.cursor()
+    try:
+        for name, table, column, recount in (
+            ("events", "event", "event_id", _recount_events),
+            ("clubs", "club", "club_id", _recount_clubs),
+        ):
+            cur.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+            last_id = cur.fetchone()[0]
+            repaired[name] = 0
+            for first in range(0, last_id + 1, batch_size):
+                repaired[name] += recount(
+                    cur, "BETWEEN %s AND %s", (first, first + batch_size - 1)
+                )
+                conn.commit()
+    finally:
+        cur.close()
+    return repaired
@@ -0,0 +1,255 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport):
+    """
+    Rate limit counters shared by every worker process on one host.
+
+    Flask-Limiter's default memory storage keeps separate counters in each
+    gunicorn worker, so a "5 per minute" limit really allows 5 per minute
+    per worker. This storage keeps the counters in a small SQLite database
+    instead, which every worker on the host opens, without needing Redis or
+    Memcached.
+
+    Use it with RATELIMIT_STORAGE_URI = "sqlite:////var/run/sharc/ratelimit.sqlite3"
+    (absolute path, the default is in the system temp directory) or
+    "sqlite:///ratelimit.sqlite3" (relative to the working directory). It
+    supports the fixed-window and sliding-window-counter strategies; both
+    keep one row per key and window rather than one row per hit, so memory
+    stays proportional to the number of active clients.
+
+    Expired counters are compacted every RATELIMIT_SQLITE_COMPACT_SECONDS,
+    and if more than max_keys counters are live the ones closest to expiring
+    are dropped, so the file can't grow without bound.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(
+        self,
+        uri,
+        wrap_exceptions=False,
+        max_keys=100000,
+        compact_seconds=60,
+        **options,
+    ):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri.split("://", 1)[1][1:] or "ratelimit.sqlite3"
+        self.max_keys = int(max_keys)
+        self.compact_seconds = float(compact_seconds)
+        self.local = threading.local()
+        self.compacted_at = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS counters (
+                    key TEXT PRIMARY KEY,
+                    count INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                ) WITHOUT ROWID"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS counters_expires_at ON counters (expires_at)"
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def conn(self):
+        # SQLite connections can't be shared between threads
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def transaction(self):
+        return _Transaction(self.conn)
+
+    def _get(self, conn, key, now):
+        row = conn.execute(
+            "SELECT count, expires_at FROM counters WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        return row if row else (0, 0)
+
+    def _incr(self, conn, key, expiry, now, amount, elastic_expiry=False):
+        conn.execute(
+            """INSERT INTO counters (key, count, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    count = CASE WHEN expires_at > ? THEN count + excluded.count
+                                 ELSE excluded.count END,
+                    expires_at = CASE WHEN expires_at > ? AND NOT ? THEN expires_at
+                                      ELSE excluded.expires_at END""",
+            (key, amount, now + expiry, now, now, elastic_expiry),
+        )
+        return self._get(conn, key, now)[0]
+
+    def compact(self, conn=None, now=None):
+        """
+        Delete expired counters, and the soonest-expiring ones past max_keys.
+        """
+        now = now or time.time()
+        conn = conn or self.conn
+        conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+        conn.execute(
+            """DELETE FROM counters WHERE key IN (
+                SELECT key FROM counters
+                ORDER BY expires_at DESC
+                LIMIT -1 OFFSET ?
+            )""",
+            (self.max_keys,),
+        )
+        self.compacted_at = now
+
+    def _maybe_compact(self, conn, now):
+        if now - self.compacted_at >= self.compact_seconds:
+            self.compact(conn, now)
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        with self.transaction() as conn:
+            self._maybe_compact(conn, now)
+            return self._incr(conn, key, expiry, now, amount, elastic_expiry)
+
+    def get(self, key):
+        return self._get(self.conn, key, time.time())[0]
+
+    def get_expiry(self, key):
+        expires_at = self._get(self.conn, key, time.time())[1]
+        return expires_at or time.time()
+
+    def check(self):
+        try:
+            self.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        with self.transaction() as conn:
+            return conn.execute("DELETE FROM counters").rowcount
+
+    def clear(self, key):
+        with self.transaction() as conn:
+            conn.execute(
+                "DELETE FROM counters WHERE key = ? OR key LIKE ? ESCAPE '\\'",
+                (key, _escape_like(key) + "/%"),
+            )
+
+    def _window_keys(self, key, expiry, now):
+        window = math.floor(now / expiry)
+        elapsed = now - window * expiry
+        return f"{key}/{window - 1}", f"{key}/{window}", elapsed
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        previous_key, current_key, elapsed = self._window_keys(key, expiry, now)
+        conn = self.conn
+        previous_count = self._get(conn, previous_key, now)[0]
+        current_count = self._get(conn, current_key, now)[0]
+        # The previous window's weight falls to zero as the current one ends
+        return (
+            previous_count,
+            expiry - elapsed,
+            current_count,
+            2 * expiry - elapsed,
+        )
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        previous_key, current_key, elapsed = self._window_keys(key, expiry, now)
+        with self.transaction() as conn:
+            self._maybe_compact(conn, now)
+            previous_count = self._get(conn, previous_key, now)[0]
+            current_count = self._get(conn, current_key, now)[0]
+            weighted = previous_count * (expiry - elapsed) / expiry + current_count
+            if math.floor(weighted) + amount > limit:
+                return False
+            # Keep the counter through the next window, where it is "previous"
+            self._incr(conn, current_key, 2 * expiry - elapsed, now, amount)
+            return True
+
+    def clear_sliding_window(self, key, expiry):
+        self.clear(key)
+
+
+class _Transaction:
+    """
+    BEGIN IMMEDIATE ... COMMIT, so check-and-increment is atomic across
+    worker processes.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def benchmark(requests=20000, clients=500, path="ratelimit-benchmark.sqlite3"):
+    """
+    Measure the limiter overhead per request for this storage.
+
+    Runs the sliding-window-counter strategy against SQLiteStorage and
+    limits' in-memory storage for comparison, spreading requests across
+    a number of client keys.
+
+    Args:
+        requests (int): Rate limit checks to run per storage
+        clients (int): Distinct client keys
+        path (str): Scratch database file, deleted afterwards
+
+    Returns:
+        dict: Microseconds per check for each storage
+    """
+    from limits import RateLimitItemPerMinute
+    from limits.storage import MemoryStorage
+    from limits.strategies import SlidingWindowCounterRateLimiter
+
+    item = RateLimitItemPerMinute(1000000)
+    results = {}
+    storages = {
+        "sqlite": lambda: SQLiteStorage(f"sqlite:///{path}"),
+        "memory": lambda: MemoryStorage(),
+    }
+    try:
+        for name, make_storage in storages.items():
+            limiter = SlidingWindowCounterRateLimiter(make_storage())
+            started = time.perf_counter()
+            for i in range(requests):
+                limiter.hit(item, f"client-{i % clients}")
+            elapsed = time.perf_counter() - started
+            results[name] = round(elapsed / requests * 1000000, 1)
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return {"microsecondsPerCheck": results}
+
+
+if __name__ == "__main__":
+    # Run from the server directory: python -m helper.limiter_storage
+    print(benchmark())
@@ -0,0 +1,417 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from config import Config
+from helper.bulk_writes import in_placeholders
+
+logger = logging.getLogger(__name__)
+
+# Topics a single stream may follow
+MAX_TOPICS = 20
+
+# Updates a stream may fall behind by before it is closed; the client
+# reconnects with Last-Event-ID and catches up from the live_update table
+QUEUE_LENGTH = 200
+
+# Rows read from live_update per poll
+POLL_BATCH = 1000
+
+# Seconds an ID skipped by the poller is rechecked, in case its transaction
+# commits after a later one
+GAP_SECONDS = 5
+
+# Seconds between deletions of updates older than LIVE_UPDATE_RETENTION_MINUTES
+PRUNE_INTERVAL_SECONDS = 60
+
+
+def school_topic(school_id):
+    return f"school:{school_id}"
+
+
+def event_topic(event_id):
+    return f"event:{int(event_id)}"
+
+
+def publish(cur, topic, kind, data):
+    """
+    Record an update for the streams following a topic.
+
+    The row is written in the caller's transaction, so the update goes out
+    only if the write it describes is committed, and every worker's poller
+    sees it whichever worker made the write.
+
+    Args:
+        cur (mysql.connection.cursor): Cursor of the write's transaction
+        topic (str): From school_topic or event_topic
+        kind (str): SSE event name, e.g. 'comment'
+        data (dict): JSON payload
+    """
+    cur.execute(
+        """INSERT INTO live_update (topic, kind, payload, created_at)
+            VALUES (%s, %s, %s, UTC_TIMESTAMP())""",
+        (topic, kind, json.dumps(data)),
+    )
+
+
+def format_update(update_id, kind, payload):
+    """
+    One update in the text/event-stream format.
+    """
+    return f"id: {update_id}\nevent: {kind}\ndata: {payload}\n\n".encode()
+
+
+class Subscription:
+    """
+    A stream's queue of updates, filled by the poller thread.
+    """
+
+    def __init__(self, topics):
+        self.topics = frozenset(topics)
+        self.updates = deque()
+        self.overflowed = False
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def push(self, update):
+        with self.condition:
+            if len(self.updates) >= QUEUE_LENGTH:
+                self.overflowed = True
+            else:
+                self.updates.append(update)
+            self.condition.notify()
+
+    def wait(self, timeout):
+        """
+        Take the queued updates, waiting up to timeout seconds for one.
+
+        Returns:
+            list: (id, kind, payload) tuples, empty if none arrived
+        """
+        with self.condition:
+            if not self.updates and not self.overflowed:
+                self.condition.wait(timeout)
+            updates = list(self.updates)
+            self.updates.clear()
+            return updates
+
+
+class LiveUpdates:
+    """
+    Fan updates from the live_update table out to this process's streams.
+
+    One poller thread per process reads new rows every
+    LIVE_UPDATE_POLL_SECONDS and pushes each one to the subscriptions
+    following its topic, so the database sees one query per second per
+    worker however many clients are connected. The thread starts with the
+    first subscription. Streams are capped at LIVE_UPDATE_MAX_STREAMS per
+    process, since each one holds a worker thread while it is open.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_topic = {}
+        self.streams = 0
+        self.last_id = None
+        self.gaps = {}
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def subscribe(self, topics):
+        """
+        Start receiving updates for topics.
+
+        Returns:
+            Subscription or None: None if the process is at
+                LIVE_UPDATE_MAX_STREAMS
+        """
+        subscription = Subscription(topics)
+        with self.lock:
+            if self.streams >= Config.LIVE_UPDATE_MAX_STREAMS:
+                return None
+            self.streams += 1
+            for topic in subscription.topics:
+                self.by_topic.setdefault(topic, set()).add(subscription)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self.streams -= 1
+            for topic in subscription.topics:
+                followers = self.by_topic.get(topic)
+                if followers is not None:
+                    followers.discard(subscription)
+                    if not followers:
+                        del self.by_topic[topic]
+
+    def dispatch(self, rows):
+        """
+        Push (id, topic, kind, payload) rows to the subscriptions following
+        their topics.
+        """
+        for update_id, topic, kind, payload in rows:
+            with self.lock:
+                followers = list(self.by_topic.get(topic, ()))
+            for subscription in followers:
+                subscription.push((update_id, kind, payload))
+
+    def poll(self, cur):
+        """
+        Dispatch the rows committed since the last poll.
+
+        IDs are assigned when a row is inserted but become visible when its
+        transaction commits, so a lower ID can turn up after a higher one.
+        IDs skipped over are rechecked by ID for GAP_SECONDS before they are
+        given up on (a rolled back insert never turns up), while new rows
+        are read forward from the highest ID seen.
+
+        Returns:
+            int: New rows read, POLL_BATCH if there may be more waiting
+        """
+        now = time.monotonic()
+        if self.last_id is None:
+            # Start from now; older updates are only replayed on request
+            cur.execute("SELECT COALESCE(MAX(id), 0) FROM live_update")
+            self.last_id = cur.fetchone()[0]
+            self.ready.set()
+        self.gaps = {
+            update_id: since
+            for update_id, since in self.gaps.items()
+            if now - since < GAP_SECONDS
+        }
+        late_rows = []
+        if self.gaps:
+            gap_ids = sorted(self.gaps)
+            cur.execute(
+                f"""SELECT id, topic, kind, payload
+                    FROM live_update
+                    WHERE id IN ({in_placeholders(gap_ids)})
+                    ORDER BY id""",
+                tuple(gap_ids),
+            )
+            late_rows = list(cur.fetchall())
+            for row in late_rows:
+                del self.gaps[row[0]]
+        cur.execute(
+            """SELECT id, topic, kind, payload
+                FROM live_update
+                WHERE id > %s
+                ORDER BY id
+                LIMIT %s""",
+            (self.last_id, POLL_BATCH),
+        )
+        rows = cur.fetchall()
+        for row in rows:
+            update_id = row[0]
+            if update_id - self.last_id <= POLL_BATCH:
+                for missing in range(self.last_id + 1, update_id):
+                    self.gaps[missing] = now
+            self.last_id = update_id
+        self.dispatch(late_rows + list(rows))
+        return len(rows)
+
+    def prune(self, cur):
+        cur.execute(
+            """DELETE FROM live_update
+                WHERE created_at < UTC_TIMESTAMP() - INTERVAL %s MINUTE
+                LIMIT 10000""",
+            (Config.LIVE_UPDATE_RETENTION_MINUTES,),
+        )
+
+    def run(self):
+        # Create an application context without importing main.py
+        from flask import Flask
+        from extensions import mysql
+
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        mysql.init_app(app)
+
+        pruned_at = 0
+        while not self.stop_event.is_set():
+            # The context keeps one connection open between polls; leaving
+            # it after an error closes the connection so the next one is fresh
+            with app.app_context():
+                try:
+                    cur = mysql.connection.cursor()
+                    while not self.stop_event.is_set():
+                        if time.monotonic() - pruned_at > PRUNE_INTERVAL_SECONDS:
+                            self.prune(cur)
+                            pruned_at = time.monotonic()
+                        read = self.poll(cur)
+                        # Ends the snapshot, so the next poll sees new rows
+                        mysql.connection.commit()
+                        if read < POLL_BATCH:
+                            self.stop_event.wait(Config.LIVE_UPDATE_POLL_SECONDS)
+                except Exception:
+                    logger.exception("Error polling live updates")
+            self.stop_event.wait(Config.LIVE_UPDATE_POLL_SECONDS)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+live_updates = LiveUpdates()
+
+
+def replay(cur, topics, after_id):
+    """
+    Updates for topics after after_id, for a client reconnecting with
+    Last-Event-ID.
+
+    Returns:
+        list: (id, kind, payload) tuples in order, at most QUEUE_LENGTH
+    """
+    cur.execute(
+        f"""SELECT id, kind, payload
+            FROM live_update
+            WHERE id > %s AND topic IN ({in_placeholders(topics)})
+            ORDER BY id
+            LIMIT %s""",
+        (after_id, *topics, QUEUE_LENGTH),
+    )
+    return list(cur.fetchall())
+
+
+def stream(subscription, backlog=()):
+    """
+    Body of a text/event-stream response.
+
+    Sends backlog, then each update as it arrives, with a comment line
+    every LIVE_UPDATE_HEARTBEAT_SECONDS so proxies keep the connection
+    open. Ends after LIVE_UPDATE_STREAM_SECONDS, or when the client falls
+    more than QUEUE_LENGTH updates behind; browsers reconnect on their own
+    with Last-Event-ID, which also re-checks the session. The caller
+    unsubscribes when the response is closed.
+    """
+    yield f"retry: {Config.LIVE_UPDATE_RETRY_MS}\n\n".encode()
+    replayed = set()
+    for update_id, kind, payload in backlog:
+        yield format_update(update_id, kind, payload)
+        replayed.add(update_id)
+    deadline = time.monotonic() + Config.LIVE_UPDATE_STREAM_SECONDS
+    while time.monotonic() < deadline and not subscription.overflowed:
+        updates = subscription.wait(Config.LIVE_UPDATE_HEARTBEAT_SECONDS)
+        if not updates:
+            yield b": keepalive\n\n"
+        for update_id, kind, payload in updates:
+            # The backlog and the poller may both have an update
+            if update_id not in replayed:
+                yield format_update(update_id, kind, payload)
+
+
+def _rss_kilobytes():
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def benchmark(connections=1000, topics=50, updates=200):
+    """
+    Measure what idle streams cost a worker, and how fast updates fan out.
+
+    Opens connections streams, each consumed by its own thread the way a
+    threaded worker writes a response, spread over topics event topics.
+    Then dispatches updates round-robin across the topics and times how
+    long each takes to come out of every follower's stream. Runs without a
+    database or poller; memory is read from /proc, so it needs Linux.
+
+    Args:
+        connections (int): Idle streams to open
+        topics (int): Event topics they follow
+        updates (int): Updates to dispatch
+
+    Returns:
+        dict: Memory per idle stream and fan-out latency
+    """
+    # Stand in for the poller so subscribe doesn't start it
+    live_updates.thread = threading.current_thread()
+    limit = Config.LIVE_UPDATE_MAX_STREAMS
+    Config.LIVE_UPDATE_MAX_STREAMS = limit + connections
+    latencies = []
+    latencies_lock = threading.Lock()
+    followers = [
+        connections // topics + (1 if topic < connections % topics else 0)
+        for topic in range(topics)
+    ]
+    expected = sum(followers[update % topics] for update in range(updates))
+    all_delivered = threading.Event()
+
+    def serve(subscription):
+        for chunk in stream(subscription):
+            received = time.perf_counter()
+            for line in chunk.decode().splitlines():
+                if line.startswith("data: "):
+                    with latencies_lock:
+                        latencies.append(received - float(line[6:]))
+                        if len(latencies) == expected:
+                            all_delivered.set()
+        live_updates.unsubscribe(subscription)
+
+    rss_before = _rss_kilobytes()
+    subscriptions = []
+    workers = []
+    try:
+        for connection in range(connections):
+            subscription = live_updates.subscribe([event_topic(connection % topics)])
+            subscriptions.append(subscription)
+            worker = threading.Thread(target=serve, args=(subscription,), daemon=True)
+            worker.start()
+            workers.append(worker)
+        time.sleep(1)
+        rss_idle = _rss_kilobytes()
+
+        started = time.perf_counter()
+        for update in range(updates):
+            live_updates.dispatch(
+                [
+                    (
+                        update + 1,
+                        event_topic(update % topics),
+                        "rsvp",
+                        repr(time.perf_counter()),
+                    )
+                ]
+            )
+        all_delivered.wait(60)
+        fanout_seconds = time.perf_counter() - started
+    finally:
+        # Ending the streams the way a client falling behind does
+        for subscription in subscriptions:
+            with subscription.condition:
+                subscription.overflowed = True
+                subscription.condition.notify()
+        for worker in workers:
+            worker.join()
+        Config.LIVE_UPDATE_MAX_STREAMS = limit
+        live_updates.thread = None
+
+    latencies.sort()
+    return {
+        "connections": connections,
+        "kilobytesPerIdleStream": round((rss_idle - rss_before) / connections, 1),
+        "delivered": len(latencies),
+        "expected": expected,
+        "fanoutSeconds": round(fanout_seconds, 3),
+        "latencyMilliseconds": {
+            "p50": round(latencies[len(latencies) // 2] * 1000, 2),
+            "p99": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        },
+    }
+
+
+if __name__ == "__main__":
+    # Run from the server directory: python -m helper.live_updates
+    print(benchmark())
@@ -0,0 +1,148 @@
+import threading
+from functools import wraps
+from flask import current_app, jsonify, request, session
+from flask_limiter.util import get_remote_address
+from extensions import limiter
+
+
+def user_rate_key():
+    """
+    Rate limit key for the current client.
+
+    Signed-in users are limited per account, so users behind one campus NAT
+    address don't share a budget; anonymous requests fall back to the
+    remote address. The email comes from the signed session cookie, so it
+    can't be changed by the client and no database lookup is needed.
+    """
+    return session.get("user_email") or get_remote_address()
+
+
+class ConcurrencyGate:
+    """
+    Cap how many expensive requests this process serves at once.
+
+    Unlike the rate limits, which bound how much each user asks for over a
+    minute, the gate bounds the total amount of expensive work in flight.
+    Requests over EXPENSIVE_ROUTE_CONCURRENCY are turned away immediately
+    with a 503 instead of queueing behind the ones already running, so a
+    spike can't tie up every worker thread and database connection.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+
+    def try_enter(self, limit):
+        with self.lock:
+            if self.running >= limit:
+                return False
+            self.running += 1
+            return True
+
+    def leave(self):
+        with self.lock:
+            self.running -= 1
+
+
+# Expensive requests running in this process
+expensive_requests = ConcurrencyGate()
+
+
+def overloaded_response():
+    """
+    Response for a request shed because the server is at capacity.
+    """
+    response = jsonify(
+        {"error": "The server is busy. Please try again shortly.", "status": "busy"}
+    )
+    response.headers["Retry-After"] = str(
+        current_app.config["LOAD_SHED_RETRY_AFTER_SECONDS"]
+    )
+    return response, 503
+
+
+def rate_limited_response(e):
+    """
+    JSON body for requests over a rate limit.
+
+    Flask-Limiter adds the Retry-After header itself when
+    RATELIMIT_HEADERS_ENABLED is set.
+    """
+    return (
+        jsonify(
+            {
+                "error": "Too many requests. Please slow down and try again shortly.",
+                "status": "rate_limited",
+                "limit": str(e.description),
+            }
+        ),
+        429,
+    )
+
+
+def expensive_route(limit, cost=1):
+    """
+    Protect an expensive route with rate limits and the concurrency gate.
+
+    Each request counts once against the route's own limit, and is charged
+    cost against EXPENSIVE_ROUTE_USER_LIMIT, a token budget shared by every
+    expensive route so hopping between them doesn't help. Requests over
+    either get a 429; requests that pass but find the server at
+    EXPENSIVE_ROUTE_CONCURRENCY get a 503. Both include Retry-After.
+
+    A streamed response keeps its place in the gate until it has been sent,
+    since its body is produced after the view returns.
+
+    Apply it below the route decorator:
+
+        @events_bp.route("/events", methods=["GET"])
+        @expensive_route("60 per minute", cost=events_cost)
+        def get_events():
+
+    Args:
+        limit (str): Per-user request limit for this route, in Flask-Limiter
+            notation
+        cost (int or callable): Tokens charged per request against the
+            shared budget; a callable is called with no arguments during
+            the request, so the cost can depend on the request's parameters
+
+    Returns:
+        function: Decorator for the view function
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def gated_view(*args, **kwargs):
+            if not expensive_requests.try_enter(
+                current_app.config["EXPENSIVE_ROUTE_CONCURRENCY"]
+            ):
+                return overloaded_response()
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except BaseException:
+                expensive_requests.leave()
+                raise
+            if response.is_streamed:
+                response.call_on_close(expensive_requests.leave)
+            else:
+                expensive_requests.leave()
+            return response
+
+        # Flask-Limiter checks both limits before gated_view runs, so users
+        # over their budget never take a slot
+        gated_view = limiter.shared_limit(
+            lambda: current_app.config["EXPENSIVE_ROUTE_USER_LIMIT"],
+            scope="expensive",
+            key_func=user_rate_key,
+            cost=cost,
+        )(gated_view)
+        return limiter.limit(limit, key_func=user_rate_key)(gated_view)
+
+    return decorator
+
+
+def events_cost():
+    """
+    Cost of an events request: loading images is several times more work.
+    """
+    return 1 if request.args.get("images") == "false" else 5
@@ -0,0 +1,145 @@
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, has_request_context, request
+
+# Incoming request IDs are only reused if they look like one of ours
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Records waiting for the writer thread
+_queue = queue.SimpleQueue()
+_listener = None
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    Tag records with the request they were logged from, and sample debug
+    output.
+
+    Debug records are kept for a LOG_DEBUG_SAMPLE_RATE share of requests,
+    decided once per request, so a sampled request keeps all of its debug
+    lines and the rest keep none.
+    """
+
+    def __init__(self, debug_sample_rate):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get("request_id")
+            record.method = request.method
+            record.path = request.path
+            sampled = g.get("log_sampled", True)
+        else:
+            record.request_id = None
+            sampled = random.random() < self.debug_sample_rate
+        return record.levelno > logging.DEBUG or sampled
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, for log shippers.
+    """
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["requestId"] = record.request_id
+            entry["method"] = record.method
+            entry["path"] = record.path
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Human-readable lines for local development.
+    """
+
+    def format(self, record):
+        line = (
+            f"{self.formatTime(record)} {record.levelname} {record.name}: "
+            f"{record.getMessage()}"
+        )
+        if getattr(record, "request_id", None):
+            line += f" [{record.method} {record.path} {record.request_id}]"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(app):
+    """
+    Send all logging through a queue to a background writer thread.
+
+    Handlers only format the record and put it on the queue, so a request
+    never waits on stdout. Every record logged during a request carries the
+    request's ID, which is also returned in the X-Request-ID header; a
+    client-supplied X-Request-ID is reused so calls can be traced across
+    services.
+
+    Modules log with logging.getLogger(__name__), which propagates to the
+    root logger configured here.
+
+    Args:
+        app (Flask): Application to configure
+    """
+    global _listener
+    config = app.config
+    sample_rate = config["LOG_DEBUG_SAMPLE_RATE"]
+
+    formatter = JsonFormatter() if config["LOG_FORMAT"] == "json" else TextFormatter()
+    queue_handler = QueueHandler(_queue)
+    # Format on the calling thread, while the request context is available
+    queue_handler.setFormatter(formatter)
+    queue_handler.addFilter(RequestContextFilter(sample_rate))
+
+    writer = logging.StreamHandler(sys.stdout)
+    writer.setFormatter(logging.Formatter("%(message)s"))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(config["LOG_LEVEL"])
+
+    if _listener is None:
+        _listener = QueueListener(_queue, writer)
+        _listener.start()
+
+    @app.before_request
+    def assign_request_id():
+        request_id = request.headers.get("X-Request-ID", "")
+        g.request_id = (
+            request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex
+        )
+        g.log_sampled = random.random() < sample_rate
+
+    @app.after_request
+    def add_request_id_header(response):
+        if "request_id" in g:
+            response.headers["X-Request-ID"] = g.request_id
+        return response
+
+
+def stop_logging():
+    """
+    Flush queued log records and stop the writer thread.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
@@ -0,0 +1,333 @@
+import bisect
+import re
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from MySQLdb import cursors
+from helper import query_audit
+
+# Upper bounds of the histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Slowest statements kept per request for the slow request log
+SLOW_STATEMENTS_KEPT = 3
+
+
+class Histogram:
+    """
+    Prometheus-style histogram with a fixed set of buckets per label set.
+
+    Observations only take a lock and bump a few integers, so recording
+    them on every request costs microseconds.
+    """
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # labels -> [bucket counts..., +Inf count, sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self.lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}'
+                )
+            cumulative += values[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-1]}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    """
+    Prometheus-style counter per label set.
+    """
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def inc(self, labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self.lock:
+            series = dict(self.series)
+        for labels, value in sorted(series.items()):
+            lines.append(
+                f"{self.name}{{{format_labels(self.label_names, labels)}}} {value}"
+            )
+        return lines
+
+
+def format_labels(label_names, labels):
+    return ",".join(
+        f'{name}="{escape_label(value)}"' for name, value in zip(label_names, labels)
+    )
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+ENDPOINT_LABELS = ("blueprint", "endpoint")
+
+requests_total = Counter(
+    "sharc_http_requests_total",
+    "Requests handled, by endpoint, method and status code.",
+    ("blueprint", "endpoint", "method", "status"),
+)
+request_duration = Histogram(
+    "sharc_http_request_duration_seconds",
+    "Time spent handling a request, not including streaming the body.",
+    ENDPOINT_LABELS,
+    DURATION_BUCKETS,
+)
+request_size = Histogram(
+    "sharc_http_request_size_bytes",
+    "Size of request bodies.",
+    ENDPOINT_LABELS,
+    SIZE_BUCKETS,
+)
+response_size = Histogram(
+    "sharc_http_response_size_bytes",
+    "Size of response bodies with a known length.",
+    ENDPOINT_LABELS,
+    SIZE_BUCKETS,
+)
+db_queries = Histogram(
+    "sharc_db_queries_per_request",
+    "Database statements executed per request.",
+    ENDPOINT_LABELS,
+    QUERY_COUNT_BUCKETS,
+)
+db_time = Histogram(
+    "sharc_db_time_seconds",
+    "Time per request spent waiting on database statements.",
+    ENDPOINT_LABELS,
+    DURATION_BUCKETS,
+)
+slow_requests_total = Counter(
+    "sharc_http_slow_requests_total",
+    "Requests slower than SLOW_REQUEST_MS.",
+    ENDPOINT_LABELS,
+)
+
+ALL_METRICS = (
+    requests_total,
+    request_duration,
+    request_size,
+    response_size,
+    db_queries,
+    db_time,
+    slow_requests_total,
+)
+
+
+def record_query(statement, elapsed):
+    """
+    Add a database statement to the current request's totals.
+
+    Statements run outside a request (e.g. by the background jobs) only
+    reach active query_audit.capture_queries blocks.
+
+    Args:
+        statement (str or bytes): SQL as passed to execute, before parameters
+            are bound, so user data never reaches the logs
+        elapsed (float): Seconds the statement took
+    """
+    query_audit.record(statement)
+    if not has_request_context() or "db_query_count" not in g:
+        return
+    if "query_log" in g:
+        g.query_log.add(statement)
+    g.db_query_count += 1
+    g.db_time += elapsed
+    slowest = g.db_slowest
+    if len(slowest) < SLOW_STATEMENTS_KEPT or elapsed > slowest[-1][0]:
+        slowest.append((elapsed, statement))
+        slowest.sort(key=lambda item: item[0], reverse=True)
+        del slowest[SLOW_STATEMENTS_KEPT:]
+
+
+class QueryTimingMixin:
+    """
+    Cursor mixin that times every statement for the request metrics.
+    """
+
+    _in_executemany = False
+
+    def execute(self, query, args=None):
+        if self._in_executemany:
+            return super().execute(query, args)
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            record_query(query, time.perf_counter() - started)
+
+    def executemany(self, query, args):
+        # executemany falls back to calling execute per row for statements
+        # it can't batch; count the whole call once
+        started = time.perf_counter()
+        self._in_executemany = True
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._in_executemany = False
+            record_query(query, time.perf_counter() - started)
+
+
+class InstrumentedCursor(QueryTimingMixin, cursors.Cursor):
+    pass
+
+
+class InstrumentedSSCursor(QueryTimingMixin, cursors.SSCursor):
+    pass
+
+
+def one_line(statement, limit=500):
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= limit else statement[:limit] + "..."
+
+
+class RequestMetrics:
+    """
+    Flask extension recording latency, payload size and database use.
+
+    Every request is timed and labelled with its blueprint and endpoint.
+    Connections opened through flask_mysqldb (and the replica) use
+    InstrumentedCursor, so each request also records how many statements it
+    ran and how long it waited on them. Requests slower than SLOW_REQUEST_MS
+    are logged along with their slowest statements.
+
+    Metrics are kept per process and rendered in the Prometheus text format
+    by render().
+
+    With QUERY_AUDIT set to 'warn' or 'raise', every statement is also
+    fingerprinted, and a request that runs the same fingerprint more than
+    QUERY_AUDIT_REPEAT_THRESHOLD times (usually a query inside a loop) is
+    logged or fails with NPlusOneQueryError.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault("SLOW_REQUEST_MS", 1000)
+        app.config.setdefault("QUERY_AUDIT", "off")
+        app.config.setdefault("QUERY_AUDIT_REPEAT_THRESHOLD", 5)
+        # flask_mysqldb passes MYSQL_CUSTOM_OPTIONS straight to MySQLdb.connect
+        app.config["MYSQL_CUSTOM_OPTIONS"] = {
+            **(app.config.get("MYSQL_CUSTOM_OPTIONS") or {}),
+            "cursorclass": InstrumentedCursor,
+        }
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+
+    def start_request(self):
+        g.request_started = time.perf_counter()
+        g.db_query_count = 0
+        g.db_time = 0.0
+        g.db_slowest = []
+        if current_app.config["QUERY_AUDIT"] in ("warn", "raise"):
+            g.query_log = query_audit.QueryLog()
+
+    def finish_request(self, response):
+        if "request_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        labels = (request.blueprint or "", request.endpoint or "unmatched")
+
+        requests_total.inc(labels + (request.method, str(response.status_code)))
+        request_duration.observe(labels, elapsed)
+        request_size.observe(labels, request.content_length or 0)
+        if response.content_length is not None:
+            response_size.observe(labels, response.content_length)
+        db_queries.observe(labels, g.db_query_count)
+        db_time.observe(labels, g.db_time)
+
+        if elapsed * 1000 >= current_app.config["SLOW_REQUEST_MS"]:
+            slow_requests_total.inc(labels)
+            statements = "; ".join(
+                f"[{seconds * 1000:.0f} ms] {one_line(statement)}"
+                for seconds, statement in g.db_slowest
+            )
+            current_app.logger.warning(
+                f"Slow request {request.method} {request.path} "
+                f"({request.endpoint}): {elapsed * 1000:.0f} ms, "
+                f"{g.db_query_count} queries in {g.db_time * 1000:.0f} ms. "
+                f"Slowest: {statements or 'none'}"
+            )
+
+        if "query_log" in g:
+            self.audit_queries(g.query_log, response)
+        return response
+
+    def audit_queries(self, log, response):
+        """
+        Flag statements the request repeated too often.
+
+        Args:
+            log (QueryLog): Statements the request ran
+            response (flask.Response): Response, which gets an X-Query-Count
+                header to make query counts visible in the browser dev tools
+        """
+        response.headers["X-Query-Count"] = str(log.count)
+        threshold = current_app.config["QUERY_AUDIT_REPEAT_THRESHOLD"]
+        if not log.repeated(threshold):
+            return
+        message = (
+            f"Possible N+1 queries in {request.method} {request.path} "
+            f"({request.endpoint}): {log.describe(threshold)}"
+        )
+        if current_app.config["QUERY_AUDIT"] == "raise":
+            raise query_audit.NPlusOneQueryError(message)
+        current_app.logger.warning(message)
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        lines = []
+        for metric in ALL_METRICS:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,187 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from werkzeug.security import check_password_hash, generate_password_hash
+from config import Config
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(max(Config.PASSWORD_HASH_MAX_PENDING, 1))
+
+
+def _get_executor():
+    """
+    Create the password hashing process pool on first use.
+
+    Processes are spawned rather than forked, since forking a threaded
+    Flask server can copy locks in a held state.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=Config.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _run(fn, *args):
+    """
+    Run a hashing function in the process pool, or inline if it is disabled.
+
+    At most PASSWORD_HASH_MAX_PENDING hashes are handed to the pool at once;
+    further callers wait here, so a login stampede queues up instead of
+    growing the pool's backlog without bound.
+    """
+    if Config.PASSWORD_HASH_WORKERS <= 0:
+        return fn(*args)
+    with _pending:
+        return _get_executor().submit(fn, *args).result()
+
+
+def _check_any(password_hashes, password):
+    return any(
+        password_hash and check_password_hash(password_hash, password)
+        for password_hash in password_hashes
+    )
+
+
+def hash_password(password):
+    """
+    Hash a password with the configured PASSWORD_HASH_METHOD.
+
+    Args:
+        password (str): Plain text password
+
+    Returns:
+        str: Hash in werkzeug's "method$salt$hash" format
+    """
+    return _run(generate_password_hash, password, Config.PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    """
+    Check a password against a stored hash.
+
+    Works with hashes made by any method werkzeug supports, so hashes made
+    before PASSWORD_HASH_METHOD changed still verify.
+
+    Args:
+        password_hash (str): Stored hash
+        password (str): Plain text password to check
+
+    Returns:
+        bool: True if the password matches
+    """
+    return _run(check_password_hash, password_hash, password)
+
+
+def matches_any(password_hashes, password):
+    """
+    Check a password against several stored hashes in one pool round trip.
+
+    Used to stop users reusing one of their previous passwords.
+
+    Args:
+        password_hashes (list): Stored hashes; None entries are skipped
+        password (str): Plain text password to check
+
+    Returns:
+        bool: True if the password matches any of the hashes
+    """
+    return _run(_check_any, list(password_hashes), password)
+
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    """
+    The method as werkzeug writes it at the start of a hash, with its
+    defaults filled in ('scrypt' is stored as 'scrypt:32768:8:1'). Found by
+    hashing an empty password once, since the defaults depend on the
+    werkzeug version.
+    """
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+def needs_rehash(password_hash):
+    """
+    Check whether a stored hash was made with an outdated method or cost.
+
+    Call after a successful login and, if this returns True, store a new
+    hash of the password the user just entered.
+
+    Args:
+        password_hash (str): Stored hash
+
+    Returns:
+        bool: True if the hash's method differs from PASSWORD_HASH_METHOD
+    """
+    return password_hash.split("$", 1)[0] != _method_prefix(
+        Config.PASSWORD_HASH_METHOD
+    )
+
+
+def shutdown():
+    """
+    Stop the password hashing process pool.
+    """
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def benchmark(seconds=5, threads=None):
+    """
+    Measure how many logins per second password checks allow.
+
+    Hashes one password with PASSWORD_HASH_METHOD, then verifies it from
+    several threads for the given time, the way concurrent logins would.
+
+    Args:
+        seconds (float): How long to run for
+        threads (int, optional): Concurrent callers (default: one per
+            pool worker, or one if the pool is disabled)
+
+    Returns:
+        dict: Logins per second in total and per worker process
+    """
+    workers = max(Config.PASSWORD_HASH_WORKERS, 1)
+    threads = threads or workers
+    password_hash = hash_password("benchmark password")
+    deadline = time.monotonic() + seconds
+    counts = [0] * threads
+
+    def login_loop(index):
+        while time.monotonic() < deadline:
+            verify_password(password_hash, "benchmark password")
+            counts[index] += 1
+
+    started = time.monotonic()
+    loop_threads = [
+        threading.Thread(target=login_loop, args=(index,)) for index in range(threads)
+    ]
+    for thread in loop_threads:
+        thread.start()
+    for thread in loop_threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    logins_per_second = sum(counts) / elapsed
+    return {
+        "method": Config.PASSWORD_HASH_METHOD,
+        "workers": workers,
+        "threads": threads,
+        "loginsPerSecond": round(logins_per_second, 1),
+        "loginsPerSecondPerCore": round(logins_per_second / workers, 1),
+    }
+
+
+if __name__ == "__main__":
+    # Run from the server directory: python -m helper.passwords
+    print(benchmark())
+    shutdown()
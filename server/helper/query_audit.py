@@ -0,0 +1,115 @@
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# Statement shapes that only differ in literals or IN list length
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_local = threading.local()
+
+
+class NPlusOneQueryError(Exception):
+    """
+    Raised when QUERY_AUDIT is 'raise' and a request repeats a statement
+    more than QUERY_AUDIT_REPEAT_THRESHOLD times.
+    """
+
+
+def fingerprint(statement):
+    """
+    Reduce a statement to its shape.
+
+    Parameters, literals and IN lists of any length all become ?, so the
+    same query run for different IDs gets the same fingerprint.
+
+    Args:
+        statement (str or bytes): SQL statement
+
+    Returns:
+        str: Fingerprint
+    """
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    statement = statement.replace("%s", "?")
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryLog:
+    """
+    Every statement issued while the log is active, by fingerprint.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.counts = Counter()
+
+    def add(self, statement):
+        self.statements.append(statement)
+        self.counts[fingerprint(statement)] += 1
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, threshold):
+        """
+        Fingerprints executed more than threshold times, most repeated first.
+
+        Args:
+            threshold (int): Executions allowed per fingerprint
+
+        Returns:
+            list: (fingerprint, count) pairs
+        """
+        return [
+            (statement, count)
+            for statement, count in self.counts.most_common()
+            if count > threshold
+        ]
+
+    def describe(self, threshold):
+        return "; ".join(
+            f"{count}x {statement[:300]}"
+            for statement, count in self.repeated(threshold)
+        )
+
+
+def record(statement):
+    """
+    Add a statement to every capture_queries block active on this thread.
+    """
+    for log in getattr(_local, "captures", ()):
+        log.add(statement)
+
+
+@contextmanager
+def capture_queries():
+    """
+    Record every statement run through an instrumented cursor on this thread.
+
+    Meant for tests that pin the number of queries an endpoint may run:
+
+        with capture_queries() as queries:
+            client.get("/api/events/events?start_date=...&end_date=...")
+        assert queries.count <= 10
+        assert not queries.repeated(threshold=3), queries.describe(3)
+
+    Yields:
+        QueryLog: Statements run inside the block
+    """
+    log = QueryLog()
+    captures = getattr(_local, "captures", None)
+    if captures is None:
+        captures = _local.captures = []
+    captures.append(log)
+    try:
+        yield log
+    finally:
+        captures.remove(log)
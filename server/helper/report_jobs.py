@@ -0,0 +1,141 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+# Job IDs are uuid4 hex strings; anything else is never a file name we wrote
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class ReportJobs:
+    """
+    Background pool and registry for asynchronous report jobs.
+
+    Jobs run on a pool of REPORT_JOB_WORKERS threads in the process that
+    queued them. Each job's status is kept in a small JSON file next to its
+    result in REPORT_JOB_FOLDER, so every worker process sharing the folder
+    can answer status and download requests, whichever one runs the job.
+    Files are removed REPORT_JOB_TTL_SECONDS after they were last written,
+    which also cleans up after jobs lost to a restart.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executor = None
+        self.stopping = threading.Event()
+
+    def status_path(self, job_id):
+        return os.path.join(Config.REPORT_JOB_FOLDER, f"{job_id}.json")
+
+    def save(self, job):
+        """
+        Write a job's status file, replacing it in one step so readers in
+        other processes never see it half written.
+        """
+        path = self.status_path(job["id"])
+        with open(f"{path}.part", "w", encoding="utf-8") as status_file:
+            json.dump(job, status_file)
+        os.replace(f"{path}.part", path)
+
+    def submit(self, run, user_id, school_id, report_name):
+        """
+        Queue a report job.
+
+        Args:
+            run (callable): Called as run(job) on a worker thread
+            user_id (str): User who requested the report
+            school_id (int): School the report is for
+            report_name (str): Name of the report
+
+        Returns:
+            dict: The new job
+        """
+        self.remove_expired()
+        job = {
+            "id": uuid.uuid4().hex,
+            "userId": user_id,
+            "schoolId": school_id,
+            "report": report_name,
+            "status": "queued",
+            "rows": 0,
+            "error": None,
+            "createdAt": time.time(),
+            "finishedAt": None,
+        }
+        job["path"] = os.path.join(Config.REPORT_JOB_FOLDER, f"{job['id']}.ndjson")
+        with self.lock:
+            if self.executor is None:
+                os.makedirs(Config.REPORT_JOB_FOLDER, exist_ok=True)
+                self.stopping.clear()
+                self.executor = ThreadPoolExecutor(
+                    max_workers=Config.REPORT_JOB_WORKERS,
+                    thread_name_prefix="report-job",
+                )
+            executor = self.executor
+        self.save(job)
+        executor.submit(run, job)
+        return job
+
+    def get(self, job_id, user_id):
+        """
+        Look up a job belonging to a user.
+
+        Returns:
+            dict or None: The job, or None if it doesn't exist, has expired
+                or belongs to someone else
+        """
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        self.remove_expired()
+        try:
+            with open(self.status_path(job_id), encoding="utf-8") as status_file:
+                job = json.load(status_file)
+        except (OSError, ValueError):
+            return None
+        if job["userId"] != user_id:
+            return None
+        return job
+
+    def update(self, job, **fields):
+        """
+        Update a job's status fields from the worker thread running it.
+        """
+        job.update(fields)
+        if fields.get("status") in ("done", "failed", "timeout"):
+            job["finishedAt"] = time.time()
+        self.save(job)
+
+    def remove_expired(self):
+        """
+        Delete status and result files not written to for
+        REPORT_JOB_TTL_SECONDS, including ones left by a previous process.
+        """
+        if not os.path.isdir(Config.REPORT_JOB_FOLDER):
+            return
+        cutoff = time.time() - Config.REPORT_JOB_TTL_SECONDS
+        for filename in os.listdir(Config.REPORT_JOB_FOLDER):
+            path = os.path.join(Config.REPORT_JOB_FOLDER, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        """
+        Stop accepting jobs and wait for running ones to finish. Jobs still
+        waiting for a report slot give up.
+        """
+        self.stopping.set()
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Report jobs queued by this process
+report_jobs = ReportJobs()
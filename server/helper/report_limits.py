@@ -0,0 +1,118 @@
+import threading
+from collections import defaultdict
+from flask import current_app
+
+# MySQL error raised when a statement exceeds max_execution_time
+QUERY_TIMEOUT_ERROR = 3024
+
+
+class ReportSlots:
+    """
+    Limit how many reports each school can run at once.
+
+    Each school gets REPORT_CONCURRENCY_PER_SCHOOL slots. Requests that find
+    every slot taken wait in a queue of up to REPORT_QUEUE_LENGTH requests
+    for at most REPORT_QUEUE_TIMEOUT_SECONDS before giving up.
+
+    Slots are counted per worker process, so a school can run up to
+    REPORT_CONCURRENCY_PER_SCHOOL reports in each worker; size the setting
+    for the number of workers.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.running = defaultdict(int)
+        self.waiting = defaultdict(int)
+
+    def acquire(self, school_id):
+        """
+        Take a report slot for a school, waiting in the queue if needed.
+
+        Args:
+            school_id (int): School the report is being run for
+
+        Returns:
+            bool: True if a slot was taken, False if the queue was full or
+                the wait timed out
+        """
+        config = current_app.config
+        limit = config["REPORT_CONCURRENCY_PER_SCHOOL"]
+        with self.condition:
+            if self.running[school_id] < limit:
+                self.running[school_id] += 1
+                return True
+            if self.waiting[school_id] >= config["REPORT_QUEUE_LENGTH"]:
+                return False
+
+            self.waiting[school_id] += 1
+            try:
+                acquired = self.condition.wait_for(
+                    lambda: self.running[school_id] < limit,
+                    timeout=config["REPORT_QUEUE_TIMEOUT_SECONDS"],
+                )
+            finally:
+                self.waiting[school_id] -= 1
+            if acquired:
+                self.running[school_id] += 1
+            return acquired
+
+    def release(self, school_id):
+        """
+        Give back a slot taken with acquire and wake up a queued request.
+
+        Args:
+            school_id (int): School the report was run for
+        """
+        with self.condition:
+            self.running[school_id] -= 1
+            if self.running[school_id] <= 0:
+                del self.running[school_id]
+            self.condition.notify_all()
+
+
+# Report slots shared by every request in this process
+report_slots = ReportSlots()
+
+
+def report_budget(report):
+    """
+    Get the execution time and row limits for a report.
+
+    Reports can override the REPORT_MAX_EXECUTION_MS and REPORT_MAX_ROWS
+    defaults with their own maxExecutionMs and maxRows keys.
+
+    Args:
+        report (Report): Report definition
+
+    Returns:
+        tuple: (max_execution_ms, max_rows)
+    """
+    config = current_app.config
+    return (
+        report.get("maxExecutionMs", config["REPORT_MAX_EXECUTION_MS"]),
+        report.get("maxRows", config["REPORT_MAX_ROWS"]),
+    )
+
+
+def set_max_execution_time(cursor, max_execution_ms):
+    """
+    Limit how long SELECT statements on the cursor's connection may run.
+
+    MySQL aborts a read that runs past the limit with QUERY_TIMEOUT_ERROR
+    instead of letting it hold locks. The session variable is used rather
+    than a MAX_EXECUTION_TIME optimizer hint because the hint must follow
+    the outermost SELECT, which is awkward to find in reports that start
+    with a WITH clause.
+
+    Args:
+        cursor (mysql.connection.cursor): Cursor the report will run on
+        max_execution_ms (int): Time limit in milliseconds (0 for no limit)
+    """
+    cursor.execute("SET SESSION max_execution_time = %s", (max_execution_ms,))
+
+
+def is_query_timeout(error):
+    """
+    Check whether a database error was caused by max_execution_time.
+    """
+    return bool(error.args) and error.args[0] == QUERY_TIMEOUT_ERROR
@@ -0,0 +1,265 @@
+from datetime import timedelta
+
+# Rollup rows for school-wide totals use this club ID, since RSVPs for events
+# with several hosts must only be counted once per school.
+SCHOOL_WIDE_CLUB_ID = 0
+
+# Date-keyed rollup tables rebuilt by refresh_rollups
+ROLLUP_TABLES = ["rsvp_rollup_daily", "club_rollup_daily", "tag_rollup_daily"]
+
+
+def mark_rollup_dirty(cur, event_id):
+    """
+    Flag the day an event starts on so its rollups are rebuilt.
+
+    Call this from any write that changes RSVPs, hosts or the event itself.
+    The rollup job picks up flagged days on its next run.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        event_id (int): Unique identifier of the changed event
+    """
+    cur.execute(
+        """INSERT IGNORE INTO rollup_dirty_day (rollup_date)
+            SELECT DATE(start_time) FROM event WHERE event_id = %s""",
+        (event_id,),
+    )
+
+
+def mark_user_rollups_dirty(cur, user_id):
+    """
+    Flag the days of every event a user RSVP'd to so their rollups are
+    rebuilt.
+
+    Rollups only count active users, so call this when a user is activated
+    or deactivated. Inactive RSVPs are included, since deactivating a user
+    deactivates their RSVPs too.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        user_id (str): Email of the user
+    """
+    cur.execute(
+        """INSERT IGNORE INTO rollup_dirty_day (rollup_date)
+            SELECT DISTINCT DATE(e.start_time)
+            FROM rsvp r
+            INNER JOIN event e ON e.event_id = r.event_id
+            WHERE r.user_id = %s
+                AND e.start_time IS NOT NULL""",
+        (user_id,),
+    )
+
+
+def refresh_rollups(cur, start_date, end_date):
+    """
+    Rebuild the daily RSVP, club and tag rollups for a range of days.
+
+    Existing rows in the range are deleted and recomputed from the raw rsvp,
+    event, event_host and event_tags tables in one pass per rollup table.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        start_date (datetime.date): First day to rebuild (inclusive)
+        end_date (datetime.date): Last day to rebuild (inclusive)
+    """
+    # Compare start_time to a half-open range so the index on it can be used
+    range_start = start_date
+    range_end = end_date + timedelta(days=1)
+
+    cur.execute(
+        "DELETE FROM rsvp_rollup_daily WHERE rollup_date BETWEEN %s AND %s",
+        (start_date, end_date),
+    )
+    cur.execute(
+        """INSERT INTO rsvp_rollup_daily
+                (rollup_date, school_id, club_id, gender, semester_started, year_started, rsvp_count)
+            SELECT DATE(e.start_time),
+                   e.school_id,
+                   eh.club_id,
+                   COALESCE(u.gender, ''),
+                   COALESCE(u.semester_started, ''),
+                   COALESCE(u.year_started, 0),
+                   COUNT(DISTINCT r.rsvp_id)
+            FROM rsvp r
+            INNER JOIN users u ON u.email = r.user_id
+            INNER JOIN event e ON e.event_id = r.event_id
+            INNER JOIN event_host eh ON eh.event_id = r.event_id
+            WHERE r.is_active = 1
+                AND r.is_yes = 1
+                AND u.is_active = 1
+                AND e.start_time >= %s
+                AND e.start_time < %s
+            GROUP BY 1, 2, 3, 4, 5, 6
+            UNION ALL
+            SELECT DATE(e.start_time),
+                   e.school_id,
+                   %s,
+                   COALESCE(u.gender, ''),
+                   COALESCE(u.semester_started, ''),
+                   COALESCE(u.year_started, 0),
+                   COUNT(DISTINCT r.rsvp_id)
+            FROM rsvp r
+            INNER JOIN users u ON u.email = r.user_id
+            INNER JOIN event e ON e.event_id = r.event_id
+            WHERE r.is_active = 1
+                AND r.is_yes = 1
+                AND u.is_active = 1
+                AND e.start_time >= %s
+                AND e.start_time < %s
+                AND EXISTS (SELECT 1 FROM event_host eh WHERE eh.event_id = r.event_id)
+            GROUP BY 1, 2, 3, 4, 5, 6""",
+        (range_start, range_end, SCHOOL_WIDE_CLUB_ID, range_start, range_end),
+    )
+
+    cur.execute(
+        "DELETE FROM club_rollup_daily WHERE rollup_date BETWEEN %s AND %s",
+        (start_date, end_date),
+    )
+    cur.execute(
+        """INSERT INTO club_rollup_daily
+                (rollup_date, school_id, club_id, event_count, rsvp_count)
+            SELECT DATE(e.start_time),
+                   e.school_id,
+                   eh.club_id,
+                   COUNT(DISTINCT e.event_id),
+                   COUNT(DISTINCT r.rsvp_id)
+            FROM event_host eh
+            INNER JOIN event e ON e.event_id = eh.event_id
+            LEFT JOIN (SELECT rs.event_id, rs.rsvp_id FROM rsvp rs
+                        INNER JOIN users u
+                            ON rs.user_id = u.email
+                        WHERE u.is_active = 1
+                            AND rs.is_active = 1
+                            AND rs.is_yes = 1) r ON r.event_id = e.event_id
+            WHERE e.start_time >= %s
+                AND e.start_time < %s
+            GROUP BY 1, 2, 3""",
+        (range_start, range_end),
+    )
+
+    cur.execute(
+        "DELETE FROM tag_rollup_daily WHERE rollup_date BETWEEN %s AND %s",
+        (start_date, end_date),
+    )
+    cur.execute(
+        """INSERT INTO tag_rollup_daily (rollup_date, school_id, tag_id, rsvp_count)
+            SELECT DATE(e.start_time),
+                   e.school_id,
+                   et.tag_id,
+                   COUNT(DISTINCT r.rsvp_id)
+            FROM rsvp r
+            INNER JOIN event_tags et ON et.event_id = r.event_id
+            INNER JOIN event e ON e.event_id = r.event_id
+            INNER JOIN users u ON u.email = r.user_id
+            WHERE r.is_active = 1
+                AND r.is_yes = 1
+                AND u.is_active = 1
+                AND e.start_time >= %s
+                AND e.start_time < %s
+            GROUP BY 1, 2, 3""",
+        (range_start, range_end),
+    )
+
+
+def refresh_tag_usage(cur):
+    """
+    Rebuild the per-tag usage snapshot for every school.
+
+    Tag usage counts (users, clubs, events and club subscriptions per tag)
+    are not tied to a date, so they are kept as a single snapshot row per tag.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+    """
+    cur.execute("DELETE FROM tag_usage_rollup")
+    cur.execute(
+        """INSERT INTO tag_usage_rollup
+                (school_id, tag_id, user_count, club_count, event_count, subscription_count, refreshed_at)
+            SELECT t.school_id,
+                   t.tag_id,
+                   COALESCE(utc.usage_count, 0),
+                   COALESCE(ctc.usage_count, 0),
+                   COALESCE(etc.usage_count, 0),
+                   COALESCE(sc.subscription_count, 0),
+                   CURRENT_TIMESTAMP()
+            FROM tag t
+            LEFT JOIN (SELECT tag_id, COUNT(DISTINCT user_id) AS usage_count
+                        FROM user_tags GROUP BY tag_id) utc ON utc.tag_id = t.tag_id
+            LEFT JOIN (SELECT tag_id, COUNT(DISTINCT club_id) AS usage_count
+                        FROM club_tags GROUP BY tag_id) ctc ON ctc.tag_id = t.tag_id
+            LEFT JOIN (SELECT tag_id, COUNT(DISTINCT event_id) AS usage_count
+                        FROM event_tags GROUP BY tag_id) etc ON etc.tag_id = t.tag_id
+            LEFT JOIN (SELECT ct.tag_id, COUNT(DISTINCT us.subscription_id) AS subscription_count
+                        FROM user_subscription us
+                        INNER JOIN club_tags ct ON ct.club_id = us.club_id
+                        INNER JOIN users u ON u.email = us.email
+                        WHERE us.is_active = 1
+                            AND us.subscribed_or_blocked = 1
+                            AND u.is_active = 1
+                        GROUP BY ct.tag_id) sc ON sc.tag_id = t.tag_id"""
+    )
+
+
+def refresh_dirty_rollups(cur):
+    """
+    Rebuild the rollups for every day flagged by mark_rollup_dirty.
+
+    Contiguous flagged days are rebuilt as one range, and the flags are
+    cleared only for the days that were processed, so writes that happen
+    during the refresh are picked up by the next run.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+
+    Returns:
+        int: Number of days rebuilt
+    """
+    cur.execute("SELECT rollup_date FROM rollup_dirty_day ORDER BY rollup_date")
+    days = [row[0] for row in cur.fetchall() if row[0] is not None]
+    if not days:
+        return 0
+
+    range_start = range_end = days[0]
+    for day in days[1:]:
+        if day == range_end + timedelta(days=1):
+            range_end = day
+            continue
+        refresh_rollups(cur, range_start, range_end)
+        range_start = range_end = day
+    refresh_rollups(cur, range_start, range_end)
+
+    format_strings = ",".join(["%s"] * len(days))
+    cur.execute(
+        f"DELETE FROM rollup_dirty_day WHERE rollup_date IN ({format_strings})",
+        tuple(days),
+    )
+    return len(days)
+
+
+def rebuild_all_rollups(cur):
+    """
+    Rebuild every rollup from scratch.
+
+    Used nightly to pick up changes that are not tied to an event date,
+    such as users being deactivated or changing their gender or start term.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+    """
+    cur.execute("SELECT rollup_date FROM rollup_dirty_day")
+    dirty_days = [row[0] for row in cur.fetchall()]
+
+    for table in ROLLUP_TABLES:
+        cur.execute(f"DELETE FROM {table}")
+    cur.execute("SELECT MIN(DATE(start_time)), MAX(DATE(start_time)) FROM event")
+    first_day, last_day = cur.fetchone()
+    if first_day is not None:
+        refresh_rollups(cur, first_day, last_day)
+
+    if dirty_days:
+        format_strings = ",".join(["%s"] * len(dirty_days))
+        cur.execute(
+            f"DELETE FROM rollup_dirty_day WHERE rollup_date IN ({format_strings})",
+            tuple(dirty_days),
+        )
+    refresh_tag_usage(cur)
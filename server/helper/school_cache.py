@@ -0,0 +1,40 @@
+import threading
+import time
+from config import Config
+
+
+class SchoolCache:
+    """
+    Small in-process cache of per-school query results.
+
+    Keys are tuples whose first item is the school ID, so every entry for a
+    school can be dropped at once when a write changes its data. Entries
+    also expire after the number of seconds in the named Config setting,
+    which bounds how stale they get after writes made by other workers.
+    """
+
+    def __init__(self, ttl_setting):
+        self.ttl_setting = ttl_setting
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        ttl = getattr(Config, self.ttl_setting)
+        if entry is None or time.monotonic() - entry[0] > ttl:
+            return None
+        return entry[1]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, school_id):
+        with self.lock:
+            for key in [key for key in self.entries if key[0] == school_id]:
+                del self.entries[key]
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
@@ -0,0 +1,357 @@
+import random
+import re
+import time
+from datetime import datetime, timezone
+from helper.bulk_writes import in_placeholders, insert_rows
+from helper.serialization import row_mapper, split_list, utc_iso
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 50
+MAX_TERMS = 8
+
+# InnoDB skips words shorter than innodb_ft_min_token_size (3 by default) and
+# the words in its default stopword list when indexing, so requiring one of
+# them with + would make every search containing it come back empty.
+MIN_TERM_LENGTH = 3
+STOPWORDS = frozenset(
+    "a about an are as at be by com de en for from how i in is it la of on or "
+    "that the this to was what when where who will with und www".split()
+)
+
+# Columns of the search_events query
+SEARCH_EVENT_ROW = row_mapper(
+    id=0,
+    title=1,
+    startTime=(2, utc_iso),
+    endTime=(3, utc_iso),
+    location=4,
+    description=5,
+    tags=(6, split_list),
+    score=(7, float),
+)
+
+# Columns of the search_clubs query
+SEARCH_CLUB_ROW = row_mapper(
+    id=0,
+    name=1,
+    description=2,
+    tags=(3, split_list),
+    score=(4, float),
+)
+
+
+def boolean_query(text):
+    """
+    Turn what a user typed into a MySQL boolean-mode full-text query.
+
+    Every word is required and matched as a prefix, so results narrow as the
+    user types ("chess tourn" finds "Chess Tournament"). Operators in the
+    input are dropped rather than passed through to MySQL.
+
+    Args:
+        text (str): Search box contents
+
+    Returns:
+        str or None: Query for AGAINST (... IN BOOLEAN MODE), or None if no
+            searchable words are left
+    """
+    terms = []
+    for term in re.findall(r"\w+", (text or "").lower()):
+        if len(term) >= MIN_TERM_LENGTH and term not in STOPWORDS:
+            if term not in terms:
+                terms.append(term)
+    if not terms:
+        return None
+    return " ".join(f"+{term}*" for term in terms[:MAX_TERMS])
+
+
+def page_params(args):
+    """
+    Read page and per_page from query parameters.
+
+    Args:
+        args (MultiDict): request.args
+
+    Returns:
+        tuple: (page, per_page), page starting at 1 and per_page capped at
+            MAX_PER_PAGE
+
+    Raises:
+        ValueError: If either parameter is not a positive integer
+    """
+    page = int(args.get("page") or 1)
+    per_page = int(args.get("per_page") or DEFAULT_PER_PAGE)
+    if page < 1 or per_page < 1:
+        raise ValueError("page and per_page must be positive")
+    return page, min(per_page, MAX_PER_PAGE)
+
+
+def parse_date(value):
+    """
+    Parse an ISO 8601 date filter into the naive UTC datetime stored in MySQL.
+
+    Args:
+        value (str): Date or datetime, e.g. 2025-03-01 or 2025-03-01T05:00:00Z
+
+    Returns:
+        datetime or None: None if value is empty
+
+    Raises:
+        ValueError: If value is not ISO 8601
+    """
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _page(rows, mapper, page, per_page):
+    """
+    Map one page of rows, using the extra row fetched to tell if more follow.
+    """
+    return {
+        "results": [mapper(row) for row in rows[:per_page]],
+        "page": page,
+        "perPage": per_page,
+        "hasMore": len(rows) > per_page,
+    }
+
+
+def search_events(
+    cur,
+    school_id,
+    user_id,
+    text,
+    start_date=None,
+    end_date=None,
+    tags=(),
+    page=1,
+    per_page=DEFAULT_PER_PAGE,
+):
+    """
+    Search active, approved events by name, description and location.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        school_id (int): School whose events are searched
+        user_id (str): Email of the searching user, for gender restrictions
+        text (str): Search box contents
+        start_date (datetime, optional): Only events starting at or after this
+        end_date (datetime, optional): Only events starting before this
+        tags (list, optional): Only events with at least one of these tag names
+        page (int): Page of results, starting at 1
+        per_page (int): Results per page
+
+    Returns:
+        dict: {"results": [...], "page": int, "perPage": int, "hasMore": bool},
+            best matches first
+    """
+    query = boolean_query(text)
+    if query is None:
+        return _page([], SEARCH_EVENT_ROW, page, per_page)
+
+    conditions = []
+    params = [query, user_id, query, school_id]
+    if start_date is not None:
+        conditions.append("AND e.start_time >= %s")
+        params.append(start_date)
+    if end_date is not None:
+        conditions.append("AND e.start_time < %s")
+        params.append(end_date)
+    if tags:
+        conditions.append(
+            f"""AND EXISTS (
+                    SELECT 1 FROM event_tags et
+                    INNER JOIN tag t ON t.tag_id = et.tag_id
+                    WHERE et.event_id = e.event_id
+                        AND t.tag_name IN ({in_placeholders(tags)}))"""
+        )
+        params.extend(tags)
+    params.extend([per_page + 1, (page - 1) * per_page])
+
+    cur.execute(
+        f"""SELECT e.event_id,
+                   e.event_name,
+                   e.start_time,
+                   e.end_time,
+                   e.location,
+                   e.description,
+                   (SELECT GROUP_CONCAT(t.tag_name SEPARATOR ',')
+                        FROM event_tags et
+                        INNER JOIN tag t ON t.tag_id = et.tag_id
+                        WHERE et.event_id = e.event_id),
+                   MATCH (e.event_name, e.description, e.location)
+                        AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM event e
+            LEFT JOIN users u
+                ON u.email = %s
+            WHERE MATCH (e.event_name, e.description, e.location)
+                    AGAINST (%s IN BOOLEAN MODE)
+                AND e.school_id = %s
+                AND e.is_active = 1
+                AND e.is_approved = 1
+                AND ((e.gender_restriction IS NULL)
+                    OR (e.gender_restriction = u.gender)
+                    OR (u.is_faculty = 1))
+                {" ".join(conditions)}
+            ORDER BY score DESC, e.start_time, e.event_id
+            LIMIT %s OFFSET %s""",
+        params,
+    )
+    return _page(cur.fetchall(), SEARCH_EVENT_ROW, page, per_page)
+
+
+def search_clubs(cur, school_id, text, page=1, per_page=DEFAULT_PER_PAGE):
+    """
+    Search active clubs by name and description.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        school_id (int): School whose clubs are searched
+        text (str): Search box contents
+        page (int): Page of results, starting at 1
+        per_page (int): Results per page
+
+    Returns:
+        dict: {"results": [...], "page": int, "perPage": int, "hasMore": bool},
+            best matches first
+    """
+    query = boolean_query(text)
+    if query is None:
+        return _page([], SEARCH_CLUB_ROW, page, per_page)
+
+    cur.execute(
+        """SELECT c.club_id,
+                  c.club_name,
+                  c.description,
+                  (SELECT GROUP_CONCAT(t.tag_name SEPARATOR ',')
+                        FROM club_tags ct
+                        INNER JOIN tag t ON t.tag_id = ct.tag_id
+                        WHERE ct.club_id = c.club_id),
+                  MATCH (c.club_name, c.description)
+                        AGAINST (%s IN BOOLEAN MODE) AS score
+            FROM club c
+            WHERE MATCH (c.club_name, c.description) AGAINST (%s IN BOOLEAN MODE)
+                AND c.school_id = %s
+                AND c.is_active = 1
+            ORDER BY score DESC, c.club_name
+            LIMIT %s OFFSET %s""",
+        (query, query, school_id, per_page + 1, (page - 1) * per_page),
+    )
+    return _page(cur.fetchall(), SEARCH_CLUB_ROW, page, per_page)
+
+
+def benchmark(events=100000, queries=50, seed=1):
+    """
+    Compare full-text search against the LIKE scan it replaces.
+
+    Fills a scratch copy of the event table with synthetic events, then
+    times the same searches with MATCH ... AGAINST on a FULLTEXT index and
+    with LIKE '%word%' on every column, which is what filtering on the
+    server would cost without the index. Needs the MySQL database from
+    Config; the scratch table is dropped afterwards.
+
+    Args:
+        events (int): Events in the scratch table
+        queries (int): Searches to time with each approach
+        seed (int): Seed for the synthetic text
+
+    Returns:
+        dict: Milliseconds per search for each approach
+    """
+    from flask_mysqldb import MySQLdb
+    from config import Config
+
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocabulary = [
+        "".join(rng.choices(letters, k=rng.randint(4, 9))) for _ in range(5000)
+    ]
+    # Zipf-ish word frequencies, like real text
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def words(count):
+        return " ".join(rng.choices(vocabulary, weights, k=count))
+
+    conn = MySQLdb.connect(
+        host=Config.MYSQL_HOST or "localhost",
+        port=Config.MYSQL_PORT,
+        user=Config.MYSQL_USER,
+        passwd=Config.MYSQL_PASSWORD,
+        db=Config.MYSQL_DB,
+    )
+    cur = conn.cursor()
+    table = "search_benchmark_event"
+    try:
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute(
+            f"""CREATE TABLE {table} (
+                    event_id int NOT NULL AUTO_INCREMENT,
+                    event_name varchar(50) NOT NULL,
+                    description text NOT NULL,
+                    location varchar(50) NOT NULL,
+                    PRIMARY KEY (event_id)
+                ) ENGINE=InnoDB"""
+        )
+        for offset in range(0, events, 5000):
+            rows = [
+                (words(3), words(40), words(2))
+                for _ in range(min(5000, events - offset))
+            ]
+            insert_rows(cur, table, ["event_name", "description", "location"], rows)
+        # Building the index after loading is much faster than maintaining it
+        cur.execute(
+            f"ALTER TABLE {table} "
+            "ADD FULLTEXT KEY search_idx (event_name, description, location)"
+        )
+        conn.commit()
+
+        searches = [
+            " ".join(rng.choices(vocabulary[:500], k=rng.randint(1, 2)))
+            for _ in range(queries)
+        ]
+
+        def run(make_statement):
+            started = time.perf_counter()
+            for search in searches:
+                cur.execute(*make_statement(search))
+                cur.fetchall()
+            return round((time.perf_counter() - started) / queries * 1000, 2)
+
+        def fulltext(search):
+            query = boolean_query(search)
+            return (
+                f"""SELECT event_id,
+                           MATCH (event_name, description, location)
+                                AGAINST (%s IN BOOLEAN MODE) AS score
+                    FROM {table}
+                    WHERE MATCH (event_name, description, location)
+                        AGAINST (%s IN BOOLEAN MODE)
+                    ORDER BY score DESC
+                    LIMIT 21""",
+                (query, query),
+            )
+
+        def like(search):
+            terms = search.split()
+            condition = "CONCAT_WS(' ', event_name, description, location) LIKE %s"
+            return (
+                f"""SELECT event_id FROM {table}
+                    WHERE {" AND ".join([condition] * len(terms))}
+                    LIMIT 21""",
+                [f"%{term}%" for term in terms],
+            )
+
+        results = {"fulltext": run(fulltext), "like": run(like)}
+    finally:
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.close()
+        conn.close()
+    return {"events": events, "millisecondsPerSearch": results}
+
+
+if __name__ == "__main__":
+    # Run from the server directory: python -m helper.search
+    print(benchmark())
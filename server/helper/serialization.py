@@ -0,0 +1,220 @@
+import dataclasses
+import decimal
+import json
+import time
+import uuid
+from datetime import date, datetime, timezone
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(o):
+    """
+    Serialize the types Flask's default JSON provider handles, the same way,
+    so switching encoders doesn't change any response.
+    """
+    if isinstance(o, date):
+        return http_date(o)
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that encodes with orjson, which is several times faster
+    than the standard library for the large lists the calendar and reports
+    return.
+
+    Output matches DefaultJSONProvider except that keys are not sorted:
+    datetimes still become HTTP dates and Decimals strings. Install it with
+    install_json_provider; without orjson the default provider stays.
+    """
+
+    OPTIONS = (
+        (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+    )
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # Callers asking for json.dumps options (indent etc.) get them
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self.OPTIONS).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self.OPTIONS)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def install_json_provider(app):
+    """
+    Make jsonify use orjson if it is installed.
+
+    Args:
+        app (Flask): Application to configure
+    """
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+
+def utc_iso(value):
+    """
+    ISO 8601 string for a datetime, treating naive values as UTC.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc).isoformat()
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def split_list(value):
+    """
+    List from a GROUP_CONCAT column; NULL becomes an empty list.
+    """
+    return value.split(",") if value else []
+
+
+def row_mapper(**fields):
+    """
+    Compile a function that turns result tuples into dicts.
+
+    Each keyword is an output key, and its value says where the value comes
+    from:
+    - an int: that column, unchanged
+    - (int, function): that column passed through function
+    - ((int, int, ...), function): several columns passed to function
+
+    The mapper is generated as a single dict expression when the module is
+    imported, so mapping a row costs no more than a hand-written dict
+    literal, and every endpoint returning the same shape shares it.
+
+        EVENT_ROW = row_mapper(id=0, startTime=(1, utc_iso), tags=(10, split_list))
+        events = [EVENT_ROW(row) for row in cur.fetchall()]
+
+    Returns:
+        function: Mapper taking a row tuple and returning a dict
+    """
+    namespace = {}
+    items = []
+    for position, (key, spec) in enumerate(fields.items()):
+        if isinstance(spec, int):
+            items.append(f"{key!r}: row[{spec}]")
+            continue
+        columns, function = spec
+        namespace[f"f{position}"] = function
+        if isinstance(columns, int):
+            columns = (columns,)
+        arguments = ", ".join(f"row[{column}]" for column in columns)
+        items.append(f"{key!r}: f{position}({arguments})")
+    source = "lambda row: {" + ", ".join(items) + "}"
+    return eval(source, namespace)
+
+
+def benchmark(rows=5000, repeat=5):
+    """
+    Measure how fast a calendar's worth of events is mapped and serialized.
+
+    Compares the old approach (a lambda over each row, pytz conversions and
+    the standard library encoder) with a compiled row mapper and orjson.
+
+    Args:
+        rows (int): Events in the payload
+        repeat (int): Runs to average over
+
+    Returns:
+        dict: Rows per second for each approach and the payload size
+    """
+    import pytz
+    from routes.events import EVENT_ROW
+
+    started_at = datetime(2025, 1, 1, 9, 0)
+    sample = [
+        (
+            i,
+            started_at,
+            started_at,
+            "Hostetter Chapel",
+            "An event description long enough to look like a real one. " * 3,
+            decimal.Decimal("5.00"),
+            f"Event {i}",
+            "1,2",
+            "Chess Club,Film Club",
+            1 if i % 3 == 0 else None,
+            "Games,Movies,Social",
+            1 if i % 2 else None,
+            None,
+            i % 40,
+        )
+        for i in range(rows)
+    ]
+
+    def old_map(x):
+        return {
+            "id": x[0],
+            "startTime": (
+                x[1].replace(tzinfo=pytz.UTC).isoformat()
+                if x[1].tzinfo is None
+                else x[1].astimezone(pytz.UTC).isoformat()
+            ),
+            "endTime": (
+                x[2].replace(tzinfo=pytz.UTC).isoformat()
+                if x[2].tzinfo is None
+                else x[2].astimezone(pytz.UTC).isoformat()
+            ),
+            "location": x[3],
+            "description": x[4],
+            "cost": x[5],
+            "title": x[6],
+            "host": [
+                {"id": id_val, "name": name_val}
+                for id_val, name_val in zip(
+                    [] if x[7] is None else x[7].split(","),
+                    [] if x[8] is None else x[8].split(","),
+                )
+            ],
+            "rsvp": "" if x[9] is None else ("rsvp" if x[9] else "block"),
+            "tags": [] if x[10] is None else x[10].split(","),
+            "subscribed": True if x[11] == 1 else False,
+            "blocked": True if x[11] == 0 else False,
+            "genderRestriction": x[12],
+            "going": x[13],
+        }
+
+    def run(function):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            body = function()
+        elapsed = (time.perf_counter() - started) / repeat
+        return round(rows / elapsed), len(body)
+
+    results = {}
+    results["stdlib"], size = run(
+        lambda: json.dumps(
+            {"events": list(map(old_map, sample))}, default=_default, sort_keys=True
+        ).encode()
+    )
+    if orjson is not None:
+        results["orjson"], size = run(
+            lambda: orjson.dumps(
+                {"events": [EVENT_ROW(row) for row in sample]},
+                default=_default,
+                option=OrjsonProvider.OPTIONS,
+            )
+        )
+    return {"rowsPerSecond": results, "rows": rows, "payloadBytes": size}
+
+
+if __name__ == "__main__":
+    # Run from the server directory: python -m helper.serialization
+    print(benchmark())
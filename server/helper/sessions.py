@@ -0,0 +1,369 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from flask import session
+from config import Config
+from helper.bulk_writes import in_placeholders
+
+
+class RevocationFilter:
+    """
+    Bloom filter of revoked session IDs.
+
+    In signed session mode, a session is trusted from its signed cookie
+    unless this filter says it might have been revoked, in which case the
+    caller falls back to checking session_mapping. False positives only cost
+    that one lookup; there are no false negatives for revocations this
+    process has seen.
+
+    Sessions revoked by this process are added immediately. Revocations made
+    by other processes are picked up when the filter is rebuilt from the
+    session_revocation table every SESSION_REVOCATION_REFRESH_SECONDS, which
+    also lets revocations of expired sessions drop out of the filter.
+    """
+
+    HASH_COUNT = 7
+
+    def __init__(self, size_bits):
+        self.size_bits = size_bits
+        self.bits = bytearray(size_bits // 8)
+        self.refreshed_at = 0
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        # Local revocations that may not have been committed before the
+        # last rebuild read the table
+        self.recent = deque()
+
+    def positions(self, session_id):
+        digest = hashlib.blake2b(
+            session_id.encode("utf-8"), digest_size=4 * self.HASH_COUNT
+        ).digest()
+        for i in range(self.HASH_COUNT):
+            yield int.from_bytes(digest[i * 4 : i * 4 + 4], "big") % self.size_bits
+
+    def set_bits(self, bits, session_id):
+        for position in self.positions(session_id):
+            bits[position // 8] |= 1 << (position % 8)
+
+    def add(self, session_id):
+        with self.lock:
+            self.set_bits(self.bits, session_id)
+            self.recent.append((time.monotonic(), session_id))
+
+    def might_contain(self, session_id):
+        bits = self.bits
+        return all(
+            bits[position // 8] & (1 << (position % 8))
+            for position in self.positions(session_id)
+        )
+
+    def needs_refresh(self):
+        return (
+            time.monotonic() - self.refreshed_at
+            >= Config.SESSION_REVOCATION_REFRESH_SECONDS
+        )
+
+    def refresh(self, cur):
+        """
+        Rebuild the filter from session_revocation if it is out of date.
+
+        Only one thread rebuilds at a time; others keep using the current
+        filter meanwhile.
+
+        Args:
+            cur (mysql.connection.cursor): Active database cursor
+        """
+        interval = Config.SESSION_REVOCATION_REFRESH_SECONDS
+        if not self.needs_refresh():
+            return
+        if not self.refresh_lock.acquire(blocking=False):
+            return
+        try:
+            started_at = time.monotonic()
+            cur.execute(
+                """SELECT session_id
+                    FROM session_revocation
+                    WHERE expires_at > UTC_TIMESTAMP()"""
+            )
+            bits = bytearray(self.size_bits // 8)
+            for (session_id,) in cur.fetchall():
+                self.set_bits(bits, session_id)
+            with self.lock:
+                while self.recent and self.recent[0][0] < started_at - interval:
+                    self.recent.popleft()
+                for _, session_id in self.recent:
+                    self.set_bits(bits, session_id)
+                self.bits = bits
+                self.refreshed_at = started_at
+        finally:
+            self.refresh_lock.release()
+
+
+# Revoked sessions seen by this process
+revoked_sessions = RevocationFilter(Config.SESSION_REVOCATION_FILTER_BITS)
+
+
+def sign_session_claims(user_email, expires_at, email_verified=False):
+    """
+    Store the session's principal and expiry in the signed session cookie.
+
+    In signed session mode these claims are trusted instead of looking the
+    session up in session_mapping on every request. Flask signs the cookie
+    with SECRET_KEY, so the claims can't be edited by the client.
+
+    Args:
+        user_email (str): User the session belongs to
+        expires_at (datetime): When the session expires (UTC)
+        email_verified (bool): Whether the session has passed email verification
+    """
+    session["user_email"] = user_email
+    session["expires_at"] = expires_at
+    session["email_verified"] = email_verified
+    drop_user_claims()
+
+
+def store_user_claims(user_info):
+    """
+    Keep the user's details from get_user_session_info in the signed
+    session cookie.
+
+    In signed session mode, later requests return them without touching the
+    database until they are SESSION_CLAIMS_MAX_AGE_SECONDS old, so changes
+    other users make (faculty status, club admins, bans) show up within
+    that time.
+
+    Args:
+        user_info (dict): User details as returned by get_user_session_info
+    """
+    session["user_claims"] = user_info
+    session["claims_at"] = time.time()
+
+
+def drop_user_claims():
+    """
+    Make the next request reload the current user's details, after they
+    changed their own profile or interests.
+    """
+    session.pop("user_claims", None)
+    session.pop("claims_at", None)
+
+
+def signed_user_claims(session_id):
+    """
+    The user details stored by store_user_claims, if they can be used
+    without the database.
+
+    Args:
+        session_id (str): Session ID from the cookie
+
+    Returns:
+        dict or None: User details, or None if they are missing or out of
+            date, the session has expired, the revocation filter is due for
+            a rebuild, or the session may have been revoked
+    """
+    claims = session.get("user_claims")
+    claims_at = session.get("claims_at", 0)
+    if claims is None or time.time() - claims_at >= Config.SESSION_CLAIMS_MAX_AGE_SECONDS:
+        return None
+    expires_at = session.get("expires_at")
+    if expires_at is None:
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if datetime.now(timezone.utc) > expires_at:
+        return None
+    # Rebuilding the filter needs the database, so leave it to the slow path
+    if revoked_sessions.needs_refresh() or revoked_sessions.might_contain(session_id):
+        return None
+    return dict(claims, emailVerified=session.get("email_verified", False))
+
+
+def signed_session_lookup(cur, session_id):
+    """
+    Read the session from the signed cookie instead of session_mapping.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor, only used when
+            the revocation filter needs refreshing
+        session_id (str): Session ID from the cookie
+
+    Returns:
+        tuple or None: (user_email, expires_at, email_verified) like the
+            session_mapping row, or None if the cookie has no claims or the
+            session may have been revoked and must be checked in the database
+    """
+    if "user_email" not in session or "expires_at" not in session:
+        return None
+    revoked_sessions.refresh(cur)
+    if revoked_sessions.might_contain(session_id):
+        return None
+    return (
+        session["user_email"],
+        session["expires_at"],
+        session.get("email_verified", False),
+    )
+
+
+def revoke_sessions(cur, session_ids):
+    """
+    End sessions before they expire.
+
+    The sessions are deleted from session_mapping and recorded in
+    session_revocation until they would have expired, so processes using
+    signed session tokens stop accepting them too.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        session_ids (list): IDs of the sessions to revoke
+    """
+    if not session_ids:
+        return
+    placeholders = in_placeholders(session_ids)
+    cur.execute(
+        f"""INSERT IGNORE INTO session_revocation (session_id, expires_at)
+            SELECT session_id, expires_at
+            FROM session_mapping
+            WHERE session_id IN ({placeholders})""",
+        tuple(session_ids),
+    )
+    cur.execute(
+        f"DELETE FROM session_mapping WHERE session_id IN ({placeholders})",
+        tuple(session_ids),
+    )
+    for session_id in session_ids:
+        revoked_sessions.add(session_id)
+
+
+def revoke_user_sessions(cur, user_email):
+    """
+    End every session of a user, e.g. after they were banned or deactivated.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        user_email (str): User whose sessions to revoke
+    """
+    cur.execute(
+        "SELECT session_id FROM session_mapping WHERE user_email = %s", (user_email,)
+    )
+    revoke_sessions(cur, [row[0] for row in cur.fetchall()])
+
+
+def enforce_session_cap(cur, user_email, session_id):
+    """
+    Revoke a user's oldest sessions beyond MAX_SESSIONS_PER_USER.
+
+    Call this right after inserting a new session, so a user who logs in
+    from many devices (or a script that logs in repeatedly) can't grow
+    session_mapping without bound. The new session is always kept, along
+    with the newest of the others. created_at only has one-second
+    resolution, so the new session is excluded by ID rather than trusted
+    to sort first.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        user_email (str): User who just started a session
+        session_id (str): ID of the session just started
+
+    Returns:
+        int: Number of sessions revoked
+    """
+    cur.execute(
+        """SELECT session_id
+            FROM session_mapping
+            WHERE user_email = %s
+                AND session_id <> %s
+            ORDER BY created_at DESC, session_id DESC
+            LIMIT 18446744073709551615 OFFSET %s""",
+        (user_email, session_id, max(Config.MAX_SESSIONS_PER_USER - 1, 0)),
+    )
+    session_ids = [row[0] for row in cur.fetchall()]
+    revoke_sessions(cur, session_ids)
+    return len(session_ids)
+
+
+def sweep_expired_sessions(conn, batch_size=None, max_batches=None):
+    """
+    Delete expired sessions in small batches.
+
+    Each batch is its own short transaction ordered by the expires_at index,
+    so the sweep never holds locks on a large part of the table and logins
+    keep going while it runs.
+
+    Args:
+        conn (MySQLdb.connections.Connection): Database connection
+        batch_size (int, optional): Rows per batch (default SESSION_SWEEP_BATCH_SIZE)
+        max_batches (int, optional): Batches per sweep (default SESSION_SWEEP_MAX_BATCHES)
+
+    Returns:
+        int: Number of expired sessions deleted
+    """
+    batch_size = batch_size or Config.SESSION_SWEEP_BATCH_SIZE
+    max_batches = max_batches or Config.SESSION_SWEEP_MAX_BATCHES
+    deleted = 0
+    cur = conn.cursor()
+    try:
+        for _ in range(max_batches):
+            cur.execute(
+                """DELETE FROM session_mapping
+                    WHERE expires_at < UTC_TIMESTAMP()
+                    ORDER BY expires_at
+                    LIMIT %s""",
+                (batch_size,),
+            )
+            conn.commit()
+            deleted += cur.rowcount
+            if cur.rowcount < batch_size:
+                break
+
+        # Revocations only matter until the session would have expired anyway
+        for _ in range(max_batches):
+            cur.execute(
+                """DELETE FROM session_revocation
+                    WHERE expires_at < UTC_TIMESTAMP()
+                    ORDER BY expires_at
+                    LIMIT %s""",
+                (batch_size,),
+            )
+            conn.commit()
+            if cur.rowcount < batch_size:
+                break
+    finally:
+        cur.close()
+    return deleted
+
+
+def session_table_stats(cur):
+    """
+    Measure the size of session_mapping.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+
+    Returns:
+        dict: {
+            "sessions": int,         # Total rows
+            "expiredSessions": int,  # Rows waiting to be swept
+            "dataBytes": int,        # InnoDB's estimate of the table size
+            "indexBytes": int        # InnoDB's estimate of the index size
+        }
+    """
+    cur.execute(
+        """SELECT COUNT(*), COALESCE(SUM(expires_at < UTC_TIMESTAMP()), 0)
+            FROM session_mapping"""
+    )
+    sessions, expired_sessions = cur.fetchone()
+    cur.execute(
+        """SELECT data_length, index_length
+            FROM information_schema.tables
+            WHERE table_schema = DATABASE()
+                AND table_name = 'session_mapping'"""
+    )
+    size = cur.fetchone() or (0, 0)
+    return {
+        "sessions": int(sessions),
+        "expiredSessions": int(expired_sessions),
+        "dataBytes": int(size[0] or 0),
+        "indexBytes": int(size[1] or 0),
+    }
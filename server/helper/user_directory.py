@@ -0,0 +1,193 @@
+import base64
+import json
+from helper.school_cache import SchoolCache
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Must match the server's ngram_token_size, the length of the pieces the
+# ngram parser splits names and emails into (2 by default)
+NGRAM_TOKEN_SIZE = 2
+
+# Sort orders, as the columns compared by the keyset condition. email is
+# the primary key, so it makes every order total.
+SORTS = {
+    "name": ("name", "email"),
+    "email": ("email",),
+}
+
+# Facet filters and the users column each one tests
+FACETS = {
+    "faculty": "is_faculty",
+    "banned": "is_banned",
+    "active": "is_active",
+}
+
+# Facet counts per school, recomputed at most every
+# USER_DIRECTORY_COUNTS_TTL_SECONDS and dropped when an admin changes a
+# user's flags
+directory_counts = SchoolCache("USER_DIRECTORY_COUNTS_TTL_SECONDS")
+
+
+def encode_cursor(values):
+    """
+    Opaque cursor for the page after the row with these sort values.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor, sort):
+    """
+    Read a cursor made by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed or was made for another sort
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    # Every sort column (name, email) is a string; anything else was not
+    # made by encode_cursor and can't be bound as a query parameter
+    if (
+        not isinstance(values, list)
+        or len(values) != len(SORTS[sort])
+        or not all(isinstance(value, str) for value in values)
+    ):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def search_condition(text):
+    """
+    Condition matching users whose name or email contains the search text.
+
+    Words of at least NGRAM_TOKEN_SIZE characters are looked up in the
+    ngram FULLTEXT index on name and email, which finds them anywhere in
+    the value the way LIKE '%word%' did, without scanning every user.
+    Shorter searches fall back to a prefix LIKE, which the
+    (school_id, name) index can answer.
+
+    Args:
+        text (str): Search box contents
+
+    Returns:
+        tuple: (SQL condition, parameters)
+    """
+    terms = [term.replace('"', "") for term in text.split()]
+    terms = [term for term in terms if term]
+    if terms and all(len(term) >= NGRAM_TOKEN_SIZE for term in terms):
+        query = " ".join(f'+"{term}"' for term in terms)
+        return "MATCH (name, email) AGAINST (%s IN BOOLEAN MODE)", [query]
+    prefix = (
+        text.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        + "%"
+    )
+    return "(name LIKE %s OR email LIKE %s)", [prefix, prefix]
+
+
+def list_users(
+    cur,
+    school_id,
+    search="",
+    facets=None,
+    sort="name",
+    descending=False,
+    cursor=None,
+    limit=DEFAULT_LIMIT,
+):
+    """
+    Fetch one page of a school's user directory.
+
+    Pages are found by keyset: the next page starts after the sort values
+    of the last row returned, so reading page 500 costs the same as page 1,
+    and users added meanwhile don't shift rows between pages.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        school_id (int): School whose users are listed
+        search (str): Optional text to find in names and emails
+        facets (dict): Optional facet name to required bool, e.g.
+            {"faculty": True}
+        sort (str): Key of SORTS
+        descending (bool): Sort in descending order
+        cursor (str): Cursor from the previous page, or None for the first
+        limit (int): Users per page
+
+    Returns:
+        tuple: (rows of name, email, is_active, is_banned, is_faculty,
+            cursor for the next page or None if this is the last page)
+
+    Raises:
+        ValueError: If the cursor is invalid
+    """
+    columns = SORTS[sort]
+    conditions = ["school_id = %s"]
+    params = [school_id]
+
+    if search:
+        condition, search_params = search_condition(search)
+        conditions.append(condition)
+        params.extend(search_params)
+    for facet, value in (facets or {}).items():
+        conditions.append(f"COALESCE({FACETS[facet]}, 0) = %s")
+        params.append(1 if value else 0)
+    if cursor:
+        conditions.append(
+            f"({', '.join(columns)}) {'<' if descending else '>'} "
+            f"({', '.join(['%s'] * len(columns))})"
+        )
+        params.extend(decode_cursor(cursor, sort))
+
+    direction = "DESC" if descending else "ASC"
+    cur.execute(
+        f"""SELECT name, email, is_active, is_banned, is_faculty
+            FROM users
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {", ".join(f"{column} {direction}" for column in columns)}
+            LIMIT %s""",
+        params + [limit + 1],
+    )
+    rows = cur.fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = {"name": rows[-1][0], "email": rows[-1][1]}
+    return rows, encode_cursor([last[column] for column in columns])
+
+
+def facet_counts(cur, school_id):
+    """
+    Count a school's users in total and per facet.
+
+    The counts come from the (school_id, is_faculty, is_banned, is_active)
+    index without reading any rows, and are cached in directory_counts.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        school_id (int): School whose users are counted
+
+    Returns:
+        dict: {"total": int, "faculty": int, "banned": int, "inactive": int}
+    """
+    key = (school_id,)
+    counts = directory_counts.get(key)
+    if counts is None:
+        cur.execute(
+            """SELECT COUNT(*),
+                      COALESCE(SUM(is_faculty = 1), 0),
+                      COALESCE(SUM(is_banned = 1), 0),
+                      COALESCE(SUM(is_active = 0), 0)
+                FROM users
+                WHERE school_id = %s""",
+            (school_id,),
+        )
+        total, faculty, banned, inactive = cur.fetchone()
+        counts = {
+            "total": int(total),
+            "faculty": int(faculty),
+            "banned": int(banned),
+            "inactive": int(inactive),
+        }
+        directory_counts.put(key, counts)
+    return counts
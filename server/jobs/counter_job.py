@@ -0,0 +1,74 @@
+import threading
+import time
+import schedule
+
+from flask import current_app, Flask
+from extensions import mysql
+from helper.counters import reconcile_counters
+from config import Config
+
+
+def reconcile_counter_columns():
+    """
+    Repair drift in the RSVP and subscriber counters.
+
+    Workflow:
+    1. Create a Flask application context
+    2. Recount every event and club in small batches
+    3. Log how many counts were wrong, which should normally be none
+    """
+    # Create an application context without importing main.py
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+
+    with app.app_context():
+        try:
+            repaired = reconcile_counters(mysql.connection)
+            if repaired["events"] or repaired["clubs"]:
+                current_app.logger.warning(
+                    f"Counter reconciliation repaired {repaired['events']} event "
+                    f"RSVP counts and {repaired['clubs']} club subscriber counts"
+                )
+            else:
+                current_app.logger.info("Counter reconciliation found no drift")
+        except Exception as e:
+            mysql.connection.rollback()
+            current_app.logger.error(f"Error in counter reconciliation job: {e}")
+
+
+class CounterReconcileScheduler:
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.scheduler_thread = None
+        self.scheduler = schedule.Scheduler()
+
+    def run_scheduler(self):
+        """
+        Run the counter reconciliation every night at 3:30 AM, after the
+        report rollups have been rebuilt.
+
+        Uses its own schedule.Scheduler so it does not run the jobs
+        registered on the other schedulers.
+        """
+        self.scheduler.every().day.at("03:30").do(reconcile_counter_columns)
+
+        while not self.stop_event.is_set():
+            self.scheduler.run_pending()
+            time.sleep(1)
+
+    def start(self):
+        """
+        Start the counter reconciliation scheduler in a separate daemon thread.
+        """
+        self.scheduler_thread = threading.Thread(target=self.run_scheduler)
+        self.scheduler_thread.daemon = True
+        self.scheduler_thread.start()
+
+    def stop(self):
+        """
+        Stop the counter reconciliation scheduler by setting the stop event and joining the thread.
+        """
+        self.stop_event.set()
+        if self.scheduler_thread is not None:
+            self.scheduler_thread.join()
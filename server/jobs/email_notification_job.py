@@ -6,8 +6,10 @@ from collections import defaultdict
 
 from flask import current_app, Flask
 from extensions import mysql
+from helper.db_routing import read_connection, replica
+from helper.ranking import load_interests, rank_suggested
 from helper.send_email import send_email
-from routes.events import get_events_by_date
+from routes.events import get_events_by_date, get_school_events
 from config import Config
 
 
@@ -16,26 +18,19 @@ def filter_events(user, events):
     Filter events based on user's email event type preferences.
 
     Args:
-        user (dict): User information containing email preferences and tags
+        user (dict): User information containing email preferences
         events (list): List of events to filter
 
     Returns:
         list: Filtered list of events matching user's preferences
 
     Filtering logic:
-    - 'Suggested': Events with shared tags and not blocked
     - 'Hosted by Subscribed Clubs': Events from subscribed clubs
     - 'Attending': Events the user has RSVP'd to
+
+    'Suggested' digests are ranked for all users at once by suggested_events.
     """
-    if user["email_event_type"] == "Suggested":
-        return list(
-            filter(
-                lambda x: x["rsvp"] != "block"  # Not rsvp'd no
-                and len(list(set(x["tags"]) & set(user["tags"]))) > 0,  # Shared tags
-                events,
-            )
-        )
-    elif user["email_event_type"] == "Hosted by Subscribed Clubs":
+    if user["email_event_type"] == "Hosted by Subscribed Clubs":
         return list(
             filter(
                 lambda x: x["subscribed"],
@@ -54,6 +49,41 @@ def filter_events(user, events):
     return events
 
 
+def suggested_events(cursor, users, windows):
+    """
+    Rank the Suggested events of many users at once.
+
+    Users are grouped by school and email frequency. Each group costs one
+    events query and three interest queries, and is ranked in one pass by
+    rank_suggested, instead of one events query and a per-event tag
+    intersection for every user.
+
+    Args:
+        cursor (mysql.connection.cursor): Active database cursor
+        users (list): Users whose email_event_type is 'Suggested'
+        windows (dict): Email frequency to (start, end) ISO 8601 dates
+
+    Returns:
+        dict: Email to list of events, by day and best first within a day
+    """
+    groups = defaultdict(list)
+    for user in users:
+        groups[(user["school_id"], user["email_frequency"])].append(user)
+
+    result = {}
+    for (school_id, frequency), group in groups.items():
+        start, end = windows[frequency]
+        events = get_school_events(cursor, start, end, school_id)
+        interests = load_interests(cursor, school_id, start, end)
+        events_by_id = {event["id"]: event for event in events}
+        for email, event_ids in rank_suggested(group, events, interests).items():
+            # Copies, since composing the email rewrites their times
+            ranked = [dict(events_by_id[event_id]) for event_id in event_ids]
+            ranked.sort(key=lambda event: event["startTime"][:10])
+            result[email] = ranked
+    return result
+
+
 def convert_times(event):
     """
     Convert event start and end times to a human-readable format.
@@ -123,13 +153,15 @@ def send_email_notifications():
     app = Flask(__name__)
     app.config.from_object(Config)
     mysql.init_app(app)
+    replica.init_app(app)
 
     with app.app_context():
         try:
-            with mysql.connection.cursor() as cursor:
+            # The job only reads, so it runs against the replica if there is one
+            with read_connection().cursor() as cursor:
                 # Fetch active, non-banned users with email preferences
                 cursor.execute(
-                    """SELECT u.email, u.email_frequency, u.email_event_type, u.school_id, s.school_name 
+                    """SELECT u.email, u.email_frequency, u.email_event_type, u.school_id, s.school_name, u.gender, u.is_faculty
                         FROM users u
                         INNER JOIN school s 
                             ON s.school_id = u.school_id
@@ -139,18 +171,6 @@ def send_email_notifications():
                             is_banned = 0
                 """
                 )
-                initial_users = list(map(lambda x: list(x), cursor.fetchall()))
-                for u in initial_users:
-                    cursor.execute(
-                        """SELECT t.tag_name 
-                            FROM user_tags ut 
-                            INNER JOIN tag t 
-                                ON ut.tag_id = t.tag_id 
-                            WHERE user_id = %s""",
-                        (u[0],),
-                    )
-                    tags = list(map(lambda x: x[0], cursor.fetchall()))
-                    u.append(tags)
                 users = list(
                     map(
                         lambda user: (
@@ -160,52 +180,55 @@ def send_email_notifications():
                                 "email_event_type": user[2],
                                 "school_id": user[3],
                                 "school_name": user[4],
-                                "tags": user[5],
+                                "gender": user[5],
+                                "isFaculty": user[6],
                             }
                         ),
-                        initial_users,
+                        cursor.fetchall(),
                     )
                 )
 
+                current_date = datetime.now(timezone.utc)
+                windows = {
+                    "Daily": (
+                        current_date.isoformat(),
+                        (current_date + timedelta(days=1)).isoformat(),
+                    ),
+                    "Weekly": (
+                        current_date.isoformat(),
+                        (current_date + timedelta(weeks=1)).isoformat(),
+                    ),
+                }
+                subjects = {"Daily": "Today at {}", "Weekly": "This Week at {}"}
+                # Weekly emails only go out on Mondays
+                if not current_date.weekday() == 0:
+                    users = [u for u in users if u["email_frequency"] != "Weekly"]
+                users = [u for u in users if u["email_frequency"] in windows]
+
+                suggested = suggested_events(
+                    cursor,
+                    [u for u in users if u["email_event_type"] == "Suggested"],
+                    windows,
+                )
+
                 for user in users:
-                    if user["email_frequency"] == "Daily":
-                        current_date = datetime.now(timezone.utc)
-                        one_day_later = current_date + timedelta(days=1)
-                        cd_iso = current_date.isoformat()
-                        odl_iso = one_day_later.isoformat()
+                    if user["email_event_type"] == "Suggested":
+                        events = suggested[user["email"]]
+                    else:
+                        start, end = windows[user["email_frequency"]]
                         events = get_events_by_date(
-                            cursor, cd_iso, odl_iso, user["school_id"], user["email"]
+                            cursor, start, end, user["school_id"], user["email"]
                         )
-                        if "events" in events:
-                            events = events["events"]
-                            events = filter_events(user, events)
-                            email_body = compose_event_email(events)
-                            send_email(
-                                user["email"],
-                                f"Today at {user['school_name']}",
-                                email_body,
-                                True,
-                            )
-                    elif user["email_frequency"] == "Weekly":
-                        current_date = datetime.now(timezone.utc)
-                        one_week_later = current_date + timedelta(weeks=1)
-                        if not current_date.weekday() == 0:
-                            return
-                        cd_iso = current_date.isoformat()
-                        owl_iso = one_week_later.isoformat()
-                        events = get_events_by_date(
-                            cursor, cd_iso, owl_iso, user["school_id"], user["email"]
-                        )
-                        if "events" in events:
-                            events = events["events"]
-                            events = filter_events(user, events)
-                            email_body = compose_event_email(events)
-                            send_email(
-                                user["email"],
-                                f"This Week at {user['school_name']}",
-                                email_body,
-                                True,
-                            )
+                        if "events" not in events:
+                            continue
+                        events = filter_events(user, events["events"])
+                    email_body = compose_event_email(events)
+                    send_email(
+                        user["email"],
+                        subjects[user["email_frequency"]].format(user["school_name"]),
+                        email_body,
+                        True,
+                    )
 
         except Exception as e:
             current_app.logger.error(f"Error in email notification job: {e}")
@@ -0,0 +1,87 @@
+import threading
+import time
+import schedule
+
+from flask import current_app, Flask
+from extensions import mysql
+from helper.rollups import rebuild_all_rollups, refresh_dirty_rollups, refresh_tag_usage
+from config import Config
+
+
+def refresh_report_rollups(full_rebuild=False):
+    """
+    Bring the report rollup tables up to date.
+
+    Workflow:
+    1. Create a Flask application context
+    2. Rebuild the days flagged as dirty by RSVP and event writes
+       (or every day, for a full rebuild)
+    3. Refresh the per-tag usage snapshot
+    4. Commit everything in one transaction so reports never see a
+       half-built rollup
+
+    Args:
+        full_rebuild (bool): Rebuild every day instead of only dirty days
+    """
+    # Create an application context without importing main.py
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+
+    with app.app_context():
+        try:
+            with mysql.connection.cursor() as cursor:
+                if full_rebuild:
+                    rebuild_all_rollups(cursor)
+                else:
+                    refresh_dirty_rollups(cursor)
+                    refresh_tag_usage(cursor)
+            mysql.connection.commit()
+        except Exception as e:
+            mysql.connection.rollback()
+            current_app.logger.error(f"Error in report rollup job: {e}")
+
+
+class RollupScheduler:
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.scheduler_thread = None
+        self.scheduler = schedule.Scheduler()
+
+    def run_scheduler(self):
+        """
+        Run the report rollup scheduler.
+
+        This function sets up scheduled tasks for the report rollups:
+        - Dirty days every ROLLUP_INTERVAL_MINUTES minutes
+        - A full rebuild every night at 3 AM
+
+        Uses its own schedule.Scheduler so it does not run the email jobs
+        registered on the default scheduler.
+        """
+        self.scheduler.every(Config.ROLLUP_INTERVAL_MINUTES).minutes.do(
+            refresh_report_rollups
+        )
+        self.scheduler.every().day.at("03:00").do(
+            refresh_report_rollups, full_rebuild=True
+        )
+
+        while not self.stop_event.is_set():
+            self.scheduler.run_pending()
+            time.sleep(1)
+
+    def start(self):
+        """
+        Start the rollup scheduler in a separate daemon thread.
+        """
+        self.scheduler_thread = threading.Thread(target=self.run_scheduler)
+        self.scheduler_thread.daemon = True
+        self.scheduler_thread.start()
+
+    def stop(self):
+        """
+        Stop the rollup scheduler by setting the stop event and joining the thread.
+        """
+        self.stop_event.set()
+        if self.scheduler_thread is not None:
+            self.scheduler_thread.join()
@@ -0,0 +1,79 @@
+import threading
+import time
+import schedule
+
+from flask import current_app, Flask
+from extensions import mysql
+from helper.sessions import session_table_stats, sweep_expired_sessions
+from config import Config
+
+# Session table size as of the last sweep
+last_session_stats = {}
+
+
+def sweep_sessions():
+    """
+    Delete expired sessions and record the size of the session table.
+
+    Workflow:
+    1. Create a Flask application context
+    2. Delete expired sessions in small batches
+    3. Record and log the table size afterwards
+    """
+    # Create an application context without importing main.py
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    mysql.init_app(app)
+
+    with app.app_context():
+        try:
+            deleted = sweep_expired_sessions(mysql.connection)
+            with mysql.connection.cursor() as cursor:
+                stats = session_table_stats(cursor)
+            last_session_stats.update(stats, sweptSessions=deleted, sweptAt=time.time())
+            current_app.logger.info(
+                f"Session sweep deleted {deleted} expired sessions; "
+                f"{stats['sessions']} sessions remain "
+                f"({stats['dataBytes'] + stats['indexBytes']} bytes)"
+            )
+        except Exception as e:
+            mysql.connection.rollback()
+            current_app.logger.error(f"Error in session sweep job: {e}")
+
+
+class SessionSweepScheduler:
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.scheduler_thread = None
+        self.scheduler = schedule.Scheduler()
+
+    def run_scheduler(self):
+        """
+        Run the session sweep every SESSION_SWEEP_INTERVAL_MINUTES minutes.
+
+        Uses its own schedule.Scheduler so it does not run the jobs
+        registered on the other schedulers.
+        """
+        self.scheduler.every(Config.SESSION_SWEEP_INTERVAL_MINUTES).minutes.do(
+            sweep_sessions
+        )
+
+        while not self.stop_event.is_set():
+            self.scheduler.run_pending()
+            time.sleep(1)
+
+    def start(self):
+        """
+        Start the session sweep scheduler in a separate daemon thread.
+        """
+        self.scheduler_thread = threading.Thread(target=self.run_scheduler)
+        self.scheduler_thread.daemon = True
+        self.scheduler_thread.start()
+
+    def stop(self):
+        """
+        Stop the session sweep scheduler by setting the stop event and joining the thread.
+        """
+        self.stop_event.set()
+        if self.scheduler_thread is not None:
+            self.scheduler_thread.join()
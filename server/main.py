@@ -14,12 +14,26 @@ from routes.school import school_bp
 from routes.emails import emails_bp
 from routes.prefs import prefs_bp
 from routes.reports import reports_bp
+from routes.metrics import metrics_bp
+from routes.live import live_bp
 from jobs.email_notification_job import EmailScheduler
+from jobs.rollup_job import RollupScheduler
+from jobs.session_job import SessionSweepScheduler
+from jobs.counter_job import CounterReconcileScheduler
 from flask_jwt_extended import JWTManager
 from flask.signals import appcontext_tearing_down
 import atexit
 import signal
 from flask_mysqldb import MySQLdb
+from helper.db_routing import mark_recent_write, replica
+from helper.load_shedding import rate_limited_response
+from helper.metrics import request_metrics
+from helper.logs import configure_logging, stop_logging
+from helper.serialization import install_json_provider
+from helper.compression import compression
+from helper.live_updates import live_updates
+from helper.report_jobs import report_jobs
+from helper import passwords
 
 
 def create_app(config_class=Config):
@@ -36,11 +50,17 @@ def create_app(config_class=Config):
 
     app = Flask(__name__)
     app.config.from_object(config_class)
+    configure_logging(app)
+    install_json_provider(app)
 
     jwt = JWTManager(app)
 
     # Initialize extensions
     mysql.init_app(app)
+    replica.init_app(app)
+    request_metrics.init_app(app)
+    # Registered after the metrics so they record the compressed size
+    compression.init_app(app)
 
     # Access JWT_EXPIRATION in your setup
     app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(seconds=Config.JWT_EXPIRATION)
@@ -85,7 +105,7 @@ def create_app(config_class=Config):
                     "Access-Control-Allow-Headers",
                     "Access-Control-Allow-Origin",
                 ],
-                "expose_headers": ["Set-Cookie"],
+                "expose_headers": ["Set-Cookie", "Retry-After", "X-Request-ID"],
                 "max_age": 600,
             }
         },
@@ -93,6 +113,7 @@ def create_app(config_class=Config):
 
     # Rate limiting
     limiter.init_app(app)
+    app.register_error_handler(429, rate_limited_response)
 
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -106,14 +127,35 @@ def create_app(config_class=Config):
     app.register_blueprint(emails_bp, url_prefix="/api/emails")
     app.register_blueprint(prefs_bp, url_prefix="/api/prefs")
     app.register_blueprint(reports_bp, url_prefix="/api/reports")
+    app.register_blueprint(metrics_bp, url_prefix="/api/metrics")
+    app.register_blueprint(live_bp, url_prefix="/api/live")
 
     # Start email scheduler
     email_scheduler = EmailScheduler()
     email_scheduler.start()
 
-    # Handle SIGINT (Ctrl+C) to stop the scheduler gracefully
+    # Start report rollup scheduler
+    rollup_scheduler = RollupScheduler()
+    rollup_scheduler.start()
+
+    # Start expired session sweeper
+    session_scheduler = SessionSweepScheduler()
+    session_scheduler.start()
+
+    # Start nightly counter reconciliation
+    counter_scheduler = CounterReconcileScheduler()
+    counter_scheduler.start()
+
+    # Handle SIGINT (Ctrl+C) to stop the schedulers and report jobs gracefully
     def handle_sigint(signum, frame):
         email_scheduler.stop()
+        rollup_scheduler.stop()
+        session_scheduler.stop()
+        counter_scheduler.stop()
+        report_jobs.shutdown()
+        live_updates.stop()
+        passwords.shutdown()
+        stop_logging()
         exit(0)
 
     # Register the stop method to be called on program exit
@@ -126,6 +168,18 @@ def create_app(config_class=Config):
         is_mobile = request.headers.get("X-Client-Type", "web") == "mobile"
         check_session_timeout(is_mobile)
 
+    @app.after_request
+    def after_request(response):
+        # Keep the user's reads on the primary right after a successful write
+        view = app.view_functions.get(request.endpoint)
+        if (
+            request.method in ("POST", "PUT", "DELETE")
+            and response.status_code < 400
+            and not getattr(view, "read_only", False)
+        ):
+            mark_recent_write()
+        return response
+
     @appcontext_tearing_down.connect_via(app)
     def close_mysql_connection(sender, **extra):
         try:
@@ -1,8 +1,27 @@
+import logging
 from flask import Blueprint, jsonify, request, session
 from extensions import mysql
 from helper.check_user import get_user_session_info
+from helper.club_affinity import forget_user
+from helper.counters import recount_user
+from helper.db_routing import read_connection
+from helper.rollups import mark_user_rollups_dirty
+from helper.serialization import row_mapper
+from helper.sessions import revoke_user_sessions, session_table_stats
+from helper.user_directory import (
+    DEFAULT_LIMIT,
+    FACETS,
+    MAX_LIMIT,
+    SORTS,
+    directory_counts,
+    facet_counts,
+    list_users,
+    search_condition,
+)
+from jobs.session_job import last_session_stats
 
 admintools_bp = Blueprint("admintools", __name__)
+logger = logging.getLogger(__name__)
 
 
 @admintools_bp.route("/user/role", methods=["GET"])
@@ -37,7 +56,7 @@ def get_user_role():
 
     except Exception as e:
         # Log the actual error for debugging
-        print(f"Error fetching user role: {str(e)}")
+        logger.exception("Error fetching user role")
         return jsonify({"error": "An unexpected error occurred"}), 500
 
 
@@ -128,6 +147,7 @@ def assign_faculty():
             (can_delete, email, session.get("school")),
         )
         conn.commit()
+        directory_counts.invalidate(session.get("school"))
         return (
             jsonify(
                 {"name": result[0], "email": email, "can_delete_faculty": can_delete}
@@ -137,7 +157,7 @@ def assign_faculty():
 
     except Exception as e:
         # Log the actual error for debugging
-        print(f"Error assigning faculty: {str(e)}")
+        logger.exception("Error assigning faculty")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -181,12 +201,11 @@ def get_faculty_data():
     try:
         # Check if current user has faculty privileges
         current_user = get_user_session_info()
-        print(current_user)
         if not current_user["isFaculty"]:
             return jsonify({"error": "Unauthorized"}), 403
 
         # Establish database connection
-        conn = mysql.connection
+        conn = read_connection()
         cur = conn.cursor()
 
         # Query to fetch faculty data
@@ -211,7 +230,7 @@ def get_faculty_data():
 
     except Exception as e:
         # Log the actual error for debugging
-        print(f"Error fetching faculty data: {str(e)}")
+        logger.exception("Error fetching faculty data")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -276,11 +295,12 @@ def remove_faculty():
             (data["email"], session.get("school")),
         )
         conn.commit()
+        directory_counts.invalidate(session.get("school"))
         return jsonify({"message": "Faculty privileges removed"}), 200
 
     except Exception as e:
         # Log the actual error for debugging
-        print(f"Error removing faculty: {str(e)}")
+        logger.exception("Error removing faculty")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -354,7 +374,7 @@ def assign_delete():
 
     except Exception as e:
         # Log the actual error for debugging
-        print(f"Error changing faculty deletion abilities: {str(e)}")
+        logger.exception("Error changing faculty deletion abilities")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -473,7 +493,7 @@ def update_user(email):
         # Rollback in case of error and log the actual error for debugging
         if cur:
             conn.rollback()
-        print(f"Error in update_user: {str(e)}")
+        logger.exception("Error in update_user")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -617,7 +637,18 @@ def toggle_user_status(email):
                     WHERE ut.user_id = %s 
                         AND u.school_id = %s"""
                 cur.execute(delete_query, (email, session.get("school")))
+                forget_user(cur, email)
+            if is_active != current_is_active:
+                recount_user(cur, email)
+                mark_user_rollups_dirty(cur, email)
+            # Signed sessions carry the user's details for a while, so end
+            # them rather than wait for the details to be reloaded
+            if (not is_active and current_is_active) or (
+                is_banned and not current_is_banned
+            ):
+                revoke_user_sessions(cur, email)
             conn.commit()
+            directory_counts.invalidate(session.get("school"))
 
         return (
             jsonify(
@@ -634,13 +665,23 @@ def toggle_user_status(email):
         # Rollback in case of error and log the actual error for debugging
         if cur:
             conn.rollback()
-        print(f"Error in toggle_user_status: {str(e)}")
+        logger.exception("Error in toggle_user_status")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
             cur.close()
 
 
+# Columns of the get_users query
+USER_ROW = row_mapper(
+    name=0,
+    email=1,
+    is_active=(2, bool),
+    is_banned=(3, bool),
+    is_faculty=(4, bool),
+)
+
+
 @admintools_bp.route("/get-users", methods=["GET"])
 def get_users():
     """
@@ -688,7 +729,7 @@ def get_users():
         search_query = request.args.get("search", "").strip()
 
         # Establish database connection
-        conn = mysql.connection
+        conn = read_connection()
         cur = conn.cursor()
 
         # Prepare base query with optional search filtering
@@ -700,36 +741,132 @@ def get_users():
         params = [session.get("school")]
 
         if search_query:
-            query += " AND (name LIKE %s OR email LIKE %s)"
-            search_param = f"%{search_query}%"
-            params.extend([search_param, search_param])
+            condition, search_params = search_condition(search_query)
+            query += f" AND {condition}"
+            params.extend(search_params)
 
         cur.execute(query, params)
         users = cur.fetchall()
 
         # Convert results to list of dictionaries
-        user_list = [
-            {
-                "name": user[0],
-                "email": user[1],
-                "is_active": bool(user[2]),
-                "is_banned": bool(user[3]),
-                "is_faculty": bool(user[4]),
-            }
-            for user in users
-        ]
+        user_list = [USER_ROW(user) for user in users]
 
         return jsonify(user_list), 200
 
     except Exception as e:
         # Log the actual error for debugging
-        print(f"Error in get_users: {str(e)}")
+        logger.exception("Error in get_users")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
             cur.close()
 
 
+@admintools_bp.route("/users", methods=["GET"])
+def get_user_directory():
+    """
+    Retrieve one page of the school's user directory.
+
+    Faculty only. Unlike /get-users, results are paged, so the directory
+    stays fast for schools with tens of thousands of students.
+
+    Query Parameters:
+    - search (optional): Text to find in names and emails
+    - faculty, banned, active (optional): 'true' or 'false' to filter on
+      that flag
+    - sort (optional): 'name' (default) or 'email'
+    - order (optional): 'asc' (default) or 'desc'
+    - cursor (optional): nextCursor from the previous page
+    - limit (optional): Users per page (default: 50, at most 200)
+
+    Returns:
+        JSON response:
+        - On successful retrieval:
+            {
+                "users": [
+                    {
+                        "name": str,
+                        "email": str,
+                        "is_active": bool,
+                        "is_banned": bool,
+                        "is_faculty": bool
+                    },
+                    ...
+                ],
+                "nextCursor": str or null,
+                "counts": {
+                    "total": int,
+                    "faculty": int,
+                    "banned": int,
+                    "inactive": int
+                }
+            }, 200 status
+        - On unauthorized access (not faculty):
+            {"error": "Unauthorized"}, 403 status
+        - On invalid parameters:
+            {"error": str}, 400 status
+        - On unexpected error:
+            {"error": "An unexpected error occurred"}, 500 status
+
+    Behavior:
+    - Pages by keyset on the sort columns, so deep pages are as cheap as the first
+    - counts are school-wide, whatever the filters, and may be up to
+      USER_DIRECTORY_COUNTS_TTL_SECONDS old
+    """
+    current_user = get_user_session_info()
+    if not current_user or not current_user.get("isFaculty"):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    sort = request.args.get("sort") or "name"
+    order = request.args.get("order") or "asc"
+    if sort not in SORTS or order not in ("asc", "desc"):
+        return jsonify({"error": "Invalid sort parameter"}), 400
+    facets = {}
+    for facet in FACETS:
+        value = request.args.get(facet)
+        if value in ("true", "false"):
+            facets[facet] = value == "true"
+        elif value:
+            return jsonify({"error": f"Invalid {facet} parameter"}), 400
+    try:
+        limit = int(request.args.get("limit") or DEFAULT_LIMIT)
+    except ValueError:
+        return jsonify({"error": "Invalid limit parameter"}), 400
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    cur = read_connection().cursor()
+    try:
+        rows, next_cursor = list_users(
+            cur,
+            session.get("school"),
+            request.args.get("search", "").strip(),
+            facets,
+            sort,
+            order == "desc",
+            request.args.get("cursor"),
+            limit,
+        )
+        counts = facet_counts(cur, session.get("school"))
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    except Exception as e:
+        logger.exception("Error in get_user_directory")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+    finally:
+        cur.close()
+
+    return (
+        jsonify(
+            {
+                "users": [USER_ROW(row) for row in rows],
+                "nextCursor": next_cursor,
+                "counts": counts,
+            }
+        ),
+        200,
+    )
+
+
 @admintools_bp.route("/get-reported-comments", methods=["GET"])
 def get_comments():
     user = get_user_session_info()
@@ -763,7 +900,7 @@ def get_comments():
         return jsonify(comment_list), 200
 
     except Exception as e:
-        print(f"Error getting comments: {str(e)}")
+        logger.exception("Error getting comments")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -778,7 +915,6 @@ def approve_comment():
     cur = mysql.connection.cursor()
 
     data = request.json
-    print("data: ", data)
 
     # Establish database connection
     conn = mysql.connection
@@ -796,7 +932,7 @@ def approve_comment():
 
         return jsonify({"message": "Comment approved successfully"}), 200
     except Exception as e:
-        print(f"Error approving comment: {str(e)}")
+        logger.exception("Error approving comment")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -811,7 +947,6 @@ def delete_comment():
     cur = mysql.connection.cursor()
 
     data = request.json
-    print("data: ", data)
 
     # Establish database connection
     conn = mysql.connection
@@ -829,8 +964,46 @@ def delete_comment():
 
         return jsonify({"message": "Comment deleted successfully"}), 200
     except Exception as e:
-        print(f"Error deleting comment: {str(e)}")
+        logger.exception("Error deleting comment")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
             cur.close()
+
+
+@admintools_bp.route("/session-stats", methods=["GET"])
+def get_session_stats():
+    """
+    Report the size of the session table and the result of the last sweep.
+
+    Faculty only.
+
+    Returns:
+        JSON response:
+        - On successful retrieval:
+            {
+                "sessions": int,
+                "expiredSessions": int,
+                "dataBytes": int,
+                "indexBytes": int,
+                "lastSweep": {"sweptSessions": int, "sweptAt": float, ...} or null
+            }, 200 status
+        - On unauthorized access (not faculty):
+            {"error": "Unauthorized"}, 403 status
+        - On unexpected error:
+            {"error": "An unexpected error occurred"}, 500 status
+    """
+    current_user = get_user_session_info()
+    if not current_user.get("isFaculty"):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    cur = mysql.connection.cursor()
+    try:
+        stats = session_table_stats(cur)
+        stats["lastSweep"] = dict(last_session_stats) or None
+        return jsonify(stats), 200
+    except Exception as e:
+        logger.exception("Error in get_session_stats")
+        return jsonify({"error": "An unexpected error occurred"}), 500
+    finally:
+        cur.close()
@@ -1,8 +1,8 @@
+import logging
 from datetime import datetime, timezone, timedelta
 import random
 import string
 from flask import Blueprint, request, jsonify, session
-from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import mysql, limiter
 from helper.send_email import send_email
 import requests
@@ -14,8 +14,16 @@ import secrets
 from helper.check_user import (
     get_user_session_info,
 )  # For generating secure random tokens
+from helper.passwords import hash_password, matches_any, needs_rehash, verify_password
+from helper.sessions import (
+    drop_user_claims,
+    enforce_session_cap,
+    revoke_sessions,
+    sign_session_claims,
+)
 
 auth_bp = Blueprint("auth", __name__)
+logger = logging.getLogger(__name__)
 
 
 # Function to update the email verification status in the database
@@ -85,7 +93,7 @@ def send_verification_email(email, code):
         send_email(email, subject, body)
         return True
     except Exception as e:
-        print(f"Failed to send email to {email} with code {code}: {e}")
+        logger.exception("Failed to send verification email")
         return False
 
 
@@ -168,6 +176,7 @@ def verify_email():
 
         if update_success:
             session.pop("verification_code", None)
+            session["email_verified"] = True
             return jsonify({"message": "Email verified successfully"}), 200
         else:
             return jsonify({"error": "Failed to update verification status"}), 500
@@ -264,7 +273,6 @@ def check_user():
         - No active session: Null user details, 401 status
     """
     mfa_required = request.args.get("noMFA", False)
-    print(mfa_required)
     user_info = get_user_session_info(mfa_required=(not mfa_required))
 
     # Determine status code based on user_id presence
@@ -310,7 +318,8 @@ def login():
     Behavior:
     - Validates input data
     - Checks database for user credentials
-    - Verifies password using Werkzeug's check_password_hash
+    - Verifies password using the password hashing service, rehashing it
+      if PASSWORD_HASH_METHOD has changed since it was stored
     - Sets session variables with a random session token
     - Resets email verification status
     - Supports optional "remember me" functionality
@@ -347,9 +356,16 @@ def login():
 
     # Verify the provided password against the hashed password
     hashed_password = result[0]
-    if not check_password_hash(hashed_password, data["password"]):
+    if not verify_password(hashed_password, data["password"]):
         return jsonify({"error": "Authentication failed"}), 401
 
+    # Upgrade hashes made with an older method or cost
+    if needs_rehash(hashed_password):
+        cur.execute(
+            "UPDATE users SET pwd1 = %s WHERE email = %s",
+            (hash_password(data["password"]), data["email"]),
+        )
+
     # Generate a random session token
     session_token = secrets.token_hex(32)
 
@@ -365,12 +381,14 @@ def login():
            VALUES (%s, %s, %s, %s, %s)""",
         (session_token, data["email"], data["school"], now, expires_at),
     )
+    enforce_session_cap(cur, data["email"], session_token)
     mysql.connection.commit()
 
     # Set the session variables
     session["session_id"] = session_token
     session["school"] = data["school"]
     session["last_activity"] = now
+    sign_session_claims(data["email"], expires_at)
 
     cur.close()
 
@@ -412,13 +430,11 @@ def logout():
         try:
             cur = mysql.connection.cursor()
             # Remove the session token from the database
-            cur.execute(
-                "DELETE FROM session_mapping WHERE session_id = %s", (session_id,)
-            )
+            revoke_sessions(cur, [session_id])
             mysql.connection.commit()
             cur.close()
         except Exception as e:
-            print(f"Error invalidating session: {str(e)}")
+            logger.exception("Error invalidating session")
             return jsonify({"error": "Failed to log out"}), 500
 
     # Clear all session data
@@ -526,7 +542,7 @@ def signup():
                     YEAR_STARTED = %s
                 WHERE EMAIL = %s AND SCHOOL_ID = %s""",
                 (
-                    generate_password_hash(password),
+                    hash_password(password),
                     gender,
                     name,
                     email_frequency,
@@ -550,19 +566,21 @@ def signup():
                    VALUES (%s, %s, %s, %s, %s)""",
                 (session_token, email, school, now, expires_at),
             )
+            enforce_session_cap(cur, email, session_token)
             mysql.connection.commit()
 
             # Set session variables
             session["session_id"] = session_token
             session["school"] = school
             session["last_activity"] = now
+            sign_session_claims(email, expires_at)
 
             return jsonify({"message": "User reactivated successfully"}), 200
 
         return jsonify({"error": "Email already in use"}), 400
 
     # Hash the password
-    hashed_password = generate_password_hash(password)
+    hashed_password = hash_password(password)
 
     # Insert the new user into the database
     cur.execute(
@@ -608,12 +626,14 @@ def signup():
            VALUES (%s, %s, %s, %s, %s)""",
         (session_token, email, school, now, expires_at),
     )
+    enforce_session_cap(cur, email, session_token)
     mysql.connection.commit()
 
     # Set session variables
     session["session_id"] = session_token
     session["school"] = school
     session["last_activity"] = now
+    sign_session_claims(email, expires_at)
 
     cur.close()
     return jsonify({"message": "User created successfully"}), 201
@@ -692,8 +712,8 @@ def reset_password():
 
     # Verify the provided current password against the hashed password
     hashed_password = result[0]
-    if not check_password_hash(hashed_password, data["oldPassword"]):
-        print("Invalid current password")
+    if not verify_password(hashed_password, data["oldPassword"]):
+        logger.info("Password reset rejected: invalid current password")
         return jsonify({"error": "Authentication failed"}), 401
 
     # Check if email is verified
@@ -703,19 +723,7 @@ def reset_password():
 
     # Check if the new password is unique to the last three saved passwords
     new_password = data["newPassword"]
-    if (
-        check_password_hash(result[0], new_password)
-        or (
-            check_password_hash(result[1], new_password)
-            if result[1] is not None
-            else False
-        )
-        or (
-            check_password_hash(result[2], new_password)
-            if result[2] is not None
-            else False
-        )
-    ):
+    if matches_any(result[:3], new_password):
         return (
             jsonify({"error": "New password cannot be a previously used password"}),
             400,
@@ -729,7 +737,7 @@ def reset_password():
         (
             result[1],
             result[0],
-            generate_password_hash(new_password),
+            hash_password(new_password),
             data["emailRequest"],
         ),
     )
@@ -738,7 +746,7 @@ def reset_password():
     # Invalidate the current session token
     session_id = session.pop("session_id", None)
     if session_id:
-        cur.execute("DELETE FROM session_mapping WHERE session_id = %s", (session_id,))
+        revoke_sessions(cur, [session_id])
         mysql.connection.commit()
 
     # # Generate a new session token
@@ -953,11 +961,7 @@ def forgot_password_reset():
     # Check if new password is unique to the last three saved passwords
     new_password = data["newPassword"]
 
-    if (
-        check_password_hash(result[0], new_password)
-        or check_password_hash(result[1] if result[1] is not None else "", new_password)
-        or check_password_hash(result[2] if result[2] is not None else "", new_password)
-    ):
+    if matches_any(result[:3], new_password):
         return (
             jsonify({"error": "New password cannot be a previously used password"}),
             400,
@@ -971,7 +975,7 @@ def forgot_password_reset():
         (
             str(result[1]),
             str(result[0]),
-            generate_password_hash(str(data["newPassword"])),
+            hash_password(str(data["newPassword"])),
             str(data["token"]),
         ),
     )
@@ -1030,7 +1034,6 @@ def update_account_info():
     try:
         # Parse the input data
         data = request.get_json()
-        print(f"Received request data: {data}")
 
         if not data:
             return jsonify({"error": "No data was provided"}), 400
@@ -1054,11 +1057,9 @@ def update_account_info():
 
         # Retrieve the current user from session
         current_user = get_user_session_info()
-        print(f"Current user session info: {current_user}")
 
         # Validate session data
         if not current_user or "user_id" not in current_user:
-            print(f"Invalid session data: {current_user}")
             return jsonify({"error": "User session is invalid or expired"}), 401
 
         # Map user_id to email
@@ -1083,11 +1084,12 @@ def update_account_info():
             (new_name, gender, semester, year, email),
         )
         mysql.connection.commit()
+        drop_user_claims()
 
         return jsonify({"message": "Account info updated successfully"}), 200
 
     except Exception as e:
-        print(f"Error occurred: {str(e)}")  # Debugging
+        logger.exception("Error updating account info")
         return (
             jsonify({"error": "An error occurred while updating your account info"}),
             500,
@@ -1,13 +1,36 @@
+import logging
 import base64
 from flask import Blueprint, jsonify, request, session
 from extensions import mysql
+from helper.bulk_writes import find_missing, insert_rows, sync_association
+from helper.club_sync import (
+    parse_club_tags,
+    sync_club_admins,
+    sync_club_logo,
+    sync_club_photos,
+)
 from helper.check_user import get_user_session_info
-import traceback
+from helper.club_affinity import club_tags_changed
+from helper.db_routing import read_connection
+from helper.load_shedding import expensive_route
+from helper.search import page_params, search_clubs
+from helper.serialization import row_mapper, split_list
 import json
 from helper.send_email import send_email
 
 
 clubs_bp = Blueprint("clubs", __name__)
+logger = logging.getLogger(__name__)
+
+
+# Columns of the get_clubs query
+CLUB_ROW = row_mapper(
+    id=0,
+    name=1,
+    description=2,
+    subscribed=(3, lambda subscribed: subscribed == 1),
+    tags=(4, split_list),
+)
 
 
 @clubs_bp.route("/clubs", methods=["GET"])
@@ -22,6 +45,8 @@ def get_clubs():
     Query Parameters:
         - 'filter' (optional): Filter clubs by 'Subscribed', 'Suggested', or none
         - 'inactive' (optional): Filter clubs by being inactive, or not inactive (default)
+        - 'limit' (optional): Return at most this many clubs, e.g. the top
+          Suggested clubs
 
     Returns:
         JSON response with the following structure:
@@ -51,6 +76,12 @@ def get_clubs():
         inactive_query = request.args.get("inactive")
         filter_query = filter_query if filter_query else ""
         inactive_query = "0" if inactive_query else "1"
+        try:
+            limit = int(request.args.get("limit") or 0)
+            if limit < 0:
+                raise ValueError(limit)
+        except ValueError:
+            return jsonify({"error": "Invalid limit"}), 400
 
         # Check if user is authenticated
         current_user = get_user_session_info()
@@ -63,11 +94,11 @@ def get_clubs():
         # Get current school id
         school = session.get("school")
 
-        cur = mysql.connection.cursor()
+        cur = read_connection().cursor()
 
         # First query to fetch club details without club_logo
         cur.execute(
-            """SELECT c.club_id, 
+            f"""SELECT c.club_id, 
                     c.club_name, 
                     c.description, 
                     COALESCE(us.subscribed_or_blocked, 0) AS subscribed_or_blocked,
@@ -77,6 +108,9 @@ def get_clubs():
                     ON c.club_id = us.club_id
                     AND us.email = %s
                     AND us.is_active = 1
+                LEFT JOIN user_club_affinity a
+                    ON a.club_id = c.club_id
+                    AND a.user_id = %s
                 LEFT JOIN club_tags ct
                     ON c.club_id = ct.club_id
                 LEFT JOIN tag t
@@ -90,21 +124,24 @@ def get_clubs():
                     AND (%s <> 'Suggested' 
                         OR ((us.is_active = 1 
                             AND us.subscribed_or_blocked = 1)
-                            OR (EXISTS (
-                                SELECT * FROM user_tags ut
-                                WHERE ut.user_id = %s
-                                    AND ut.tag_id IN (SELECT tag_id FROM club_tags WHERE club_id = c.club_id)
-                            ) AND (NOT (us.is_active = 1 AND us.subscribed_or_blocked = 0)
+                            OR (a.shared_tags > 0
+                                AND (NOT (us.is_active = 1 AND us.subscribed_or_blocked = 0)
                                     OR us.email IS NULL))))
-                GROUP BY c.club_id, c.club_name, c.description, subscribed_or_blocked""",
+                GROUP BY c.club_id, c.club_name, c.description, subscribed_or_blocked, a.shared_tags
+                ORDER BY CASE WHEN %s = 'Suggested'
+                            THEN COALESCE(a.shared_tags, 0) END DESC,
+                         c.club_id
+                {"LIMIT %s" if limit else ""}""",
             (
+                current_user["user_id"],
                 current_user["user_id"],
                 school,
                 inactive_query,
                 school,
                 filter_query,
                 filter_query,
-                current_user["user_id"],
+                filter_query,
+                *([limit] if limit else []),
             ),
         )
         clubs = cur.fetchall()
@@ -112,25 +149,70 @@ def get_clubs():
         if not clubs:
             return jsonify([]), 200
 
-        result = [
-            {
-                "id": club[0],
-                "name": club[1],
-                "description": club[2],
-                "subscribed": True if (club[3] == 1 or club[3] == True) else False,
-                "tags": club[4].split(",") if club[4] else [],
-            }
-            for club in clubs
-        ]
+        result = [CLUB_ROW(club) for club in clubs]
 
         cur.close()
         return jsonify(result), 200
 
     except Exception as e:
-        print(traceback.format_exc())
+        logger.exception("Error in get_clubs")
         return jsonify({"error": str(e)}), 500
 
 
+@clubs_bp.route("/search", methods=["GET"])
+@expensive_route("60 per minute")
+def search():
+    """
+    Search active clubs by name and description.
+
+    Query Parameters:
+        q (str): Search text; every word must match, as a word or word prefix
+        page (int): Page of results, starting at 1 (default: 1)
+        per_page (int): Results per page (default: 20, at most 50)
+
+    Returns:
+        JSON response:
+        - On success:
+            {
+                "results": [
+                    {
+                        "id": int,
+                        "name": str,
+                        "description": str,
+                        "tags": [str],
+                        "score": float
+                    }
+                ],
+                "page": int,
+                "perPage": int,
+                "hasMore": bool
+            }, 200 status
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+        - On invalid parameters: {"error": str}, 400 status
+        - On error: {"error": "Failed to search clubs"}, 500 status
+    """
+    current_user = get_user_session_info()
+    if not current_user["user_id"]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        page, per_page = page_params(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid page parameter"}), 400
+
+    cur = read_connection().cursor()
+    try:
+        result = search_clubs(
+            cur, session.get("school"), request.args.get("q"), page, per_page
+        )
+    except Exception:
+        logger.exception("Error searching clubs")
+        return jsonify({"error": "Failed to search clubs"}), 500
+    finally:
+        cur.close()
+    return jsonify(result), 200
+
+
 @clubs_bp.route("/images", methods=["POST"])
 def get_images():
     """
@@ -214,7 +296,7 @@ def get_images():
         return jsonify(result), 200
 
     except Exception as e:
-        print(traceback.format_exc())
+        logger.exception("Error in get_images")
         return jsonify({"error": str(e)}), 500
 
 
@@ -400,6 +482,8 @@ def update_club():
         - Validates uniqueness of club name
         - Handles database transaction (commit/rollback)
         - Supports optional logo/image update
+        - Writes only the tags, admins, photos and logo that changed; photos
+          and the logo are compared by content hash
     """
     data = request.get_json()
     club_id = data.get("id")
@@ -436,27 +520,20 @@ def update_club():
     if not (cur.fetchone()[0] == 0):
         return jsonify({"error": "An active club with this name already exists."}), 400
     try:
+        # Apply only what changed, all in one transaction
         cur.execute(
             "UPDATE club SET club_name = %s, description = %s, last_updated = CURRENT_TIMESTAMP(), is_active = 1 WHERE club_id = %s",
             (data["name"], data["description"], data["id"]),
         )
     except Exception as e:
-        print(e)
+        logger.exception("Error updating club")
         mysql.connection.rollback()
         cur.close()
         return jsonify({"error": "Failed to update the club"}), 400
     try:
-        if data["image"]:
-            cur.execute(
-                "UPDATE club SET club_logo = %s, logo_prefix = %s WHERE club_id = %s",
-                (
-                    base64.b64decode(data["image"].split(",")[1]),
-                    data["image"].split(",")[0],
-                    data["id"],
-                ),
-            )
+        sync_club_logo(cur, data["id"], data["image"])
     except Exception as e:
-        print(e)
+        logger.exception("Error updating club logo")
         mysql.connection.rollback()
         cur.close()
         return (
@@ -469,21 +546,9 @@ def update_club():
         )
     if data["images"]:
         try:
-            cur.execute(
-                "DELETE FROM club_photo WHERE club_id = %s",
-                (data["id"],),
-            )
-            for image in data["images"]:
-                cur.execute(
-                    "INSERT INTO club_photo (club_id, image, image_prefix) VALUES (%s, %s, %s)",
-                    (
-                        data["id"],
-                        base64.b64decode(image["image"].split(",")[1]),
-                        image["image"].split(",")[0],
-                    ),
-                )
+            sync_club_photos(cur, data["id"], data["images"])
         except Exception as e:
-            print(e)
+            logger.exception("Error updating club photos")
             mysql.connection.rollback()
             cur.close()
             return (
@@ -494,77 +559,44 @@ def update_club():
                 ),
                 400,
             )
-    # Add the tags
-    cur.execute("DELETE FROM club_tags WHERE club_id = %s", (data["id"],))
-    for tag in data["tags"]:
+
+    # Update the tags, checking that every one of them exists first
+    try:
+        tag_labels = parse_club_tags(data["tags"])
+    except ValueError as e:
+        mysql.connection.rollback()
+        cur.close()
+        return jsonify({"error": str(e)}), 400
+    missing_tags = find_missing(cur, "tag", "tag_id", tag_labels)
+    if missing_tags:
+        mysql.connection.rollback()
+        cur.close()
+        return (
+            jsonify({"error": f"Tag {tag_labels[min(missing_tags)]} does not exist"}),
+            400,
+        )
+    added, removed = sync_association(
+        cur, "club_tags", "club_id", data["id"], "tag_id", tag_labels
+    )
+    club_tags_changed(cur, data["id"], added, removed)
+
+    if data["admins"]:
         try:
-            cur.execute(
-                "INSERT INTO club_tags (club_id, tag_id) VALUES (%s, %s)",
-                (data["id"], tag["value"]),
+            sync_club_admins(
+                cur, data["id"], [admin["user"] for admin in data["admins"]]
             )
         except Exception as e:
-            print(e)
+            logger.exception("Error updating club admins")
             mysql.connection.rollback()
             cur.close()
-            return jsonify({"error": f"Tag {tag['label']} does not exist"}), 400
-        if data["admins"]:
-            try:
-                # Fetch existing admin user_ids for the club
-                cur.execute(
-                    "SELECT user_id FROM club_admin WHERE club_id = %s",
-                    (data["id"],),
-                )
-                existing_admins = {admin[0] for admin in cur.fetchall()}
-            except Exception as e:
-                print(e)
-                mysql.connection.rollback()
-                cur.close()
-                return (
-                    jsonify(
-                        {
-                            "error": "Failed to update the club, something may be wrong with the admin emails."
-                        }
-                    ),
-                    400,
-                )
-
-            # Determine the new admins
-            new_admins = {admin["user"] for admin in data["admins"]}
-
-            try:
-                # Set is_active to 0 for admins no longer in the list
-                inactive_admins = existing_admins - new_admins
-                if inactive_admins:
-                    cur.execute(
-                        "UPDATE club_admin SET is_active = 0 WHERE club_id = %s AND user_id IN %s",
-                        (data["id"], tuple(inactive_admins)),
-                    )
-
-                # Reactivate admins who are inactive
-                for admin in new_admins:
-                    if admin in existing_admins:
-                        cur.execute(
-                            "UPDATE club_admin SET is_active = 1 WHERE club_id = %s AND user_id = %s",
-                            (data["id"], admin),
-                        )
-                    else:
-                        # Insert new admins
-                        cur.execute(
-                            "INSERT INTO club_admin (user_id, club_id, is_active) VALUES (%s, %s, 1)",
-                            (admin, data["id"]),
-                        )
-            except Exception as e:
-                print(e)
-                mysql.connection.rollback()
-                cur.close()
-                return (
-                    jsonify(
-                        {
-                            "error": "Failed to update the club, something may be wrong with the admin emails."
-                        }
-                    ),
-                    400,
-                )
+            return (
+                jsonify(
+                    {
+                        "error": "Failed to update the club, something may be wrong with the admin emails."
+                    }
+                ),
+                400,
+            )
     mysql.connection.commit()
     cur.close()
     return jsonify({"message": "Club updated successfully"}), 200
@@ -621,7 +653,7 @@ def delete_club(club_id):
             "UPDATE club_admin SET is_active = 0 WHERE club_id = %s", (int(club_id),)
         )
     except Exception as e:
-        print(e)
+        logger.exception("Error in delete_club")
         mysql.connection.rollback()
         cur.close()
         return jsonify({"error": "Failed to delete the club"}), 400
@@ -720,7 +752,7 @@ def new_club():
             (data["name"], data["description"], image_data, prefix, school_id),
         )
     except Exception as e:
-        print(e)
+        logger.exception("Error in new_club")
         mysql.connection.rollback()
         cur.close()
         return jsonify({"error": "Failed to create new club"}), 400
@@ -737,55 +769,72 @@ def new_club():
     )
     new_club_id = cur.fetchone()[0]
 
-    # Add the admins
-    for admin in data["admins"]:
-        try:
-            cur.execute(
-                "INSERT INTO club_admin (user_id, club_id, is_active) VALUES (%s, %s, 1)",
-                (admin["user"], new_club_id),
-            )
-        except Exception as e:
-            print(e)
-            mysql.connection.rollback()
-            cur.close()
-            return jsonify({"error": f"User {admin['user']} does not exist"}), 400
+    # Add the admins, checking that every one of them exists first
+    admins = list(dict.fromkeys(admin["user"] for admin in data["admins"]))
+    missing_admins = find_missing(cur, "users", "email", admins)
+    if missing_admins:
+        mysql.connection.rollback()
+        cur.close()
+        return jsonify({"error": f"User {min(missing_admins)} does not exist"}), 400
+    try:
+        insert_rows(
+            cur,
+            "club_admin",
+            ["user_id", "club_id", "is_active"],
+            [(admin, new_club_id, 1) for admin in admins],
+        )
+    except Exception as e:
+        logger.exception("Error in new_club")
+        mysql.connection.rollback()
+        cur.close()
+        return jsonify({"error": "Failed to add the club admins"}), 400
 
     # Add the photos
+    photos = []
     for image in data["images"]:
         try:
             base64_imagedata = image["image"].split(",")
             base64_image = base64_imagedata[1]
             prefix = base64_imagedata[0]
 
-            image_data = base64.b64decode(base64_image)
+            photos.append((base64.b64decode(base64_image), new_club_id, prefix))
         except Exception as e:
-            return jsonify({"error": "Invalid image"}), 400
-        try:
-            cur.execute(
-                "INSERT INTO club_photo (image, club_id, image_prefix) VALUES (%s, %s, %s)",
-                (image_data, new_club_id, prefix),
-            )
-        except Exception as e:
-            print(e)
             mysql.connection.rollback()
             cur.close()
-            return (
-                jsonify({"error": "Failed to create new photo. It may be too large."}),
-                400,
-            )
+            return jsonify({"error": "Invalid image"}), 400
+    try:
+        insert_rows(cur, "club_photo", ["image", "club_id", "image_prefix"], photos)
+    except Exception as e:
+        logger.exception("Error in new_club")
+        mysql.connection.rollback()
+        cur.close()
+        return (
+            jsonify({"error": "Failed to create new photo. It may be too large."}),
+            400,
+        )
 
-    # Add the tags
-    for tag in data["tags"]:
-        try:
-            cur.execute(
-                "INSERT INTO club_tags (club_id, tag_id) VALUES (%s, %s)",
-                (new_club_id, tag["value"]),
-            )
-        except Exception as e:
-            print(e)
-            mysql.connection.rollback()
-            cur.close()
-            return jsonify({"error": f"Tag {tag['label']} does not exist"}), 400
+    # Add the tags, checking that every one of them exists first
+    try:
+        tag_labels = parse_club_tags(data["tags"])
+    except ValueError as e:
+        mysql.connection.rollback()
+        cur.close()
+        return jsonify({"error": str(e)}), 400
+    missing_tags = find_missing(cur, "tag", "tag_id", tag_labels)
+    if missing_tags:
+        mysql.connection.rollback()
+        cur.close()
+        return (
+            jsonify({"error": f"Tag {tag_labels[min(missing_tags)]} does not exist"}),
+            400,
+        )
+    insert_rows(
+        cur,
+        "club_tags",
+        ["club_id", "tag_id"],
+        [(new_club_id, tag_id) for tag_id in tag_labels],
+    )
+    club_tags_changed(cur, new_club_id, set(tag_labels), set())
 
     # Commit the changes to the database
     mysql.connection.commit()
@@ -795,32 +844,23 @@ def new_club():
 
 
 @clubs_bp.route("/club/<int:club_id>/sendEmail", methods=["POST"])
+@expensive_route("5 per minute", cost=20)
 def send_email_to_club_members(club_id):
     """
     Send an email to all members of a specific club.
     """
-    print(
-        f"Request received to send email to club {club_id}!"
-    )  # Logging the incoming request
-
-    # Add more print statements to check where the request is failing
     # Get current user
     current_user = get_user_session_info()
-    print(f"Current user session info: {current_user}")
 
     if not current_user["user_id"]:
-        print("Unauthorized: No user session found")
         return jsonify({"error": "Unauthorized"}), 403
 
-    # More logs for request data
     data = request.get_json()
-    print(f"Received data: {data}")
 
     subject = data.get("subject")
     message = data.get("message")
 
     if not subject or not message:
-        print(f"Missing required fields: subject={subject}, message={message}")
         return jsonify({"error": "Missing required fields (subject or message)"}), 400
 
     try:
@@ -839,7 +879,6 @@ def send_email_to_club_members(club_id):
             recipients = cursor.fetchall()
 
             if recipients is None:
-                print(f"No recipients found for club {club_id}")
                 return jsonify({"error": "No recipients found for this club"}), 404
 
             # Extract emails from the result
@@ -847,22 +886,23 @@ def send_email_to_club_members(club_id):
                 row[0] for row in recipients
             ]  # Ensure that we get just the emails
 
-            print(f"Recipients for club {club_id}: {recipients}")  # Log recipients
-
         if not recipients:
-            print(f"No recipients found for club {club_id}")
             return jsonify({"error": "No recipients found for this club"}), 404
 
         # Send email
         try:
             send_email(recipients, subject, message)
-            print(f"Email sent successfully to {len(recipients)} recipients.")
+            logger.info(
+                "Club %s email sent to %d recipients by %s",
+                club_id,
+                len(recipients),
+                current_user["user_id"],
+            )
         except Exception as e:
-            print(f"Error in send_email: {e}")
+            logger.exception("Error sending club email")
             return jsonify({"error": f"Failed to send email: {str(e)}"}), 500
 
         return jsonify({"message": "Email sent successfully"}), 200
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error sending email to club members")
         return jsonify({"error": "An unexpected error occurred"}), 500
@@ -1,8 +1,10 @@
+import logging
 from flask import Blueprint, request, jsonify
 from flask_cors import CORS
 from extensions import mysql
 from helper.check_user import get_user_session_info
 emails_bp = Blueprint("emails", __name__)
+logger = logging.getLogger(__name__)
 
 
 @emails_bp.route("/email-preferences", methods=["POST"])
@@ -56,7 +58,7 @@ def update_email_preferences():
 
     except Exception as e:
         mysql.connection.rollback()
-        print(e)
+        logger.exception("Error in update_email_preferences")
         return jsonify({"error": str(e)}), 500
 
 
@@ -104,6 +106,6 @@ def get_email_preferences():
         )
 
     except Exception as e:
-        print(e)
+        logger.exception("Error in get_email_preferences")
         return jsonify({"error": str(e)}), 500
     
@@ -1,13 +1,32 @@
 import base64
 from datetime import datetime, timedelta, timezone
-from flask import Blueprint, jsonify, logging, session, request
+import logging
+from flask import Blueprint, Response, jsonify, session, request, url_for
 import jwt
 import pytz
-from extensions import mysql
+from extensions import limiter, mysql
 from config import Config
 import json
+from helper.bulk_writes import in_placeholders, insert_rows
+from helper.calendar_feed import (
+    build_feed,
+    drop_school_feeds,
+    feed_owner,
+    feed_token,
+)
+from helper.calendar_summary import (
+    SUMMARY_FILTERS,
+    calendar_summary,
+    school_month_counts,
+)
 from helper.check_user import get_user_session_info
-import traceback
+from helper.db_routing import read_connection
+from helper.live_updates import event_topic, publish, school_topic
+from helper.load_shedding import events_cost, expensive_route
+from helper.ranking import order_by_relevance
+from helper.rollups import mark_rollup_dirty
+from helper.search import page_params, parse_date, search_events
+from helper.serialization import row_mapper, split_list, utc_iso
 from helper.send_email import send_email
 import pytz
 from dotenv import load_dotenv
@@ -16,6 +35,7 @@ from flask_cors import CORS
 
 
 events_bp = Blueprint("events", __name__)
+logger = logging.getLogger(__name__)
 
 # Apply CORS to this specific blueprint
 CORS(events_bp, supports_credentials=True)
@@ -94,67 +114,78 @@ def get_club_id(cur, club_name):
         raise ValueError("Club not found")
 
 
-def get_event_image(cur, event_id):
+def first_photos(cur, event_ids):
     """
-    Retrieve the event image for a given event ID.
+    Retrieve the first photo of each of several events.
 
     Args:
         cur (mysql.connection.cursor): Active database cursor
-        event_id (int): Unique identifier for the event
+        event_ids (list): Unique identifiers of the events
 
     Returns:
-        dict: A dictionary with the event ID, image prefix, image, and image ID
-
-    Raises:
-        ValueError: If no event is found with the given ID
+        dict: Event ID to the photo as a data URL, for events that are
+            approved, active and have a photo
 
     Behavior:
-    - Queries the event table for the matching event ID
-    - Returns the event ID, image prefix, image, and image ID if found
-    - Raises an exception if no matching event exists
+    - Fetches every event's photo in one query instead of one per event
+    - An event's first photo is the one with the lowest event_photo_id
     """
+    event_ids = [int(event_id) for event_id in event_ids]
+    if not event_ids:
+        return {}
     cur.execute(
-        """SELECT 
-                e.event_id,
-                (SELECT image_prefix
-                    FROM event_photo
-                    WHERE event_id = e.event_id
-                    ORDER BY event_photo_id
-                    LIMIT 1) AS image_prefix,
-                (SELECT image
-                    FROM event_photo
-                    WHERE event_id = e.event_id
-                    ORDER BY event_photo_id
-                    LIMIT 1) AS image,
-                (SELECT event_photo_id
-                    FROM event_photo
-                    WHERE event_id = e.event_id
-                    ORDER BY event_photo_id
-                    LIMIT 1) AS image_id
-            FROM event e
-            LEFT JOIN event_photo ep
-                ON ep.event_id = e.event_id
-            WHERE e.event_id = %s
-                AND e.is_approved = 1
+        f"""SELECT ep.event_id, ep.image_prefix, ep.image
+            FROM event_photo ep
+            INNER JOIN (
+                SELECT event_id, MIN(event_photo_id) AS event_photo_id
+                FROM event_photo
+                WHERE event_id IN ({in_placeholders(event_ids)})
+                GROUP BY event_id
+            ) first_photo
+                ON first_photo.event_photo_id = ep.event_photo_id
+            INNER JOIN event e
+                ON e.event_id = ep.event_id
+            WHERE e.is_approved = 1
                 AND e.is_active = 1""",
-        (event_id,),
+        tuple(event_ids),
     )
-    result = cur.fetchone()
-    if result is None:
-        return {
-            "image": None,
-            "id": event_id,
-        }
     return {
-        "image": (
-            f"{result[1]},{base64.b64encode(result[2]).decode('utf-8')}"
-            if (result[1] is not None and result[2] is not None)
-            else None
-        ),
-        "id": event_id,
+        event_id: f"{prefix},{base64.b64encode(image).decode('utf-8')}"
+        for event_id, prefix, image in cur.fetchall()
+        if prefix is not None and image is not None
     }
 
 
+def event_hosts(club_ids, club_names):
+    return [
+        {"id": id_val, "name": name_val}
+        for id_val, name_val in zip(split_list(club_ids), split_list(club_names))
+    ]
+
+
+def rsvp_status(is_yes):
+    return "" if is_yes is None else ("rsvp" if is_yes else "block")
+
+
+# Columns of the get_events_by_date query
+EVENT_ROW = row_mapper(
+    id=0,
+    startTime=(1, utc_iso),
+    endTime=(2, utc_iso),
+    location=3,
+    description=4,
+    cost=5,
+    title=6,
+    host=((7, 8), event_hosts),
+    rsvp=(9, rsvp_status),
+    tags=(10, split_list),
+    subscribed=(11, lambda subscribed: subscribed == 1),
+    blocked=(11, lambda subscribed: subscribed == 0),
+    genderRestriction=12,
+    going=13,
+)
+
+
 def get_events_by_date(
     cur,
     start_date,
@@ -180,7 +211,8 @@ def get_events_by_date(
         filter_query (str): Optional filter query to further refine event retrieval
             - 'Hosted by Subscribed Clubs' for events from clubs the user is subscribed to
             - 'Attending' for events the user has RSVP'd to
-            - 'Suggested' for events that share tags with the user
+            - 'Suggested' for events that share tags with the user, leaving
+              out events they declined (see helper.ranking.rank_suggested)
         approved (bool): Optional flag to filter events by approval status (default: True)
 
     Returns:
@@ -201,7 +233,8 @@ def get_events_by_date(
                             'tags': [str],
                             'subscribed': bool,
                             'image': str,
-                            'genderRestriction': str
+                            'genderRestriction': str,
+                            'going': int
                         }
                     ]
                 }
@@ -215,6 +248,9 @@ def get_events_by_date(
         * Within the specified date range
         * Belonging to the specified school
     - Retrieves event details and their hosting clubs
+    - Orders 'Suggested' results by relevance (see helper.ranking), and adds
+      each event's score as 'relevance'
+    - Loads the first photo of every event with one query
     - Supports empty result sets
     """
     try:
@@ -237,7 +273,8 @@ def get_events_by_date(
                         WHEN MAX(CASE WHEN us.subscribed_or_blocked = 0 THEN 1 ELSE 0 END) = 1 THEN 0
                         ELSE NULL
                       END AS is_subscribed,
-                      e.gender_restriction
+                      e.gender_restriction,
+                      e.rsvp_count
                 FROM event e
                 LEFT JOIN event_host eh
                     ON eh.event_id = e.event_id
@@ -265,6 +302,7 @@ def get_events_by_date(
                     AND e.is_approved = %s
                     AND e.school_id = %s
                     AND (r.is_yes = 1 OR %s <> 'Attending')
+                    AND (r.is_yes IS NULL OR r.is_yes = 1 OR %s <> 'Suggested')
                     AND ((e.gender_restriction IS NULL) 
                         OR (e.gender_restriction = u.gender) 
                         OR (u.is_faculty = 1))
@@ -292,59 +330,95 @@ def get_events_by_date(
                 filter_query,
                 filter_query,
                 filter_query,
+                filter_query,
                 user_id,
             ),
         )
         result = cur.fetchall()
         if result is None:
             return {"error": "No events found", "status": 404}
-        final_result = list(
-            map(
-                lambda x: {
-                    "id": x[0],
-                    "startTime": (
-                        x[1].replace(tzinfo=pytz.UTC).isoformat()
-                        if x[1].tzinfo is None
-                        else x[1].astimezone(pytz.UTC).isoformat()
-                    ),
-                    "endTime": (
-                        x[2].replace(tzinfo=pytz.UTC).isoformat()
-                        if x[2].tzinfo is None
-                        else x[2].astimezone(pytz.UTC).isoformat()
-                    ),
-                    "location": x[3],
-                    "description": x[4],
-                    "cost": x[5],
-                    "title": x[6],
-                    "host": [
-                        {"id": id_val, "name": name_val}
-                        for id_val, name_val in zip(
-                            [] if x[7] is None else x[7].split(","),
-                            [] if x[8] is None else x[8].split(","),
-                        )
-                    ],
-                    "image": (
-                        None if incl_images is False else get_event_image(cur, x[0])
-                    ),
-                    "rsvp": "" if x[9] is None else ("rsvp" if x[9] else "block"),
-                    "tags": [] if x[10] is None else x[10].split(","),
-                    "subscribed": True if x[11] == 1 else False,
-                    "blocked": True if x[11] == 0 else False,
-                    "genderRestriction": x[12],
-                },
-                result,
+        final_result = [EVENT_ROW(row) for row in result]
+        if filter_query == "Suggested":
+            cur.execute(
+                """SELECT t.tag_name FROM user_tags ut
+                    INNER JOIN tag t ON t.tag_id = ut.tag_id
+                    WHERE ut.user_id = %s""",
+                (user_id,),
             )
-        )
+            user_tags = [row[0] for row in cur.fetchall()]
+            final_result = order_by_relevance(final_result, user_tags)
+        if incl_images is False:
+            for event in final_result:
+                event["image"] = None
+        else:
+            photos = first_photos(cur, [event["id"] for event in final_result])
+            for event in final_result:
+                event["image"] = {"image": photos.get(event["id"]), "id": event["id"]}
         cur.close()
         return {"events": final_result}
     except ValueError:
         return {"error": "Invalid date format", "status": 400}
     except Exception as e:
-        print(f"Error fetching events: {e}")
+        logger.exception("Error fetching events")
         return {"error": "Failed to fetch events", "status": 500}
 
 
+def get_school_events(cur, start_date, end_date, school_id):
+    """
+    Retrieve every active, approved event of a school within a date range.
+
+    Unlike get_events_by_date, nothing is specific to a user: rsvp and
+    subscribed are left empty and gender-restricted events are included,
+    so one call serves jobs that handle many users, like the digest.
+
+    Args:
+        cur (mysql.connection.cursor): Active database cursor
+        start_date (str): ISO 8601 formatted start date
+        end_date (str): ISO 8601 formatted end date
+        school_id (int): Unique identifier of the school
+
+    Returns:
+        list: Event dicts as built by EVENT_ROW, ordered by start time
+    """
+    cur.execute(
+        """SELECT e.event_id,
+                  e.start_time,
+                  e.end_time,
+                  e.location,
+                  e.description,
+                  e.cost,
+                  e.event_name,
+                  GROUP_CONCAT(DISTINCT eh.club_id SEPARATOR ','),
+                  GROUP_CONCAT(DISTINCT c.club_name SEPARATOR ','),
+                  NULL,
+                  GROUP_CONCAT(DISTINCT t.tag_name SEPARATOR ','),
+                  NULL,
+                  e.gender_restriction,
+                  e.rsvp_count
+            FROM event e
+            LEFT JOIN event_host eh
+                ON eh.event_id = e.event_id
+                AND eh.is_approved = 1
+            LEFT JOIN club c
+                ON c.club_id = eh.club_id
+                AND c.is_active = 1
+            LEFT JOIN event_tags et
+                ON et.event_id = e.event_id
+            LEFT JOIN tag t
+                ON t.tag_id = et.tag_id
+            WHERE e.start_time BETWEEN %s AND %s
+                AND e.is_active = 1
+                AND e.is_approved = 1
+                AND e.school_id = %s
+            GROUP BY e.event_id
+            ORDER BY e.start_time, e.event_id""",
+        (start_date, end_date, school_id),
+    )
+    return [EVENT_ROW(row) for row in cur.fetchall()]
+
+
 @events_bp.route("/event-photos", methods=["GET"])
+@expensive_route("10 per minute", cost=10)
 def get_all_event_photos():
     """
     Retrieve all event photos.
@@ -391,7 +465,7 @@ def get_all_event_photos():
         return jsonify({"photos": photos}), 200
 
     except Exception as e:
-        print(f"Error fetching event photos: {e}")
+        logger.exception("Error fetching event photos")
         return jsonify({"error": "Failed to fetch event photos"}), 500
 
 
@@ -415,17 +489,16 @@ def send_faculty_approval_email(event_id):
         cur.close()
 
         if not club_admins:
-            print(f"No club admins found for event ID {event_id}")
+            logger.warning("No club admins found for event %s", event_id)
             return
 
         for club_name, email in club_admins:
             subject = "Event Approved"
             body = f"Dear {club_name} Admin,\n\nGood news! Your event '{event_name}' has been approved by the faculty.\n\nBest regards,\nSHARC Team"
             send_email(email, subject, body)
-            print(f"Approval email sent to {email}")
 
     except Exception as e:
-        print(f"Error sending approval email: {e}")
+        logger.exception("Error sending approval email")
 
 
 def send_faculty_decline_email(event_id):
@@ -448,23 +521,26 @@ def send_faculty_decline_email(event_id):
         cur.close()
 
         if not club_admins:
-            print(f"No club admins found for event ID {event_id}")
+            logger.warning("No club admins found for event %s", event_id)
             return
 
         for club_name, email in club_admins:
             subject = "Event Declined"
             body = f"Dear {club_name} Admin,\n\nUnfortunately, your event '{event_name}' has been declined by the faculty.\n\nBest regards,\nSHARC Team"
             send_email(email, subject, body)
-            print(f"Decline email sent to {email}")
 
     except Exception as e:
-        print(f"Error sending decline email: {e}")
+        logger.exception("Error sending decline email")
 
 
-import logging
-
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+def publish_approval(cur, event_id, approved):
+    """
+    Tell the school's approval queue and the event's viewers about a
+    faculty decision.
+    """
+    data = {"eventId": int(event_id), "approved": approved}
+    publish(cur, school_topic(session.get("school")), "approval", data)
+    publish(cur, event_topic(event_id), "approval", data)
 
 
 @events_bp.route("/approve_event", methods=["POST"])
@@ -479,15 +555,18 @@ def approve_event():
     try:
         cur = mysql.connection.cursor()
         cur.execute("UPDATE event SET is_approved = 1 WHERE event_id = %s", (event_id,))
+        publish_approval(cur, event_id, True)
         mysql.connection.commit()
         cur.close()
+        school_month_counts.invalidate(session.get("school"))
+        drop_school_feeds(session.get("school"))
 
         # Send approval email
         send_faculty_approval_email(event_id)
 
         return jsonify({"message": "Event approved successfully"}), 200
     except Exception as e:
-        logging.error(f"Error approving event: {e}")
+        logger.exception("Error approving event")
         return jsonify({"error": str(e)}), 500
 
 
@@ -506,14 +585,18 @@ def decline_event():
             "UPDATE event SET is_approved = 0, is_active = 0 WHERE event_id = %s",
             (event_id,),
         )
+        publish_approval(cur, event_id, False)
         mysql.connection.commit()
         cur.close()
+        school_month_counts.invalidate(session.get("school"))
+        drop_school_feeds(session.get("school"))
 
         # Send decline email
         send_faculty_decline_email(event_id)
 
         return jsonify({"message": "Event declined successfully"}), 200
     except Exception as e:
+        logger.exception("Error declining event")
         return jsonify({"error": str(e)}), 500
 
 
@@ -555,7 +638,9 @@ def get_event(event_id):
                             "image": str (base64 encoded)
                         }
                     ],
-                    "genderRestriction": str
+                    "genderRestriction": str,
+                    "isApproved": int,
+                    "going": int
                 }
             }, 200 status
         - On unauthorized access:
@@ -585,7 +670,7 @@ def get_event(event_id):
     user_id = current_user.get("user_id")
 
     cur.execute(
-        """SELECT e.event_id, e.start_time, e.end_time, e.location, e.description, e.cost, e.event_name, e.gender_restriction, e.is_approved FROM event e
+        """SELECT e.event_id, e.start_time, e.end_time, e.location, e.description, e.cost, e.event_name, e.gender_restriction, e.is_approved, e.rsvp_count FROM event e
             LEFT JOIN users u
                 ON u.email = %s
             WHERE e.event_id = %s
@@ -668,6 +753,7 @@ def get_event(event_id):
         "images": result_5,
         "genderRestriction": result[7],
         "isApproved": result[8],
+        "going": result[9],
     }
     cur.close()
     return jsonify({"event": final_result}), 200
@@ -701,14 +787,8 @@ def cancel_event(event_id):
         result = cur.fetchone()
         if not result:
             cur.close()
-            print(
-                f"User with ID {user_id} is not the organizer of event with ID {event_id}"
-            )
             return jsonify({"error": "Unauthorized"}), 403
 
-        # Log the event_id being passed
-        print(f"Canceling event with ID: {event_id}")
-
         # Query to get the event and organizer details
         cur.execute(
             """SELECT e.event_name, r.user_id 
@@ -722,20 +802,17 @@ def cancel_event(event_id):
             (event_id,),
         )
 
-        # # Check if the execute call was successful
-        print("Query executed successfully")
-
         event = cur.fetchall()  # Fetch result
         if not event:
             cur.close()  # Don't forget to close the cursor
-            print(f"Event with ID {event_id} not found")
             return jsonify({"error": "Event not found"}), 404
 
-        # Log event details for debugging
-        print(f"Event found: {event}")
-
         # Update the event status to inactive (cancel the event)
-        cur.execute("UPDATE event SET is_active = 0 WHERE event_id = %s", (event_id,))
+        # Every RSVP is deactivated below, so nobody is going any more
+        cur.execute(
+            "UPDATE event SET is_active = 0, rsvp_count = 0 WHERE event_id = %s",
+            (event_id,),
+        )
 
         for rsvp in event:
             cur.execute(
@@ -749,19 +826,21 @@ def cancel_event(event_id):
                     f"Dear User,\n\nUnfortunately, the event {rsvp[0]} has been cancelled.\n\nBest regards,\nSHARC Team",
                 )
 
-        # Check if the update was successful
-        print(f"Event with ID {event_id} canceled successfully")
+        logger.info("Event %s canceled by %s", event_id, user_id)
 
+        mark_rollup_dirty(cur, event_id)
         mysql.connection.commit()
 
         # Close the cursor
         cur.close()
+        school_month_counts.invalidate(session.get("school"))
+        drop_school_feeds(session.get("school"))
 
         return jsonify({"message": "Event successfully canceled"}), 200
 
     except Exception as e:
         # Log the error message with more details
-        print(f"Error canceling event: {e}")
+        logger.exception("Error canceling event")
         return jsonify({"error": "Failed to cancel event"}), 500
 
 
@@ -929,7 +1008,10 @@ def get_event_images():
     event_ids = request.json.get("event_ids")
 
     cur = mysql.connection.cursor()
-    result = [get_event_image(cur, event_id) for event_id in event_ids]
+    photos = first_photos(cur, event_ids)
+    result = [
+        {"image": photos.get(int(event_id)), "id": event_id} for event_id in event_ids
+    ]
 
     cur.close()
 
@@ -937,6 +1019,7 @@ def get_event_images():
 
 
 @events_bp.route("/events", methods=["GET"])
+@expensive_route("60 per minute", cost=events_cost)
 def get_events():
     """
     Retrieve events within a specified date range.
@@ -1001,7 +1084,7 @@ def get_events():
 
     if not mysql.connection:
         return jsonify({"error": "Database connection error"}), 500
-    cur = mysql.connection.cursor()
+    cur = read_connection().cursor()
 
     result = get_events_by_date(
         cur,
@@ -1019,6 +1102,222 @@ def get_events():
     return jsonify(result), 200
 
 
+@events_bp.route("/search", methods=["GET"])
+@expensive_route("60 per minute")
+def search():
+    """
+    Search events by name, description and location.
+
+    Query Parameters:
+        q (str): Search text; every word must match, as a word or word prefix
+        start_date (str): Optional ISO 8601 date; only events starting then or later
+        end_date (str): Optional ISO 8601 date; only events starting before then
+        tags (str): Optional comma-separated tag names; events need at least one
+        page (int): Page of results, starting at 1 (default: 1)
+        per_page (int): Results per page (default: 20, at most 50)
+
+    Returns:
+        JSON response:
+        - On success:
+            {
+                "results": [
+                    {
+                        "id": int,
+                        "title": str,
+                        "startTime": str,
+                        "endTime": str,
+                        "location": str,
+                        "description": str,
+                        "tags": [str],
+                        "score": float
+                    }
+                ],
+                "page": int,
+                "perPage": int,
+                "hasMore": bool
+            }, 200 status
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+        - On invalid parameters: {"error": str}, 400 status
+        - On error: {"error": "Failed to search events"}, 500 status
+
+    Behavior:
+    - Uses the FULLTEXT index on event name, description and location, so
+      only matching events are read
+    - Results are ranked by relevance, then by start time
+    - Only active, approved events the user may see are returned
+    """
+    current_user = get_user_session_info()
+    if not current_user["user_id"]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        page, per_page = page_params(request.args)
+        start_date = parse_date(request.args.get("start_date"))
+        end_date = parse_date(request.args.get("end_date"))
+    except ValueError:
+        return jsonify({"error": "Invalid page or date parameter"}), 400
+    tags = [tag for tag in (request.args.get("tags") or "").split(",") if tag]
+
+    cur = read_connection().cursor()
+    try:
+        result = search_events(
+            cur,
+            session.get("school"),
+            current_user["user_id"],
+            request.args.get("q"),
+            start_date,
+            end_date,
+            tags,
+            page,
+            per_page,
+        )
+    except Exception:
+        logger.exception("Error searching events")
+        return jsonify({"error": "Failed to search events"}), 500
+    finally:
+        cur.close()
+    return jsonify(result), 200
+
+
+@events_bp.route("/calendar-summary", methods=["GET"])
+def get_calendar_summary():
+    """
+    Count the events on each day of a month, for the calendar's month view.
+
+    Query Parameters:
+        month (str): Month to summarize, as YYYY-MM
+        filter (str): Optional filter, as for /events
+            - 'Hosted by Subscribed Clubs' for events from clubs the user is subscribed to
+            - 'Attending' for events the user has RSVP'd to
+            - 'Suggested' for events that share tags with the user
+        tz (str): Time zone the calendar's days are in (default: 'US/Eastern')
+
+    Returns:
+        JSON response:
+        - On success:
+            {
+                "month": str,
+                "timezone": str,
+                "counts": {"YYYY-MM-DD": int, ...}
+            }, 200 status
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+        - On invalid parameters: {"error": str}, 400 status
+        - On error: {"error": "Failed to fetch calendar summary"}, 500 status
+
+    Behavior:
+    - Only counts active, approved events the user is allowed to see
+    - Days without events are left out of counts
+    - Unfiltered counts are cached per school and month for
+      CALENDAR_SUMMARY_TTL_SECONDS; filtered counts are computed per user
+    """
+    current_user = get_user_session_info()
+    school_id = session.get("school")
+
+    if not current_user["user_id"]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    month = request.args.get("month")
+    filter_query = request.args.get("filter") or ""
+    tz_name = request.args.get("tz") or "US/Eastern"
+    if not month:
+        return jsonify({"error": "Missing required month parameter"}), 400
+    if filter_query not in SUMMARY_FILTERS:
+        return jsonify({"error": "Invalid filter"}), 400
+    try:
+        tz = pytz.timezone(tz_name)
+    except pytz.UnknownTimeZoneError:
+        return jsonify({"error": "Invalid time zone"}), 400
+
+    cur = read_connection().cursor()
+    try:
+        counts = calendar_summary(cur, school_id, month, tz, current_user, filter_query)
+    except ValueError:
+        return jsonify({"error": "Invalid month format"}), 400
+    except Exception:
+        logger.exception("Error fetching calendar summary")
+        return jsonify({"error": "Failed to fetch calendar summary"}), 500
+    finally:
+        cur.close()
+
+    return jsonify({"month": month, "timezone": tz.zone, "counts": counts}), 200
+
+
+@events_bp.route("/feed-url", methods=["GET", "POST"])
+def calendar_feed_url():
+    """
+    Get the URL of the user's calendar feed, for subscribing from a calendar app.
+
+    GET returns the current URL, creating it on first use; POST replaces it
+    with a new one, so anyone holding the old URL loses access.
+
+    Returns:
+        JSON response:
+        - On success: {"url": str}, 200 status
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+        - On error: {"error": "Failed to get calendar feed URL"}, 500 status
+    """
+    current_user = get_user_session_info()
+    if not current_user["user_id"]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        cur = mysql.connection.cursor()
+        token = feed_token(
+            cur, current_user["user_id"], rotate=request.method == "POST"
+        )
+        mysql.connection.commit()
+        cur.close()
+    except Exception:
+        logger.exception("Error getting calendar feed URL")
+        return jsonify({"error": "Failed to get calendar feed URL"}), 500
+
+    url = url_for("events.get_calendar_feed", token=token, _external=True)
+    return jsonify({"url": url}), 200
+
+
+@events_bp.route("/feed/<token>.ics", methods=["GET"])
+@limiter.limit("30 per minute", key_func=lambda: request.view_args["token"])
+def get_calendar_feed(token):
+    """
+    iCalendar feed of the events a user is attending or that their
+    subscribed clubs host.
+
+    Calendar apps can't log in, so the random token in the URL identifies
+    the user (see /feed-url).
+
+    Returns:
+        - On success: text/calendar document, 200 status, with an ETag;
+          304 status without a body if If-None-Match matches it
+        - On an unknown or revoked token: {"error": "Feed not found"}, 404 status
+        - On error: {"error": "Failed to build calendar feed"}, 500 status
+
+    Behavior:
+    - Includes events from the last 30 days on, without events the user blocked
+    - Rendered feeds are cached per user for CALENDAR_FEED_TTL_SECONDS and
+      dropped when the user changes an RSVP or subscription, or an event in
+      their school is approved, declined or cancelled; a poll that finds the
+      feed unchanged costs one token lookup and a 304
+    """
+    cur = read_connection().cursor()
+    try:
+        owner = feed_owner(cur, token)
+        if owner is None:
+            return jsonify({"error": "Feed not found"}), 404
+        etag, body = build_feed(cur, owner)
+    except Exception:
+        logger.exception("Error building calendar feed")
+        return jsonify({"error": "Failed to build calendar feed"}), 500
+    finally:
+        cur.close()
+
+    response = Response(body, mimetype="text/calendar")
+    response.set_etag(etag)
+    # The URL is a credential; keep it out of shared caches
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 def validate_jwt(token):
     """
     Validate a JWT token for approving an event.
@@ -1030,18 +1329,16 @@ def validate_jwt(token):
         dict: Decoded payload if the token is valid, None otherwise.
     """
     try:
-        print(f"Decoding Token: {token}")  # Debugging: Print the token before decoding
         payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        print(f"Decoded Payload: {payload}")  # Debugging: Print the decoded payload
         return payload, None
     except jwt.ExpiredSignatureError:
-        print("JWT Validation Error: Token has expired")
+        logger.info("JWT validation failed: token has expired")
         return None, "Token has expired"
     except jwt.InvalidTokenError as e:
-        print(f"JWT Validation Error: {str(e)}")  # Print actual error message
+        logger.info("JWT validation failed: %s", e)
         return None, "Invalid token"
-    except Exception as e:
-        print(f"Unexpected Error: {str(e)}")  # Catch any unexpected errors
+    except Exception:
+        logger.exception("Unexpected error validating JWT")
         return None, "Unexpected token error"
 
 
@@ -1194,6 +1491,21 @@ def send_decline_email(event_id):
     cur.close()
 
 
+def invalidate_event_caches(cur, event_id):
+    """
+    Drop the cached calendar counts and feeds of an event's school.
+
+    For routes authorized by an emailed token rather than a session, which
+    don't know the school.
+    """
+    cur.execute("SELECT school_id FROM event WHERE event_id = %s", (event_id,))
+    row = cur.fetchone()
+    if row is not None:
+        # Keyed by the school ID as the session holds it, a string
+        school_month_counts.invalidate(str(row[0]))
+        drop_school_feeds(row[0])
+
+
 @events_bp.route("/approve-collaboration", methods=["POST"])
 def approve_collaboration():
     """
@@ -1226,19 +1538,14 @@ def approve_collaboration():
     payload, error = validate_jwt(token)
 
     if error:
-        print(f"JWT Validation Error: {error}")
         return jsonify({"error": error}), 403
 
     event_id = request.json.get("eventId")
     club_id = request.json.get("clubId")
 
-    print(
-        f"Event ID from JWT: {payload['event_id']}, Event ID from request: {event_id}"
-    )
-    print(f"Club ID from JWT: {payload['club_id']}, Club ID from request: {club_id}")
 
     if int(event_id) != payload["event_id"] or int(club_id) != payload["club_id"]:
-        print("Error: Token payload does not match request data")
+        logger.warning("Collaboration token does not match event %s", event_id)
         return jsonify({"error": "Invalid event or club ID"}), 403
 
     if not event_id or not club_id:
@@ -1252,6 +1559,7 @@ def approve_collaboration():
             (event_id, club_id),
         )
         mysql.connection.commit()
+        invalidate_event_caches(cur, event_id)
         cur.close()
         return jsonify({"message": "Collaboration approved successfully!"}), 200
 
@@ -1293,19 +1601,14 @@ def decline_collaboration():
     payload, error = validate_jwt(token)
 
     if error:
-        print(f"JWT Validation Error: {error}")
         return jsonify({"error": error}), 403
 
     event_id = request.json.get("eventId")
     club_id = request.json.get("clubId")
 
-    print(
-        f"Event ID from JWT: {payload['event_id']}, Event ID from request: {event_id}"
-    )
-    print(f"Club ID from JWT: {payload['club_id']}, Club ID from request: {club_id}")
 
     if int(event_id) != payload["event_id"] or int(club_id) != payload["club_id"]:
-        print("Error: Token payload does not match request data")
+        logger.warning("Collaboration token does not match event %s", event_id)
         return jsonify({"error": "Invalid event or club ID"}), 403
 
     if not event_id or not club_id:
@@ -1319,6 +1622,7 @@ def decline_collaboration():
             (event_id,),
         )
         mysql.connection.commit()
+        invalidate_event_caches(cur, event_id)
         cur.close()
 
         # Send notification email to club admin
@@ -1494,65 +1798,70 @@ def create_event():
         event_id = cur.lastrowid
 
         # Add tags
-        for tag in tags:
+        insert_rows(
+            cur,
+            "event_tags",
+            ["event_id", "tag_id"],
+            [(event_id, int(tag)) for tag in tags],
+        )
+
+        # Look up all co-hosts and their active admins at once
+        cohost_names = {}
+        cohost_admins = {}
+        co_hosts = list(dict.fromkeys(int(co_host) for co_host in co_hosts))
+        if co_hosts:
             cur.execute(
-                """INSERT INTO event_tags (event_id, tag_id) VALUES (%s, %s)""",
-                (event_id, int(tag)),
+                f"""SELECT club_id, club_name
+                    FROM club
+                    WHERE club_id IN ({in_placeholders(co_hosts)})""",
+                tuple(co_hosts),
             )
-
-        # Add the main host
-        cur.execute(
-            """INSERT INTO event_host (club_id, event_id, is_approved) VALUES (%s, %s, true)""",
-            (club_id, event_id),
+            cohost_names = dict(cur.fetchall())
+            cur.execute(
+                f"""SELECT club_id, user_id
+                    FROM club_admin
+                    WHERE club_id IN ({in_placeholders(co_hosts)})
+                        AND is_active = 1""",
+                tuple(co_hosts),
+            )
+            for cohost_id, admin_email in cur.fetchall():  # USER_ID is the email
+                cohost_admins.setdefault(cohost_id, []).append(admin_email)
+        co_hosts = [co_host for co_host in co_hosts if co_host in cohost_names]
+
+        # Add the main host, and co-hosts with pending approval
+        insert_rows(
+            cur,
+            "event_host",
+            ["club_id", "event_id", "is_approved"],
+            [(club_id, event_id, True)]
+            + [(co_host, event_id, False) for co_host in co_hosts],
         )
 
-        # Process multiple co-hosts
-        cohost_names = []
+        # Ask each co-host's admins to approve the event
         for co_host in co_hosts:
-            cur.execute("""SELECT club_name FROM club WHERE club_id = %s""", (co_host,))
-            cohost_data = cur.fetchone()
-            if cohost_data:
-                cohost_names.append(cohost_data[0])
-
-                # Add co-host to event with pending approval
-                cur.execute(
-                    """INSERT INTO event_host (club_id, event_id, is_approved) VALUES (%s, %s, false)""",
-                    (co_host, event_id),
+            if cohost_admins.get(co_host):
+                send_approval_email(
+                    cohost_admins[co_host],
+                    co_host,
+                    event_id,
+                    club_name,
+                    cohost_names[co_host],
+                    event_name,
+                    description,
+                    start_date,
+                    end_date,
+                    location,
                 )
 
-                # Fetch co-host email
-                cur.execute(
-                    """SELECT user_id 
-                        FROM club_admin 
-                        WHERE club_id = %s
-                            AND is_active = 1""",
-                    (co_host,),
-                )
-                co_host_data = cur.fetchall()
-                if co_host_data:
-                    co_host_email = list(
-                        emails[0] for emails in co_host_data
-                    )  # USER_ID is the email
-                    send_approval_email(
-                        co_host_email,
-                        co_host,
-                        event_id,
-                        club_name,
-                        cohost_data[0],  # Use fetched co-host name
-                        event_name,
-                        description,
-                        start_date,
-                        end_date,
-                        location,
-                    )
-
         # Save photos
-        for image_data, filename in saved_photos:
-            cur.execute(
-                """INSERT INTO event_photo (event_id, IMAGE, IMAGE_PREFIX) 
-                   VALUES (%s, %s, %s)""",
-                (event_id, image_data, filename),
-            )
+        insert_rows(
+            cur,
+            "event_photo",
+            ["event_id", "IMAGE", "IMAGE_PREFIX"],
+            [(event_id, image_data, filename) for image_data, filename in saved_photos],
+        )
+
+        mark_rollup_dirty(cur, event_id)
 
         # Fetch all club admin emails
         cur.execute(
@@ -1606,7 +1915,7 @@ def create_event():
         )
 
     except Exception as e:
-        print(traceback.format_exc())
+        logger.exception("Error in create_event")
         return jsonify({"error": f"Failed to create event: {str(e)}"}), 500
 
 
@@ -1640,6 +1949,19 @@ def sort_comments(comments):
     return flatten_tree(root_comments)
 
 
+# Columns of the get_comments query
+COMMENT_ROW = row_mapper(
+    comment_id=0,
+    user_id=1,
+    is_flagged=2,
+    is_deleted=3,
+    content=4,
+    posted_timestamp=5,
+    parent=6,
+    indent_level=7,
+)
+
+
 @events_bp.route("/get-comments/<event_id>", methods=["GET"])
 def get_comments(event_id):
     user = get_user_session_info()
@@ -1656,23 +1978,11 @@ def get_comments(event_id):
         result = cur.fetchall()
 
         # Convert result to list of dictionairies
-        comment_list = [
-            {
-                "comment_id": comment[0],
-                "user_id": comment[1],
-                "is_flagged": comment[2],
-                "is_deleted": comment[3],
-                "content": comment[4],
-                "posted_timestamp": comment[5],
-                "parent": comment[6],
-                "indent_level": comment[7],
-            }
-            for comment in result
-        ]
+        comment_list = [COMMENT_ROW(comment) for comment in result]
         return jsonify(sort_comments(comment_list)), 200
 
     except Exception as e:
-        print(f"Error getting comments: {str(e)}")
+        logger.exception("Error getting comments")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -1692,7 +2002,6 @@ def post_comment():
             return jsonify({"error": "User not logged in"}), 401
 
         data = request.json
-        print(data)
 
         # Establish database connection
         conn = mysql.connection
@@ -1704,12 +2013,22 @@ def post_comment():
                 (event_id, user_id, content) VALUES (%s, %s, %s)""",
             (data["event_id"], user_id, data["comment"]),
         )
+        publish(
+            cur,
+            event_topic(data["event_id"]),
+            "comment",
+            {
+                "eventId": int(data["event_id"]),
+                "commentId": cur.lastrowid,
+                "parentId": None,
+            },
+        )
         conn.commit()
 
         return jsonify({"message": "Comment added successfully"}), 200
 
     except Exception as e:
-        print(f"Error adding comment: {str(e)}")
+        logger.exception("Error adding comment")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -1748,12 +2067,22 @@ def post_sub_comment():
                 data["indent_level"],
             ),
         )
+        publish(
+            cur,
+            event_topic(data["event_id"]),
+            "comment",
+            {
+                "eventId": int(data["event_id"]),
+                "commentId": cur.lastrowid,
+                "parentId": data["parent_id"],
+            },
+        )
         conn.commit()
 
         return jsonify({"message": "Comment added successfully"}), 200
 
     except Exception as e:
-        print(f"Error adding comment: {str(e)}")
+        logger.exception("Error adding comment")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -1791,7 +2120,7 @@ def report_comment():
         return jsonify({"message": "Comment reported successfully"}), 200
 
     except Exception as e:
-        print(f"Error reporting comment: {str(e)}")
+        logger.exception("Error reporting comment")
         return jsonify({"error": "An unexpected error occurred"}), 500
     finally:
         if cur is not None:
@@ -1,9 +1,14 @@
+import logging
 from flask import Blueprint, jsonify, request, session
 from extensions import mysql
+from helper.bulk_writes import in_placeholders, sync_association
 from helper.check_user import get_user_session_info
+from helper.club_affinity import tag_deleted, user_tags_changed
+from helper.sessions import drop_user_claims
 
 
 interests_bp = Blueprint("interests", __name__)
+logger = logging.getLogger(__name__)
 
 
 @interests_bp.route("/get-available-tags", methods=["GET"])
@@ -106,7 +111,7 @@ def getinterests():
         interests = [row[0] for row in result]
         return jsonify({"interests": interests}), 200
     except Exception as e:
-        print(f"Error fetching interests: {e}")
+        logger.exception("Error fetching interests")
         return jsonify({"error": "Failed to fetch interests"}), 500
     finally:
         cur.close()
@@ -152,7 +157,7 @@ def getallinterests():
         all_interests = [row[0] for row in result]
         return jsonify({"interests": all_interests}), 200
     except Exception as e:
-        print(f"Error fetching all interests: {e}")
+        logger.exception("Error fetching all interests")
         return jsonify({"error": "Failed to fetch all interests"}), 500
     finally:
         cur.close()
@@ -183,7 +188,8 @@ def editinterestpage():
     Behavior:
     - Requires user authentication
     - Validates input data structure
-    - Replaces all existing user interests with the new list
+    - Replaces all existing user interests with the new list, only deleting
+      and inserting the interests that changed
     - Uses database transactions for data integrity
     """
     # Check if user is authenticated
@@ -210,22 +216,24 @@ def editinterestpage():
         # Start transaction
         cur.execute("START TRANSACTION")
 
-        # Remove existing interests
-        cur.execute(
-            "DELETE FROM user_tags WHERE user_id = %s",
-            (current_user["user_id"],),
-        )
-
-        # Insert new interests
-        for interest in interests:
+        # Look up the IDs of all the new interests at once
+        tag_ids = []
+        if interests:
             cur.execute(
-                """INSERT INTO user_tags (user_id, tag_id)
-                    SELECT %s, tag_id FROM tag WHERE tag_name = %s""",
-                (current_user["user_id"], interest),
+                f"SELECT tag_id FROM tag WHERE tag_name IN ({in_placeholders(interests)})",
+                tuple(interests),
             )
+            tag_ids = [row[0] for row in cur.fetchall()]
+
+        # Remove interests that were deselected and add the new ones
+        added, removed = sync_association(
+            cur, "user_tags", "user_id", current_user["user_id"], "tag_id", tag_ids
+        )
+        user_tags_changed(cur, current_user["user_id"], added, removed)
 
         # Commit transaction
         mysql.connection.commit()
+        drop_user_claims()
         cur.close()
         return jsonify({"message": "Interests updated successfully"}), 200
 
@@ -233,7 +241,7 @@ def editinterestpage():
         # Rollback on error
         mysql.connection.rollback()
         cur.close()
-        print(f"Error updating interests: {e}")
+        logger.exception("Error updating interests")
         return jsonify({"error": "Failed to update interests"}), 500
 
 
@@ -311,7 +319,7 @@ def add_tag():
         return jsonify({"message": f"Interest '{tag_name}' added successfully!"}), 201
 
     except Exception as e:
-        print(e)
+        logger.exception("Error in add_tag")
         mysql.connection.rollback()
         cur.close()
         return jsonify({"error": "Failed to add interest"}), 500
@@ -377,11 +385,13 @@ def remove_tag():
             "SELECT tag_id FROM tag WHERE tag_name = %s AND school_id = %s",
             (tag_name, session.get("school")),
         )
-        if not cur.fetchone():
+        tag = cur.fetchone()
+        if not tag:
             cur.close()
             return jsonify({"error": f"Interest '{tag_name}' does not exist."}), 404
 
         # Remove tag
+        tag_deleted(cur, tag[0])
         cur.execute(
             "DELETE FROM tag WHERE tag_name = %s AND school_id = %s",
             (tag_name, session.get("school")),
@@ -0,0 +1,109 @@
+import logging
+from flask import Blueprint, Response, jsonify, request, session
+from extensions import mysql
+from helper.bulk_writes import in_placeholders
+from helper.check_user import get_user_session_info
+from helper.live_updates import (
+    MAX_TOPICS,
+    event_topic,
+    live_updates,
+    replay,
+    school_topic,
+    stream,
+)
+from helper.load_shedding import overloaded_response
+
+live_bp = Blueprint("live", __name__)
+logger = logging.getLogger(__name__)
+
+
+@live_bp.route("", methods=["GET"])
+def live_stream():
+    """
+    Stream live updates as Server-Sent Events, for EventSource in the browser.
+
+    Query Parameters:
+        topics (str): Comma-separated topics to follow, up to 20
+            - 'school' for approvals of the user's school's events
+            - 'event:<event_id>' for comments and RSVPs on an event
+        lastEventId (int): Optional ID of the last update received, for
+            clients that can't send the Last-Event-ID header
+
+    Returns:
+        - On success: text/event-stream, 200 status, with events
+            comment: {"eventId": int, "commentId": int, "parentId": int or null}
+            rsvp: {"eventId": int, "going": int}
+            approval: {"eventId": int, "approved": bool}
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+        - On invalid topics: {"error": str}, 400 status
+        - On an event outside the user's school: {"error": "Event not found"}, 404 status
+        - On too many open streams: {"error": str, "status": "busy"}, 503 status
+
+    Behavior:
+    - Updates are notices to re-fetch, so they carry IDs and counts but no
+      user data
+    - A reconnecting client sending Last-Event-ID first gets the updates it
+      missed, from the last LIVE_UPDATE_RETENTION_MINUTES
+    - The stream ends after LIVE_UPDATE_STREAM_SECONDS and the browser
+      reconnects, so a session that has ended stops receiving updates
+    - The database connection is released before streaming starts
+    """
+    current_user = get_user_session_info()
+    if not current_user["user_id"]:
+        return jsonify({"error": "Unauthorized"}), 403
+    school_id = session.get("school")
+
+    requested = [topic for topic in request.args.get("topics", "").split(",") if topic]
+    if not requested or len(requested) > MAX_TOPICS:
+        return jsonify({"error": f"Follow between 1 and {MAX_TOPICS} topics"}), 400
+    topics = set()
+    event_ids = set()
+    for topic in requested:
+        if topic == "school":
+            topics.add(school_topic(school_id))
+        elif topic.startswith("event:") and topic[len("event:") :].isdigit():
+            event_ids.add(int(topic[len("event:") :]))
+        else:
+            return jsonify({"error": f"Invalid topic: {topic}"}), 400
+
+    try:
+        last_event_id = int(
+            request.headers.get("Last-Event-ID") or request.args.get("lastEventId") or 0
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+    subscription = None
+    cur = mysql.connection.cursor()
+    try:
+        if event_ids:
+            cur.execute(
+                f"""SELECT event_id FROM event
+                    WHERE event_id IN ({in_placeholders(event_ids)})
+                        AND school_id = %s""",
+                (*event_ids, school_id),
+            )
+            if len(cur.fetchall()) != len(event_ids):
+                return jsonify({"error": "Event not found"}), 404
+            topics.update(event_topic(event_id) for event_id in event_ids)
+
+        # Subscribe before reading the backlog, so nothing falls between
+        subscription = live_updates.subscribe(topics)
+        if subscription is None:
+            return overloaded_response()
+        backlog = replay(cur, sorted(topics), last_event_id) if last_event_id else []
+    except Exception:
+        if subscription is not None:
+            live_updates.unsubscribe(subscription)
+        logger.exception("Error opening live update stream")
+        return jsonify({"error": "Failed to open live update stream"}), 500
+    finally:
+        cur.close()
+
+    response = Response(stream(subscription, backlog), mimetype="text/event-stream")
+    # Runs when the client disconnects, even before the first event
+    response.call_on_close(lambda: live_updates.unsubscribe(subscription))
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -0,0 +1,35 @@
+import hmac
+from flask import Blueprint, Response, jsonify, request
+from config import Config
+from helper.metrics import request_metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+# Addresses allowed to scrape metrics when no METRICS_TOKEN is configured
+LOCAL_ADDRESSES = ("127.0.0.1", "::1")
+
+
+@metrics_bp.route("", methods=["GET"])
+def get_metrics():
+    """
+    Expose request and database metrics for Prometheus.
+
+    Returns:
+        - On success: metrics in the Prometheus text format, 200 status
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+
+    Behavior:
+    - If METRICS_TOKEN is set, the scraper must send it as a bearer token
+    - Otherwise only requests from the local host are allowed
+    - Metrics are per server process
+    """
+    if Config.METRICS_TOKEN:
+        expected = f"Bearer {Config.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            return jsonify({"error": "Unauthorized"}), 403
+    elif request.remote_addr not in LOCAL_ADDRESSES:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return Response(
+        request_metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,14 +1,45 @@
-from flask import Blueprint, jsonify, request, session
+import logging
+import csv
+import io
+import json
+import os
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    session,
+    stream_with_context,
+)
+from MySQLdb import Error as MySQLError, OperationalError
+from werkzeug.utils import secure_filename
 from extensions import mysql
 from helper.check_user import get_user_session_info
+from helper.db_routing import read_connection, read_only_route
+from helper.load_shedding import expensive_route
+from helper.metrics import InstrumentedSSCursor
+from helper.report_jobs import report_jobs
+from helper.report_limits import (
+    is_query_timeout,
+    report_budget,
+    report_slots,
+    set_max_execution_time,
+)
 from typing import List, Literal, TypedDict
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
 
 AccessControl = Literal["Club Admin", "Faculty"]
 QueryParam = Literal["School", "ID", "StartDate", "EndDate"]
 
 
-class Report(TypedDict):
+class ReportLimits(TypedDict, total=False):
+    maxExecutionMs: int
+    maxRows: int
+
+
+class Report(ReportLimits):
     name: str
     query: str
     queryParams: List[QueryParam]
@@ -98,91 +129,43 @@ REPORTS: ReportObject = {
             """,
             "queryParams": ["School"],
             "accessControl": "Faculty",
+            # Scans every user at the school, so it gets a longer budget
+            "maxExecutionMs": 60000,
         },
         {
             "name": "Subscriptions and RSVPs by Tag",
             "query": """
-                WITH rsvp_counts AS
-                (
-                SELECT
-                    et.tag_id,
-                    COUNT(DISTINCT r.rsvp_id) AS rsvp_count
-                FROM rsvp r
-                JOIN event_tags et ON r.event_id = et.event_id
-                JOIN event e ON r.event_id = e.event_id
-                JOIN users u on u.email = r.user_id
-                WHERE r.is_yes = 1
-                    AND r.is_active = 1
-                    AND e.start_time BETWEEN %s AND %s
-                    AND u.is_active = 1
-                GROUP BY et.tag_id
-                ), club_counts AS
-                (
-                SELECT
-                    ct.tag_id,
-                    COUNT(DISTINCT us.subscription_id) AS club_count
-                FROM user_subscription us
-                JOIN club_tags ct ON us.club_id = ct.club_id
-                JOIN users u on us.email = u.email
-                WHERE us.is_active = 1
-                    AND us.subscribed_or_blocked = 1
-                    AND u.is_active = 1
-                GROUP BY ct.tag_id
-                )
                 SELECT 
                     t.tag_name AS `Tag Name`, 
                     COALESCE(rc.rsvp_count, 0) AS `Events RSVP'd`, 
-                    COALESCE(cc.club_count, 0) AS `Clubs Subscribed`
+                    COALESCE(tu.subscription_count, 0) AS `Clubs Subscribed`
                 FROM tag t
-                LEFT JOIN rsvp_counts rc ON t.tag_id = rc.tag_id
-                LEFT JOIN club_counts cc ON t.tag_id = cc.tag_id
-                WHERE t.school_id = %s 
-                GROUP BY t.tag_name, rc.rsvp_count, cc.club_count;
+                LEFT JOIN (
+                    SELECT
+                        tag_id,
+                        CAST(SUM(rsvp_count) AS SIGNED) AS rsvp_count
+                    FROM tag_rollup_daily
+                    WHERE school_id = %s
+                        AND rollup_date BETWEEN DATE(%s) AND DATE(%s)
+                    GROUP BY tag_id
+                ) rc ON t.tag_id = rc.tag_id
+                LEFT JOIN tag_usage_rollup tu ON t.tag_id = tu.tag_id
+                WHERE t.school_id = %s;
             """,
-            "queryParams": ["StartDate", "EndDate", "School"],
+            "queryParams": ["School", "StartDate", "EndDate", "School"],
             "accessControl": "Faculty",
         },
         {
             "name": "Frequency of Tag Use",
             "query": """
-                WITH user_tag_counts AS (
-                    SELECT 
-                        t.tag_name, 
-                        COUNT(DISTINCT ut.user_id) AS usage_count
-                    FROM user_tags ut
-                    JOIN tag t ON ut.tag_id = t.tag_id
-                    WHERE t.school_id = %s
-                    GROUP BY t.tag_name
-                ),
-                club_tag_counts AS (
-                    SELECT 
-                        t.tag_name, 
-                        COUNT(DISTINCT ct.club_id) AS usage_count
-                    FROM club_tags ct
-                    JOIN tag t ON ct.tag_id = t.tag_id
-                    WHERE t.school_id = %s
-                    GROUP BY t.tag_name
-                ),
-                event_tag_counts AS (
-                    SELECT 
-                        t.tag_name, 
-                        COUNT(DISTINCT et.event_id) AS usage_count
-                    FROM event_tags et
-                    JOIN tag t ON et.tag_id = t.tag_id
-                    WHERE t.school_id = %s
-                    GROUP BY t.tag_name
-                )
                 SELECT 
                     t.tag_name AS `Tag Name`, 
-                    COALESCE(utc.usage_count, 0) + COALESCE(ctc.usage_count, 0) + COALESCE(etc.usage_count, 0) AS `Total Usage Count`
+                    COALESCE(tu.user_count + tu.club_count + tu.event_count, 0) AS `Total Usage Count`
                 FROM tag t
-                LEFT JOIN user_tag_counts utc ON t.tag_name = utc.tag_name
-                LEFT JOIN club_tag_counts ctc ON t.tag_name = ctc.tag_name
-                LEFT JOIN event_tag_counts etc ON t.tag_name = etc.tag_name
-                WHERE t.school_id = %s
-                GROUP BY t.tag_name;
+                LEFT JOIN tag_usage_rollup tu ON t.tag_id = tu.tag_id
+                WHERE t.school_id = %s;
             """,
-            "queryParams": ["School", "School", "School", "School"],
+            "queryParams": ["School"],
             "accessControl": "Faculty",
         },
         {
@@ -201,63 +184,47 @@ REPORTS: ReportObject = {
             "name": "RSVP Activity by Semesters Completed",
             "query": """
                 SELECT
-                    semesters_completed AS `Semesters Completed`,
-                    COUNT(DISTINCT r.rsvp_id) AS `Total RSVPs`
-                FROM (
-                    SELECT 
-                        u.email,
-                        CASE 
+                    CASE
+                        WHEN year_started = 0 THEN NULL  -- Start term not given
                         WHEN MONTH(CURDATE()) < 7 THEN  -- Current semester is Spring
-                            (YEAR(CURDATE()) - YEAR_STARTED) * 2 + 
+                            (YEAR(CURDATE()) - year_started) * 2 + 
                             (CASE 
-                                WHEN SEMESTER_STARTED = 'Fall' THEN 0  -- Started in Fall
+                                WHEN semester_started = 'Fall' THEN 0  -- Started in Fall
                                 ELSE 1  -- Started in Spring
                             END)
                         ELSE  -- Current semester is Fall
-                            (YEAR(CURDATE()) - YEAR_STARTED) * 2 + 
+                            (YEAR(CURDATE()) - year_started) * 2 + 
                             (CASE 
-                                WHEN SEMESTER_STARTED = 'Fall' THEN 1  -- Started in Fall
+                                WHEN semester_started = 'Fall' THEN 1  -- Started in Fall
                                 ELSE 2  -- Started in Spring
                             END)
-                    END - 1 AS semesters_completed
-                    FROM users u
-                    WHERE u.is_active = 1
-                ) AS user_semesters
-                JOIN rsvp r ON user_semesters.email = r.user_id AND r.is_active = 1 AND r.is_yes = 1
-                JOIN event_host eh ON r.event_id = eh.event_id
-                JOIN event e ON r.event_id = e.event_id
-                JOIN users u ON u.email = r.user_id
-                WHERE r.is_active = 1
-                    AND r.is_yes = 1
-                    AND u.is_active = 1
-                    AND e.start_time BETWEEN %s AND %s
-                GROUP BY semesters_completed
-                ORDER BY semesters_completed;
+                    END - 1 AS `Semesters Completed`,
+                    CAST(SUM(rsvp_count) AS SIGNED) AS `Total RSVPs`
+                FROM rsvp_rollup_daily
+                WHERE school_id = %s
+                    AND club_id = 0  -- School-wide totals (SCHOOL_WIDE_CLUB_ID)
+                    AND rollup_date BETWEEN DATE(%s) AND DATE(%s)
+                GROUP BY `Semesters Completed`
+                ORDER BY `Semesters Completed`;
             """,
-            "queryParams": ["StartDate", "EndDate"],
+            "queryParams": ["School", "StartDate", "EndDate"],
             "accessControl": "Club Admin",
         },
         {
             "name": "RSVP Activity by Gender",
             "query": """
                 SELECT (
-                    CASE WHEN u.gender = 'M' THEN 'Male'
-                         WHEN u.gender = 'F' THEN 'Female'
+                    CASE WHEN gender = 'M' THEN 'Male'
+                         WHEN gender = 'F' THEN 'Female'
                          ELSE 'Not Given'
-                    END) AS Gender, COUNT(DISTINCT r.rsvp_id) AS `Total RSVPs`
-                FROM users u
-                INNER JOIN rsvp r
-                    ON u.email = r.user_id
-                INNER JOIN event e 
-                    ON e.event_id = r.event_id
-                JOIN event_host eh ON r.event_id = eh.event_id
-                WHERE r.is_active = 1
-                    AND r.is_yes = 1
-                    AND e.start_time BETWEEN %s and %s
-                    AND u.is_active = 1
-                GROUP BY u.gender
+                    END) AS Gender, CAST(SUM(rsvp_count) AS SIGNED) AS `Total RSVPs`
+                FROM rsvp_rollup_daily
+                WHERE school_id = %s
+                    AND club_id = 0  -- School-wide totals (SCHOOL_WIDE_CLUB_ID)
+                    AND rollup_date BETWEEN DATE(%s) AND DATE(%s)
+                GROUP BY gender
             """,
-            "queryParams": ["StartDate", "EndDate"],
+            "queryParams": ["School", "StartDate", "EndDate"],
             "accessControl": "Club Admin",
         },
     ],
@@ -299,85 +266,62 @@ REPORTS: ReportObject = {
                 SELECT 
                     e.event_name AS `Event Name`, 
                     e.start_time AS `Event Date`,
-                    COUNT(DISTINCT r.rsvp_id) AS RSVPs
+                    e.rsvp_count AS RSVPs
                 FROM event e
                 JOIN event_host eh ON e.event_id = eh.event_id
-                LEFT JOIN (SELECT rs.is_active, rs.is_yes, rs.event_id, rs.rsvp_id FROM rsvp rs
-                            INNER JOIN users u
-                                ON rs.user_id = u.email
-                            WHERE u.is_active = 1) r ON e.event_id = r.event_id 
-                    AND r.is_active = 1 
-                    AND r.is_yes = 1
                 WHERE eh.club_id = %s  -- Filtering only by the specific club ID
-                    AND e.start_time BETWEEN %s AND %s
-                GROUP BY e.event_id, e.event_name, e.start_time;
+                    AND e.start_time BETWEEN %s AND %s;
             """,
             "queryParams": ["ID", "StartDate", "EndDate"],
             "accessControl": "Club Admin",
+            # One row per event; long date ranges can return a lot of rows
+            "maxRows": 20000,
         },
         {
             "name": "RSVP Activity by Semesters Completed",
             "query": """
                 SELECT
-                    semesters_completed AS `Semesters Completed`,
-                    COUNT(DISTINCT r.rsvp_id) AS `Total RSVPs`
-                FROM (
-                    SELECT 
-                        u.email,
-                        CASE 
+                    CASE
+                        WHEN year_started = 0 THEN NULL  -- Start term not given
                         WHEN MONTH(CURDATE()) < 7 THEN  -- Current semester is Spring
-                            (YEAR(CURDATE()) - YEAR_STARTED) * 2 + 
+                            (YEAR(CURDATE()) - year_started) * 2 + 
                             (CASE 
-                                WHEN SEMESTER_STARTED = 'Fall' THEN 0  -- Started in Fall
+                                WHEN semester_started = 'Fall' THEN 0  -- Started in Fall
                                 ELSE 1  -- Started in Spring
                             END)
                         ELSE  -- Current semester is Fall
-                            (YEAR(CURDATE()) - YEAR_STARTED) * 2 + 
+                            (YEAR(CURDATE()) - year_started) * 2 + 
                             (CASE 
-                                WHEN SEMESTER_STARTED = 'Fall' THEN 1  -- Started in Fall
+                                WHEN semester_started = 'Fall' THEN 1  -- Started in Fall
                                 ELSE 2  -- Started in Spring
                             END)
-                    END - 1 AS semesters_completed
-                    FROM users u
-                    WHERE u.is_active = 1
-                ) AS user_semesters
-                JOIN rsvp r ON user_semesters.email = r.user_id
-                JOIN event_host eh ON r.event_id = eh.event_id
-                JOIN event e ON e.event_id = r.event_id
-                JOIN users u ON u.email = r.user_id
-                WHERE eh.club_id = %s
-                    AND r.is_active = 1
-                    AND r.is_yes = 1
-                    AND e.start_time BETWEEN %s AND %s
-                    AND u.is_active = 1
-                GROUP BY semesters_completed
-                ORDER BY semesters_completed;
+                    END - 1 AS `Semesters Completed`,
+                    CAST(SUM(rsvp_count) AS SIGNED) AS `Total RSVPs`
+                FROM rsvp_rollup_daily
+                WHERE school_id = %s
+                    AND club_id = %s
+                    AND rollup_date BETWEEN DATE(%s) AND DATE(%s)
+                GROUP BY `Semesters Completed`
+                ORDER BY `Semesters Completed`;
             """,
-            "queryParams": ["ID", "StartDate", "EndDate"],
+            "queryParams": ["School", "ID", "StartDate", "EndDate"],
             "accessControl": "Club Admin",
         },
         {
             "name": "RSVP Activity by Gender",
             "query": """
                 SELECT (
-                    CASE WHEN u.gender = 'M' THEN 'Male'
-                         WHEN u.gender = 'F' THEN 'Female'
+                    CASE WHEN gender = 'M' THEN 'Male'
+                         WHEN gender = 'F' THEN 'Female'
                          ELSE 'Not Given'
-                    END) AS Gender, COUNT(DISTINCT r.rsvp_id) AS `Total RSVPs`
-                FROM users u
-                INNER JOIN rsvp r
-                    ON u.email = r.user_id
-                JOIN event_host eh ON r.event_id = eh.event_id
-                INNER JOIN event e
-                    ON e.event_id = r.event_id
-                WHERE eh.club_id = %s
-                    AND r.is_active = 1
-                    AND r.is_yes = 1
-                    AND u.is_active = 1
-                    AND e.start_time BETWEEN %s AND %s
-                GROUP BY u.gender
+                    END) AS Gender, CAST(SUM(rsvp_count) AS SIGNED) AS `Total RSVPs`
+                FROM rsvp_rollup_daily
+                WHERE school_id = %s
+                    AND club_id = %s
+                    AND rollup_date BETWEEN DATE(%s) AND DATE(%s)
+                GROUP BY gender
             """,
-            "queryParams": ["ID", "StartDate", "EndDate"],
+            "queryParams": ["School", "ID", "StartDate", "EndDate"],
             "accessControl": "Club Admin",
         },
         {
@@ -385,29 +329,16 @@ REPORTS: ReportObject = {
             "query": """
                 SELECT
                     -- Events created by the club in the date range
-                    COUNT(DISTINCT e.event_id) AS Events,
+                    CAST(COALESCE(SUM(cr.event_count), 0) AS SIGNED) AS Events,
                     -- All-time active subscriptions for the club
                     (
-                        SELECT COUNT(DISTINCT us2.subscription_id)
-                        FROM user_subscription us2
-                        INNER JOIN users u ON u.email = us2.email
-                        WHERE us2.club_id = %s
-                        AND us2.is_active = 1
-                        AND us2.subscribed_or_blocked = 1
-                        AND u.is_active = 1
+                        SELECT subscriber_count FROM club WHERE club_id = %s
                     ) AS Subscriptions,
                     -- RSVPs for events created by the club in the date range
-                    COUNT(DISTINCT r.rsvp_id) AS RSVPs
-                FROM event_host eh
-                JOIN event e ON e.event_id = eh.event_id
-                LEFT JOIN (SELECT rs.is_active, rs.is_yes, rs.event_id, rs.rsvp_id FROM rsvp rs
-                            INNER JOIN users u2
-                                ON rs.user_id = u2.email
-                            WHERE u2.is_active = 1) r ON eh.event_id = r.event_id
-                    AND r.is_active = 1
-                    AND r.is_yes = 1
-                WHERE eh.club_id = %s
-                AND e.start_time BETWEEN %s AND %s;
+                    CAST(COALESCE(SUM(cr.rsvp_count), 0) AS SIGNED) AS RSVPs
+                FROM club_rollup_daily cr
+                WHERE cr.club_id = %s
+                AND cr.rollup_date BETWEEN DATE(%s) AND DATE(%s);
             """,
             "queryParams": ["ID", "ID", "StartDate", "EndDate"],
             "accessControl": "Club Admin",
@@ -501,6 +432,18 @@ REPORTS: ReportObject = {
 }
 
 reports_bp = Blueprint("reports", __name__)
+logger = logging.getLogger(__name__)
+
+# Number of rows pulled from the server-side cursor per streamed chunk
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Seconds a client should wait before retrying when the report queue is full
+REPORT_RETRY_AFTER_SECONDS = 5
 
 
 def resolve_params(params, id, start_date, end_date):
@@ -519,25 +462,32 @@ def resolve_params(params, id, start_date, end_date):
     return return_val
 
 
-@reports_bp.route("/", methods=["POST"])
-def get_report():
-    # Get the report name and parameters from the request
-    request_json = request.json if request.json is not None else {}
+def load_report(request_json):
+    """
+    Look up a report definition and check that the current user may run it.
+
+    Args:
+        request_json (dict): Request payload with category, name, objId,
+            startDate, endDate and accessControl keys.
+
+    Returns:
+        tuple: (report, query_params, None) on success, or
+            (None, None, (response, status)) when the request is rejected.
+    """
     category = request_json.get("category")
     obj_id = request_json.get("objId")
     start_date = request_json.get("startDate")
     end_date = request_json.get("endDate")
     if category is None:
-        return jsonify({"error": "Missing report category"}), 400
+        return None, None, (jsonify({"error": "Missing report category"}), 400)
     name = request_json.get("name")
     if name is None:
-        return jsonify({"error": "Missing report name"}), 400
+        return None, None, (jsonify({"error": "Missing report name"}), 400)
     report = next(
-        (item for item in REPORTS.get(category) if item["name"] == name), None
+        (item for item in REPORTS.get(category, []) if item["name"] == name), None
     )
     if report is None:
-        return jsonify({"error": "Report not found"}), 404
-    query = report.get("query")
+        return None, None, (jsonify({"error": "Report not found"}), 404)
     club_id = report.get("clubId") if "clubId" in request_json else obj_id
     params = report.get("queryParams")
     if params is None:
@@ -546,7 +496,7 @@ def get_report():
 
     # Connect to the MySQL database
     if not mysql.connection:
-        return jsonify({"error": "Database connection error"}), 500
+        return None, None, (jsonify({"error": "Database connection error"}), 500)
 
     # Check user access
     user = get_user_session_info()
@@ -561,32 +511,496 @@ def get_report():
             else False
         )  # User is not a club admin and report access is club admin-only
     ):
-        return jsonify({"error": "Unauthorized"}), 403
+        return None, None, (jsonify({"error": "Unauthorized"}), 403)
+
+    return report, tuple(resolve_params(params, obj_id, start_date, end_date)), None
+
+
+@reports_bp.route("/", methods=["POST"])
+@read_only_route
+@expensive_route("30 per minute", cost=10)
+def get_report():
+    """
+    Run a report and return its rows as JSON.
+
+    Parameters:
+        category (str): Report category
+        name (str): Report name
+        objId (str, optional): Club, user or event ID for scoped reports
+        startDate (str, optional): Start of the date range
+        endDate (str, optional): End of the date range
+        async (bool, optional): Run the report in the background instead
+
+    Returns:
+        - When async is set: {"jobId": str, "status": "queued"}, 202 status.
+          Poll /jobs/<jobId> and download from /jobs/<jobId>/result
+        - On success: {"report": [...], "columns": [...], "truncated": bool,
+          "rowLimit": int}, 200 status. truncated is true when the report
+          had more than rowLimit rows and only the first rowLimit are returned
+        - When the school's report queue is full: {"error": str,
+          "status": "busy"}, 429 status with a Retry-After header
+        - When the query runs past its time limit: {"error": str,
+          "status": "timeout", "maxExecutionMs": int}, 504 status
+        - Otherwise the errors from load_report, or a database error
+
+    Behavior:
+    - Each school may run REPORT_CONCURRENCY_PER_SCHOOL reports at once;
+      further requests queue for a slot
+    - The query is aborted by MySQL after maxExecutionMs milliseconds, so a
+      huge date range can't hold locks for minutes
+    """
+    # Get the report name and parameters from the request
+    request_json = request.json if request.json is not None else {}
+    report, query_params, error = load_report(request_json)
+    if error is not None:
+        return error
+    if request_json.get("async"):
+        return enqueue_report_job(report, query_params)
+    query = report.get("query")
 
     if not mysql.connection:
         return jsonify({"error": "Database connection error"}), 500
 
-    # Create a cursor to execute the report query
-    cursor = mysql.connection.cursor()
+    # Wait for one of the school's report slots
+    school_id = session.get("school")
+    if not report_slots.acquire(school_id):
+        return report_busy_response()
+    max_execution_ms, max_rows = report_budget(report)
+
+    # Create an unbuffered cursor so at most max_rows + 1 rows are held
+    cursor = read_connection().cursor(InstrumentedSSCursor)
 
     # Execute the report query
     try:
-        print(query)
-        print(tuple(resolve_params(params, obj_id, start_date, end_date)))
-        cursor.execute(
-            query, tuple(resolve_params(params, obj_id, start_date, end_date))
-        )
-        report = cursor.fetchall()
+        logger.debug("Running report %s", report["name"])
+        set_max_execution_time(cursor, max_execution_ms)
+        cursor.execute(query, query_params)
+        report = cursor.fetchmany(max_rows + 1)
         column_titles = [desc[0] for desc in cursor.description]
+    except OperationalError as e:
+        if is_query_timeout(e):
+            return report_timeout_response(max_execution_ms)
+        logger.exception("Error in get_report")
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
     except Exception as e:
-        print(e)
+        logger.exception("Error in get_report")
         return jsonify({"error": f"Database error: {str(e)}"}), 500
-
-    # Close the cursor and connection
-    cursor.close()
+    finally:
+        # Close the cursor and free the slot for the next report
+        cursor.close()
+        report_slots.release(school_id)
 
     # Return the report data as JSON
-    return jsonify({"report": report, "columns": column_titles}), 200
+    truncated = len(report) > max_rows
+    return (
+        jsonify(
+            {
+                "report": report[:max_rows],
+                "columns": column_titles,
+                "truncated": truncated,
+                "rowLimit": max_rows,
+            }
+        ),
+        200,
+    )
+
+
+def report_busy_response():
+    """
+    Response for a report that could not get a slot for its school.
+    """
+    response = jsonify(
+        {
+            "error": "Too many reports are running for your school. Please try again shortly.",
+            "status": "busy",
+        }
+    )
+    response.headers["Retry-After"] = str(REPORT_RETRY_AFTER_SECONDS)
+    return response, 429
+
+
+def report_timeout_response(max_execution_ms):
+    """
+    Response for a report that ran past its execution time limit.
+    """
+    return (
+        jsonify(
+            {
+                "error": "The report took too long to run. Try a shorter date range.",
+                "status": "timeout",
+                "maxExecutionMs": max_execution_ms,
+            }
+        ),
+        504,
+    )
+
+
+def format_export_value(value):
+    """
+    Convert a database value into something CSV and NDJSON can represent.
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode("utf-8", errors="replace")
+    return value
+
+
+def stream_report_rows(cursor, columns, export_format):
+    """
+    Yield an exported report one chunk at a time.
+
+    Rows are pulled from an unbuffered server-side cursor in batches of
+    EXPORT_BATCH_SIZE, so only one batch is held in memory at once.
+
+    Args:
+        cursor (MySQLdb.cursors.SSCursor): Cursor that has executed the report query
+        columns (list): Column titles of the report
+        export_format (str): Either 'csv' or 'ndjson'
+
+    Yields:
+        str: Encoded chunks of the export body
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    try:
+        if export_format == "csv":
+            writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                values = [format_export_value(value) for value in row]
+                if export_format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values))))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        if buffer.tell():
+            # Header of a CSV export with no rows
+            yield buffer.getvalue()
+    finally:
+        # An SSCursor must be drained or closed before the connection is reused
+        cursor.close()
+
+
+@reports_bp.route("/export", methods=["GET", "POST"])
+@read_only_route
+@expensive_route("30 per minute", cost=10)
+def export_report():
+    """
+    Stream a report as CSV or NDJSON instead of a single JSON body.
+
+    Accepts the same parameters as get_report, either as a JSON body (POST)
+    or as query parameters (GET, so the browser can download the file
+    directly), plus a format parameter.
+
+    Parameters:
+        category (str): Report category
+        name (str): Report name
+        objId (str, optional): Club, user or event ID for scoped reports
+        startDate (str, optional): Start of the date range
+        endDate (str, optional): End of the date range
+        format (str, optional): 'csv' (default) or 'ndjson'
+
+    Returns:
+        - On success: a streamed text/csv or application/x-ndjson response
+        - On invalid format: {"error": "Invalid export format"}, 400 status
+        - Otherwise the same errors as get_report
+
+    Behavior:
+    - Uses an unbuffered server-side cursor (SSCursor) so rows are sent as
+      they are read from MySQL, keeping memory flat regardless of row count
+    - Exports are not capped at maxRows, but share the school's report slots
+      and execution time limit with get_report
+    """
+    if request.method == "GET":
+        request_json = request.args.to_dict()
+    else:
+        request_json = request.json if request.json is not None else {}
+    export_format = request_json.get("format", "csv")
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({"error": "Invalid export format"}), 400
+
+    report, query_params, error = load_report(request_json)
+    if error is not None:
+        return error
+
+    school_id = session.get("school")
+    if not report_slots.acquire(school_id):
+        return report_busy_response()
+    max_execution_ms, _ = report_budget(report)
+
+    cursor = read_connection().cursor(InstrumentedSSCursor)
+    try:
+        set_max_execution_time(cursor, max_execution_ms)
+        cursor.execute(report.get("query"), query_params)
+        column_titles = [desc[0] for desc in cursor.description]
+    except Exception as e:
+        cursor.close()
+        report_slots.release(school_id)
+        if isinstance(e, OperationalError) and is_query_timeout(e):
+            return report_timeout_response(max_execution_ms)
+        logger.exception("Error in export_report")
+        return jsonify({"error": f"Database error: {str(e)}"}), 500
+
+    finished = False
+
+    def finish_export():
+        # The slot stays taken until the whole export has been sent. Also
+        # runs when the response is closed without its body being read (a
+        # HEAD request, or a client gone before the first chunk), when the
+        # generator below never starts and its finally would never run.
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        try:
+            cursor.close()
+        except MySQLError:
+            # The connection was already closed with the request context
+            pass
+        finally:
+            report_slots.release(school_id)
+
+    def stream_and_finish():
+        try:
+            yield from stream_report_rows(cursor, column_titles, export_format)
+        finally:
+            finish_export()
+
+    filename = f"{secure_filename(report['name']) or 'report'}.{export_format}"
+    response = Response(
+        stream_with_context(stream_and_finish()),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+    response.call_on_close(finish_export)
+    return response
+
+
+def enqueue_report_job(report, query_params):
+    """
+    Queue a report to run in the background for the current user.
+
+    Args:
+        report (Report): Report definition, already access-checked
+        query_params (tuple): Resolved query parameters
+
+    Returns:
+        tuple: ({"jobId": str, "status": "queued"}, 202)
+    """
+    user = get_user_session_info()
+    app = current_app._get_current_object()
+    job = report_jobs.submit(
+        lambda job: run_report_job(app, job, report, query_params),
+        user["user_id"],
+        session.get("school"),
+        report["name"],
+    )
+    return jsonify({"jobId": job["id"], "status": job["status"]}), 202
+
+
+def run_report_job(app, job, report, query_params):
+    """
+    Run a queued report and write its result to disk.
+
+    Runs on a report job worker thread. The job stays queued until it gets
+    one of the school's report slots, so background reports count against
+    the same per-school cap as interactive ones. The result file holds the
+    column titles on its first line followed by one JSON array per row, and
+    is only moved into place once every row has been written, so a partial
+    result is never served.
+
+    Args:
+        app (Flask): Application to run the job in
+        job (dict): Job created by report_jobs.submit
+        report (Report): Report definition
+        query_params (tuple): Resolved query parameters
+    """
+    partial_path = f"{job['path']}.part"
+    max_execution_ms = app.config["REPORT_JOB_MAX_EXECUTION_MS"]
+    cursor = None
+    with app.app_context():
+        # acquire gives up when the queue is full or it times out; a job
+        # keeps waiting until the server shuts down
+        while not report_slots.acquire(job["schoolId"]):
+            if report_jobs.stopping.wait(1):
+                report_jobs.update(
+                    job, status="failed", error="The server shut down first"
+                )
+                return
+        report_jobs.update(job, status="running")
+        try:
+            cursor = read_connection().cursor(InstrumentedSSCursor)
+            set_max_execution_time(cursor, max_execution_ms)
+            cursor.execute(report.get("query"), query_params)
+            columns = [desc[0] for desc in cursor.description]
+
+            rows_written = 0
+            with open(partial_path, "w", encoding="utf-8") as result_file:
+                result_file.write(json.dumps(columns) + "\n")
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        values = [format_export_value(value) for value in row]
+                        result_file.write(json.dumps(values) + "\n")
+                    rows_written += len(rows)
+                    report_jobs.update(job, rows=rows_written)
+            os.replace(partial_path, job["path"])
+            report_jobs.update(job, status="done")
+        except OperationalError as e:
+            if is_query_timeout(e):
+                report_jobs.update(
+                    job,
+                    status="timeout",
+                    error=f"The report ran for more than {max_execution_ms} ms",
+                )
+            else:
+                logger.exception("Error in run_report_job")
+                report_jobs.update(job, status="failed", error=f"Database error: {e}")
+        except Exception as e:
+            logger.exception("Error in run_report_job")
+            report_jobs.update(job, status="failed", error=str(e))
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            report_slots.release(job["schoolId"])
+
+
+def report_job_status(job):
+    """
+    Fields of a report job that are returned to its owner.
+    """
+    expires_at = (
+        job["finishedAt"] + current_app.config["REPORT_JOB_TTL_SECONDS"]
+        if job["finishedAt"] is not None
+        else None
+    )
+    return {
+        "jobId": job["id"],
+        "report": job["report"],
+        "status": job["status"],
+        "rows": job["rows"],
+        "error": job["error"],
+        "createdAt": job["createdAt"],
+        "finishedAt": job["finishedAt"],
+        "expiresAt": expires_at,
+    }
+
+
+@reports_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_report_job(job_id):
+    """
+    Get the status and progress of a report job.
+
+    Returns:
+        - On success: {"jobId", "report", "status", "rows", "error",
+          "createdAt", "finishedAt", "expiresAt"}, 200 status. status is one
+          of 'queued', 'running', 'done', 'failed' or 'timeout', and rows is
+          the number of rows written so far
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+        - On unknown or expired job: {"error": "Report job not found"}, 404 status
+    """
+    user = get_user_session_info()
+    if not user["user_id"]:
+        return jsonify({"error": "Unauthorized"}), 403
+    job = report_jobs.get(job_id, user["user_id"])
+    if job is None:
+        return jsonify({"error": "Report job not found"}), 404
+    return jsonify(report_job_status(job)), 200
+
+
+def stream_report_job_result(path, export_format):
+    """
+    Yield a finished report job's result file as JSON or CSV.
+
+    Args:
+        path (str): Path of the result file written by run_report_job
+        export_format (str): Either 'json' or 'csv'
+
+    Yields:
+        str: Encoded chunks of the result body
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    with open(path, encoding="utf-8") as result_file:
+        columns = result_file.readline().strip()
+        if export_format == "csv":
+            writer.writerow(json.loads(columns))
+        else:
+            buffer.write(f'{{"columns": {columns}, "report": [')
+
+        first_row = True
+        for line_number, line in enumerate(result_file, start=1):
+            if export_format == "csv":
+                writer.writerow(json.loads(line))
+            else:
+                buffer.write(line.strip() if first_row else f",{line.strip()}")
+                first_row = False
+            if line_number % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+
+    if export_format == "json":
+        buffer.write("]}")
+    yield buffer.getvalue()
+
+
+@reports_bp.route("/jobs/<job_id>/result", methods=["GET"])
+def get_report_job_result(job_id):
+    """
+    Download the result of a finished report job.
+
+    Query Parameters:
+        format (str, optional): 'json' (default) or 'csv'
+
+    Returns:
+        - On success: a streamed application/json or text/csv response
+        - On invalid format: {"error": "Invalid export format"}, 400 status
+        - On unauthorized access: {"error": "Unauthorized"}, 403 status
+        - On unknown job: {"error": "Report job not found"}, 404 status
+        - On a job that hasn't finished successfully:
+          {"error": "Report job is not finished", "status": str}, 409 status
+        - On an expired result: {"error": "Report result has expired"}, 410 status
+    """
+    export_format = request.args.get("format", "json")
+    if export_format not in ("json", "csv"):
+        return jsonify({"error": "Invalid export format"}), 400
+    user = get_user_session_info()
+    if not user["user_id"]:
+        return jsonify({"error": "Unauthorized"}), 403
+    job = report_jobs.get(job_id, user["user_id"])
+    if job is None:
+        return jsonify({"error": "Report job not found"}), 404
+    if job["status"] != "done":
+        return (
+            jsonify({"error": "Report job is not finished", "status": job["status"]}),
+            409,
+        )
+    if not os.path.exists(job["path"]):
+        return jsonify({"error": "Report result has expired"}), 410
+
+    headers = {}
+    if export_format == "csv":
+        filename = f"{secure_filename(job['report']) or 'report'}.csv"
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return Response(
+        stream_report_job_result(job["path"], export_format),
+        mimetype="text/csv" if export_format == "csv" else "application/json",
+        headers=headers,
+    )
 
 
 @reports_bp.route("/names/<category>", methods=["GET"])
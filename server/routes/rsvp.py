@@ -1,8 +1,27 @@
+import logging
 from flask import Blueprint, jsonify, request, session
 from extensions import mysql
+from helper.calendar_feed import drop_user_feed
 from helper.check_user import get_user_session_info
+from helper.counters import lock_rsvp, rsvp_changed
+from helper.live_updates import event_topic, publish
+from helper.rollups import mark_rollup_dirty
 
 rsvp_bp = Blueprint("rsvp", __name__)
+logger = logging.getLogger(__name__)
+
+
+def publish_rsvp(cur, event_id):
+    """
+    Tell the event's viewers how many are going now.
+    """
+    cur.execute("SELECT rsvp_count FROM event WHERE event_id = %s", (event_id,))
+    publish(
+        cur,
+        event_topic(event_id),
+        "rsvp",
+        {"eventId": int(event_id), "going": cur.fetchone()[0]},
+    )
 
 
 @rsvp_bp.route("/rsvp", methods=["POST"])
@@ -60,7 +79,6 @@ def RSVP():
         return jsonify({"error": "Authentication required"}), 401
 
     event_id = request.args.get("event_id")  # Event ID
-    print(event_id)
     user_id = user_info.get("user_id")
     typeofRSVP = request.args.get("type")  # Type parameter
 
@@ -98,6 +116,8 @@ def RSVP():
         if cur.fetchone()[0] == 0:
             return jsonify({"error": "Gender restriction is invalid"}), 400
 
+        was_going = lock_rsvp(cur, event_id, user_id)
+
         if typeofRSVP == "block":
             # Insert or update the RSVP to set is_yes to False
             cur.execute(
@@ -107,7 +127,11 @@ def RSVP():
                 """,
                 (event_id, user_id),
             )
+            rsvp_changed(cur, event_id, was_going, False)
+            mark_rollup_dirty(cur, event_id)
+            publish_rsvp(cur, event_id)
             mysql.connection.commit()
+            drop_user_feed(session.get("school"), user_id)
             return jsonify({"message": "RSVP set to 'block'"}), 200
 
         elif typeofRSVP == "rsvp":
@@ -119,7 +143,11 @@ def RSVP():
                 """,
                 (event_id, user_id),
             )
+            rsvp_changed(cur, event_id, was_going, True)
+            mark_rollup_dirty(cur, event_id)
+            publish_rsvp(cur, event_id)
             mysql.connection.commit()
+            drop_user_feed(session.get("school"), user_id)
             return jsonify({"message": "RSVP set to 'rsvp'"}), 200
 
         elif typeofRSVP == "cancel":
@@ -131,7 +159,11 @@ def RSVP():
                 """,
                 (event_id, user_id),
             )
+            rsvp_changed(cur, event_id, was_going, False)
+            mark_rollup_dirty(cur, event_id)
+            publish_rsvp(cur, event_id)
             mysql.connection.commit()
+            drop_user_feed(session.get("school"), user_id)
             return jsonify({"message": "RSVP deleted"}), 200
 
         else:
@@ -140,7 +172,7 @@ def RSVP():
     except Exception as e:
         # Rollback in case of an error
         mysql.connection.rollback()
-        print(e)
+        logger.exception("Error in RSVP")
         return jsonify({"error": str(e)}), 500
 
     finally:
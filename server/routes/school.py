@@ -1,8 +1,10 @@
+import logging
 from flask import Blueprint, jsonify, session, request
 from extensions import mysql
 import base64
 
 school_bp = Blueprint("school", __name__)
+logger = logging.getLogger(__name__)
 
 
 @school_bp.route("/", methods=["GET"])
@@ -12,7 +14,6 @@ def get_school():
     """
     try:
         school_id = session.get("school")
-        print(f"Retrieved school_id from session: {school_id}")
 
         if not school_id:
             return jsonify({"error": "School ID not found in session"}), 404
@@ -48,7 +49,7 @@ def get_school():
             200,
         )
     except Exception as e:
-        print(e)
+        logger.exception("Error in get_school")
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 
@@ -89,7 +90,6 @@ def update_school():
     """
     try:
         school_id = session.get("school")
-        print(f"Retrieved school_id from session: {school_id}")
         if not school_id:
             return jsonify({"error": "School not found"}), 404
 
@@ -132,7 +132,7 @@ def update_school():
 
         return jsonify({"message": "School updated successfully"}), 200
     except Exception as e:
-        print(e)
+        logger.exception("Error in update_school")
         return jsonify({"error": f"Database error: {str(e)}"}), 500
 
 
@@ -163,7 +163,7 @@ def add_school():
                 )
                 logo_prefix = logo.split(",")[0] if "," in logo else None
             except Exception as e:
-                print("Error decoding image:", e)
+                logger.info("Invalid school logo: %s", e)
                 return jsonify({"error": "Invalid image format."}), 400
 
         if not mysql.connection:
@@ -180,5 +180,5 @@ def add_school():
 
         return jsonify({"message": "School added successfully!"}), 201
     except Exception as e:
-        print("Error:", e)
+        logger.exception("Error adding school")
         return jsonify({"error": "Database error: " + str(e)}), 500
@@ -1,8 +1,12 @@
-from flask import Blueprint, jsonify, request
+import logging
+from flask import Blueprint, jsonify, request, session
 from extensions import mysql
+from helper.calendar_feed import drop_user_feed
 from helper.check_user import get_user_session_info
+from helper.counters import lock_subscription, subscription_changed
 
 subscriptions_bp = Blueprint("subscriptions", __name__)
+logger = logging.getLogger(__name__)
 
 
 @subscriptions_bp.route("/subscribe", methods=["POST"])
@@ -78,8 +82,11 @@ def manage_subscription():
 
     try:
         cur = mysql.connection.cursor()
+        was_subscribed = lock_subscription(cur, club_id, user_id)
+        subscribed = was_subscribed
 
         if action == "subscribe" or action == "block":
+            subscribed = action == "subscribe"
 
             # Check if subscription exists
             subscription = cur.execute(
@@ -114,6 +121,7 @@ def manage_subscription():
                 )
 
         elif action == "unsubscribe" or action == "unblock":
+            subscribed = False
 
             # Deactivate subscription
             cur.execute(
@@ -125,9 +133,11 @@ def manage_subscription():
                 (user_id, club_id),
             )
 
+        subscription_changed(cur, club_id, was_subscribed, subscribed)
         mysql.connection.commit()
+        drop_user_feed(session.get("school"), user_id)
         return jsonify({"success": True}), 200
 
     except Exception as e:
-        print(f"Error: {str(e)}")
+        logger.exception("Error updating subscription")
         return jsonify({"error": "Database operation failed"}), 500